@@ -1,24 +1,21 @@
 # app/bot.py
 import asyncio
+import hmac
 import logging.config
 import pathlib
 import signal
 from datetime import date, timedelta
 from typing import Any
 
-import redis.asyncio as redis
-import sentry_sdk
 import yaml
 from aiogram import Bot, Dispatcher, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import CallbackQuery, Message
-from sentry_sdk.integrations.aiohttp import AioHttpIntegration
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
-from sqlalchemy import select, update
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import ProgrammingError
 
 from app.config import settings
-from app.db.base import Base
 from app.db.broadcast import Broadcast
 from app.db.media_request import MediaRequest
 from app.db.note import Note
@@ -31,20 +28,33 @@ from app.i18n import t
 from app.keyboards.main_menu import menu
 from app.middlewares.audit import AuditMiddleware
 from app.middlewares.csrf import CSRFMiddleware
+from app.middlewares.current_user import CurrentUserMiddleware
+from app.middlewares.db_queries import QueryCountMiddleware
 from app.middlewares.locale import LocaleMiddleware
 from app.middlewares.metrics import MetricsMiddleware
 from app.middlewares.rate_limit import RateLimitMiddleware
+from app.middlewares.redis_batch import RedisBatchMiddleware
 from app.middlewares.sentry_context import SentryContext
 from app.middlewares.ux import FallbackMiddleware, UnknownCommandMiddleware
-from app.roles import DEMO_USERS, ROLES
+from app.roles import ROLES
 from app.routes import include_all
-from app.services.scheduler import kpi_loop
-from app.utils.csrf import issue_nonce
+from app.schemas.user import UserSnapshot
+from app.services.cache_service import cache_service
+from app.services.redis_pool import redis_registry
+from app.utils.csrf import new_nonce
+from app.utils.hash import check_pwd_async, is_hashed
+
+logger = logging.getLogger(__name__)
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def configure_logging() -> None:
+    """Настроить логирование из logging.yml"""
+    logging.config.dictConfig(
+        yaml.safe_load(pathlib.Path("logging.yml").read_text())
+    )
 
-# Configure logging
-logging.config.dictConfig(
-    yaml.safe_load(pathlib.Path("logging.yml").read_text())
-)
 
 # Sentry integration
 
@@ -62,8 +72,14 @@ def _should_suppress_event(event: Any, hint: Any) -> bool:
     return False
 
 
-# Initialize GlitchTip if DSN is provided
-if settings.GLITCHTIP_DSN:
+def init_sentry() -> None:
+    """Initialize GlitchTip if DSN is provided"""
+    if not settings.GLITCHTIP_DSN:
+        return
+    import sentry_sdk
+    from sentry_sdk.integrations.aiohttp import AioHttpIntegration
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+
     sentry_sdk.init(
         dsn=settings.GLITCHTIP_DSN,
         integrations=[
@@ -79,22 +95,36 @@ if settings.GLITCHTIP_DSN:
         ),
     )
 
-bot = Bot(settings.TELEGRAM_TOKEN)
-storage = RedisStorage(
-    redis.from_url(settings.REDIS_URL, decode_responses=True)
-)
-dp = Dispatcher(storage=storage)
-
 
 # ────────────────── DB bootstrap ──────────────────
-async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        result = await conn.execute(select(User))
-        if not result.first():
-            await conn.commit()
-        # Временно отключаем seed_demo для быстрого запуска
-        # await seed_demo(conn)
+async def check_schema() -> None:
+    """
+    Проверка схемы при старте вместо create_all: ревизия БД должна
+    совпадать с head миграций (их применяет scripts/run_migrations.sh).
+    """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    try:
+        async with engine.connect() as conn:
+            rows = await conn.execute(
+                text("SELECT version_num FROM alembic_version")
+            )
+            current = {row[0] for row in rows}
+    except ProgrammingError:
+        current = set()  # миграции ещё не применялись
+
+    if current != heads:
+        message = (
+            f"Схема БД на ревизии {sorted(current) or 'нет'}, миграции — "
+            f"{sorted(heads)}: выполните `python manage.py migrate`"
+        )
+        if settings.ENV == "prod":
+            raise RuntimeError(message)
+        logger.warning(message)
 
 
 async def seed_demo(conn: Any) -> None:
@@ -233,47 +263,35 @@ async def get_user(tg_id: int) -> Any:
         return result.scalar_one_or_none()
 
 
+async def verify_password(pwd: str, stored: str | None) -> bool:
+    """Проверка пароля: bcrypt в пуле потоков или открытый текст"""
+    if stored is None:
+        return False
+    if is_hashed(stored):
+        return await check_pwd_async(pwd, stored)
+    return hmac.compare_digest(stored.encode(), pwd.encode())
+
+
 async def authenticate(tg_id: int, login: str, pwd: str) -> Any:
     """Аутентификация пользователя"""
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            select(User).where(
-                User.login == login, User.password == pwd, User.used.is_(False)
-            )
+            select(User).where(User.login == login, User.used.is_(False))
         )
         user = result.scalar_one_or_none()
+        if user and not await verify_password(pwd, user.password):
+            user = None
         if user:
             user.tg_id = tg_id
             user.used = True
             await session.commit()
+            await cache_service.invalidate_user(tg_id)
         return user
 
 
-# ────────────────── Инициализация сервисов ──────────────────
-from app.middlewares.loading import LoadingMiddleware
-from app.services.command_service import (
-    init_command_service,
-    setup_all_commands,
-)
-from app.services.feedback_service import init_feedback_service
-from app.services.notification_service import init_notification_services
-from app.services.onboarding_service import init_onboarding_service
-
-# Инициализация сервисов
-init_command_service(bot)
-init_onboarding_service(bot)
-init_feedback_service(bot)
-init_notification_services(bot)
-
-# Регистрация middleware
-dp.message.middleware(LoadingMiddleware(bot))
-dp.callback_query.middleware(LoadingMiddleware(bot))
-
-
 # ────────────────── /start перенесен в onboarding.py ──────────────────
 
 
-@dp.message(F.text)  # type: ignore[misc]
 async def fsm_login(m: Message, state: FSMContext, lang: str) -> None:
     """Обработка логина через FSM"""
     if m.from_user is None:
@@ -300,7 +318,7 @@ async def fsm_login(m: Message, state: FSMContext, lang: str) -> None:
         )
         await state.clear()
         if user:
-            nonce = await issue_nonce(dp.storage, m.chat.id, m.from_user.id)
+            nonce = await new_nonce(state.storage, m.chat.id, m.from_user.id)
             await m.answer(
                 t("common.auth_success", lang),
                 reply_markup=menu(
@@ -314,7 +332,6 @@ async def fsm_login(m: Message, state: FSMContext, lang: str) -> None:
 
 
 # ────────────────── Обработка выбора действия при старте ──────────────────
-@dp.callback_query(F.data == "start_onboarding")
 async def handle_start_onboarding(
     call: CallbackQuery, state: FSMContext, lang: str
 ) -> None:
@@ -325,7 +342,6 @@ async def handle_start_onboarding(
     await call.answer()
 
 
-@dp.callback_query(F.data == "start_login")
 async def handle_start_login(
     call: CallbackQuery, state: FSMContext, lang: str
 ) -> None:
@@ -337,8 +353,12 @@ async def handle_start_login(
 
 
 # ────────────────── Переключение роли демо-аккаунта ──────────────────
-@dp.callback_query(lambda c: c.data.startswith("switch_"))
-async def demo_switch(call: CallbackQuery, lang: str) -> None:
+async def demo_switch(
+    call: CallbackQuery,
+    state: FSMContext,
+    lang: str,
+    current_user: UserSnapshot | None = None,
+) -> None:
     """Переключение между демо-аккаунтами"""
     if call.from_user is None:
         await call.answer("Ошибка: пользователь не найден.", show_alert=True)
@@ -349,7 +369,7 @@ async def demo_switch(call: CallbackQuery, lang: str) -> None:
         return
     # CSRF middleware уже очистил nonce, поэтому call.data содержит только реальные данные
     role_target = call.data.split("_", 1)[1]  # teacher / admin / super ...
-    user = await get_user(call.from_user.id)
+    user = current_user or await get_user(call.from_user.id)
     if not user:
         await call.answer("Ошибка: пользователь не найден.", show_alert=True)
         return
@@ -367,10 +387,11 @@ async def demo_switch(call: CallbackQuery, lang: str) -> None:
                 update(User).where(User.id == user.id).values(role=role_target)
             )
             await s.commit()
+        await cache_service.invalidate_user(call.from_user.id)
     if call.message is not None and hasattr(call.message, "edit_text"):
         # Генерируем новый nonce для обновленного меню
-        nonce = await issue_nonce(
-            dp.storage, call.message.chat.id, call.from_user.id
+        nonce = await new_nonce(
+            state.storage, call.message.chat.id, call.from_user.id
         )
         await call.message.edit_text(
             f"🚀 Вы переключились в режим «{ROLES[role_target]}»",
@@ -381,29 +402,130 @@ async def demo_switch(call: CallbackQuery, lang: str) -> None:
         await call.answer()
 
 
-# ────────────────── Подключение роутеров ──────────────────
-include_all(dp)
+# ────────────────── Фабрика приложения ──────────────────
+def init_services(bot: Bot) -> None:
+    """Инициализация сервисов, которым нужен бот"""
+    from app.services.command_service import init_command_service
+    from app.services.feedback_service import init_feedback_service
+    from app.services.notification_service import init_notification_services
+    from app.services.onboarding_service import init_onboarding_service
+
+    init_command_service(bot)
+    init_onboarding_service(bot)
+    init_feedback_service(bot)
+    init_notification_services(bot)
+
+
+def create_dispatcher(bot: Bot) -> Dispatcher:
+    """Диспетчер со всеми хэндлерами, роутерами и middleware"""
+    from app.middlewares.loading import LoadingMiddleware
+
+    storage = RedisStorage(redis_registry.client("state"))
+    dp = Dispatcher(storage=storage)
+    # CSRFMiddleware в режиме storage берёт хранилище из data["dp"]
+    dp["dp"] = dp
+
+    dp.message.middleware(LoadingMiddleware(bot))
+    dp.callback_query.middleware(LoadingMiddleware(bot))
+
+    # Хэндлеры диспетчера проверяются раньше подключённых роутеров
+    dp.message.register(fsm_login, F.text)
+    dp.callback_query.register(
+        handle_start_onboarding, F.data == "start_onboarding"
+    )
+    dp.callback_query.register(handle_start_login, F.data == "start_login")
+    dp.callback_query.register(
+        demo_switch, lambda c: c.data.startswith("switch_")
+    )
+
+    # ────────────────── Подключение роутеров ──────────────────
+    include_all(dp)
+
+    # ────────────────── Middleware ──────────────────
+    dp.message.middleware(LocaleMiddleware())
+    dp.callback_query.middleware(LocaleMiddleware())
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.message.middleware(UnknownCommandMiddleware())
+    dp.message.middleware(FallbackMiddleware())
+    dp.message.middleware(RateLimitMiddleware())
+    dp.callback_query.middleware(CSRFMiddleware())
+    # Счёт запросов к БД охватывает и загрузку пользователя
+    dp.update.outer_middleware(QueryCountMiddleware())
+    # Отложенные записи кеша апдейта уходят одним pipeline
+    dp.update.outer_middleware(RedisBatchMiddleware())
+    # Пользователь загружается один раз на апдейт и доступен как current_user
+    dp.update.outer_middleware(CurrentUserMiddleware())
+    dp.update.middleware(SentryContext())
+    dp.update.middleware(AuditMiddleware())
+    return dp
+
+
+_app: tuple[Bot, Dispatcher] | None = None
+
+
+def create_app() -> tuple[Bot, Dispatcher]:
+    """
+    Собрать бота и диспетчер (один раз на процесс).
+
+    Импорт app.bot ничего не создаёт: бот, хранилище, сервисы и
+    роутеры появляются только здесь.
+    """
+    global _app
+    if _app is None:
+        bot = Bot(settings.TELEGRAM_TOKEN)
+        init_services(bot)
+        _app = (bot, create_dispatcher(bot))
+    return _app
+
+
+def __getattr__(name: str) -> Any:
+    # Обратная совместимость: `from app.bot import bot, dp`
+    if name in ("bot", "dp"):
+        bot, dp = create_app()
+        return bot if name == "bot" else dp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def _setup_commands() -> None:
+    from app.services.command_service import setup_all_commands
+
+    try:
+        await setup_all_commands()
+    except Exception as e:
+        logger.error(f"Не удалось установить команды бота: {e}")
+
+
+async def _warm_assets(bot: Bot) -> None:
+    """Подготовить картинки онбординга и загрузить их в служебный чат"""
+    from app.handlers.onboarding import ROLE_IMAGES
+    from app.services.assets import asset_registry
 
-# ────────────────── Middleware ──────────────────
-dp.message.middleware(LocaleMiddleware())
-dp.callback_query.middleware(LocaleMiddleware())
-dp.message.middleware(MetricsMiddleware())
-dp.callback_query.middleware(MetricsMiddleware())
-dp.message.middleware(UnknownCommandMiddleware())
-dp.message.middleware(FallbackMiddleware())
-dp.message.middleware(RateLimitMiddleware())
-dp.callback_query.middleware(CSRFMiddleware())
-dp.update.middleware(SentryContext())
-dp.update.middleware(AuditMiddleware())
+    paths = list(ROLE_IMAGES.values())
+    try:
+        await asset_registry.prepare_all(paths)
+        if settings.ASSET_UPLOAD_CHAT_ID:
+            uploaded = await asset_registry.preload(
+                bot, settings.ASSET_UPLOAD_CHAT_ID, paths
+            )
+            logger.info(f"Загружено картинок онбординга: {uploaded}")
+    except Exception as e:
+        logger.error(f"Не удалось подготовить картинки: {e}")
 
 
 # ────────────────── Запуск ──────────────────
 async def main() -> None:
     """Главная функция"""
-    await init_db()
+    from app.services.scheduler import kpi_loop, news_refresh_loop
 
-    # Устанавливаем команды при запуске
-    await setup_all_commands()
+    configure_logging()
+    init_sentry()
+    bot, dp = create_app()
+    await check_schema()
+
+    # Команды ставятся в фоне: два запроса к Telegram не держат старт
+    commands_task = asyncio.create_task(_setup_commands())
+    assets_task = asyncio.create_task(_warm_assets(bot))
 
     # Start health check server
     from aiohttp import web
@@ -416,9 +538,27 @@ async def main() -> None:
     site = web.TCPSite(runner, "0.0.0.0", 8080)
     await site.start()
 
+    # Кеши прогреваются до приёма апдейтов; до конца прогрева /ready → 503
+    from app.services.warmup import cache_warmer
+
+    await cache_warmer.run()
+
     # Start KPI metrics loop
     kpi_task = asyncio.create_task(kpi_loop())
 
+    # Keep the canonical news list warm in Redis
+    news_task = asyncio.create_task(news_refresh_loop())
+
+    # Память и CPU процесса снимаются в фоне, а не в каждом вызове
+    from app.services.performance_monitor import resource_collector
+
+    resources_task = asyncio.create_task(resource_collector.run())
+
+    # Межпроцессная инвалидация локального кеша пользователей
+    invalidation_task = asyncio.create_task(
+        cache_service.listen_invalidations()
+    )
+
     # Graceful shutdown setup
     loop = asyncio.get_running_loop()
     stop = asyncio.Event()
@@ -429,8 +569,28 @@ async def main() -> None:
     for sig in (signal.SIGTERM, signal.SIGINT):
         loop.add_signal_handler(sig, _sig)
 
-    # Start bot polling
-    polling = asyncio.create_task(dp.start_polling(bot, skip_updates=True))
+    polling = None
+    partitions_task = None
+    if settings.BOT_MODE == "webhook":
+        # Апдейты принимает /webhook health-приложения и раскладывает по
+        # партициям; обрабатывают их процессы run_update_worker.py
+        if not settings.WEBHOOK_URL:
+            raise RuntimeError("WEBHOOK_URL обязателен в режиме webhook")
+        if not settings.WEBHOOK_SECRET:
+            raise RuntimeError("WEBHOOK_SECRET обязателен в режиме webhook")
+        await bot.set_webhook(
+            settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        # Партиции без живого воркера видны в логах и метриках
+        from app.services.update_queue import update_queue
+
+        partitions_task = asyncio.create_task(update_queue.watch(stop))
+    else:
+        # Start bot polling
+        await bot.delete_webhook()
+        polling = asyncio.create_task(dp.start_polling(bot, skip_updates=True))
 
     try:
         await stop.wait()
@@ -439,15 +599,27 @@ async def main() -> None:
         print("🛑 Останавливаем бота...")
 
         # Cancel tasks
-        polling.cancel()
+        if polling is not None:
+            polling.cancel()
+        if partitions_task is not None:
+            partitions_task.cancel()
+        commands_task.cancel()
+        assets_task.cancel()
         kpi_task.cancel()
+        news_task.cancel()
+        invalidation_task.cancel()
+        resources_task.cancel()
 
         # Stop health server
         await runner.cleanup()
 
         # Close connections
+        from app.services.news_parser import news_parser
+
+        await news_parser.close()
         await bot.session.close()
         await engine.dispose()
+        await redis_registry.close()
 
         print("✅ Бот остановлен")
 
@@ -17,6 +17,7 @@ class Settings(BaseSettings):
 
     # Redis
     REDIS_DSN: str = "redis://redis:6379/0"
+    REDIS_CACHE_DB: int = 1  # logical DB for disposable cache data
 
     # Admin configuration
     ADMIN_IDS: str = ""
@@ -27,18 +28,56 @@ class Settings(BaseSettings):
 
     # App settings
     KEEP_DAYS: int = 14
+    I18N_CACHE_FILE: str | None = None  # compiled locale catalog cache
+    PAGE_SIZE: int = 10  # rows per page in list screens
 
     # Security settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: str = "pdf,doc,docx,jpg,jpeg,png,txt"
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_ALGORITHM: str = "gcra"  # gcra | fixed
     SESSION_TIMEOUT: int = 3600  # 1 hour
+    CSRF_MODE: str = "storage"  # storage | signed
+    CSRF_SECRET: str | None = None  # defaults to a key derived from the token
+    CSRF_TOKEN_TTL: int = 7 * 24 * 3600  # seconds, signed mode only
     
     # Performance settings
     CONNECTION_POOL_SIZE: int = 20
     MAX_OVERFLOW: int = 30
     POOL_TIMEOUT: int = 30
     POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = False  # ping on every checkout (pessimistic)
+    DB_PGBOUNCER: bool = False  # behind PgBouncer: NullPool, no stmt cache
+    TYPING_DELAY: float = 0.5  # seconds before "typing" is shown
+    RESOURCE_SAMPLE_INTERVAL: float = 15.0  # seconds between psutil samples
+    N_PLUS_ONE_THRESHOLD: int = 5  # same query this many times per update
+    WARMUP_CONCURRENCY: int = 4  # parallel cache warm-up steps at startup
+    WARMUP_TIMEOUT: float = 60.0  # seconds before /ready flips regardless
+    WARMUP_USERS: int = 5000  # active user snapshots preloaded at startup
+
+    # Update ingestion: polling | webhook
+    BOT_MODE: str = "polling"
+    WEBHOOK_URL: str | None = None  # public https URL, e.g. https://bot.example.com
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: str | None = None
+    UPDATE_PARTITIONS: int = 16
+    UPDATE_WORKERS: int = 1  # number of update worker processes
+    UPDATE_WORKER_INDEX: int | None = None  # 0..UPDATE_WORKERS-1; None: claim one in Redis
+
+    # Background jobs
+    JOB_WORKERS: int = 4
+    JOB_VISIBILITY_TIMEOUT: int = 300  # seconds
+
+    # Certificates (PDF)
+    PDF_WORKERS: int = 2  # renderer processes per job worker
+    PDF_FONT_FILE: str | None = None  # TTF with Cyrillic, e.g. DejaVuSans.ttf
+    PDF_FONT_BOLD_FILE: str | None = None
+    PDF_FILE_ID_TTL: int = 30 * 24 * 3600  # seconds
+
+    # Static media (onboarding images): uploaded once, sent by file_id
+    ASSET_MAX_SIDE: int = 1280  # px, 0 = upload files as they are
+    ASSET_JPEG_QUALITY: int = 85
+    ASSET_UPLOAD_CHAT_ID: int | None = None  # service chat for preloading
 
     model_config = SettingsConfigDict(
         env_file=".env", case_sensitive=True, env_file_encoding="utf-8"
@@ -74,6 +113,30 @@ class Settings(BaseSettings):
             raise ValueError("Database port must be between 1 and 65535")
         return v
 
+    @field_validator("BOT_MODE")  # type: ignore[misc]
+    @classmethod
+    def validate_bot_mode(cls, v: str) -> str:
+        """Валидация режима получения апдейтов"""
+        if v not in ("polling", "webhook"):
+            raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+        return v
+
+    @field_validator("RATE_LIMIT_ALGORITHM")  # type: ignore[misc]
+    @classmethod
+    def validate_rate_limit_algorithm(cls, v: str) -> str:
+        """Валидация алгоритма rate limiter"""
+        if v not in ("gcra", "fixed"):
+            raise ValueError("RATE_LIMIT_ALGORITHM must be 'gcra' or 'fixed'")
+        return v
+
+    @field_validator("CSRF_MODE")  # type: ignore[misc]
+    @classmethod
+    def validate_csrf_mode(cls, v: str) -> str:
+        """Валидация режима CSRF токенов"""
+        if v not in ("storage", "signed"):
+            raise ValueError("CSRF_MODE must be 'storage' or 'signed'")
+        return v
+
     @field_validator("KEEP_DAYS")  # type: ignore[misc]
     @classmethod
     def validate_keep_days(cls, v: int) -> int:
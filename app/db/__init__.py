@@ -1,5 +1,6 @@
 # Database package
 from .base import Base, TimestampMixin
+from .kpi_rollup import KpiRollup
 from .media_request import MediaRequest
 from .note import Note
 from .psych_request import PsychRequest
@@ -10,6 +11,7 @@ from .user import User
 __all__ = [
     "Base",
     "TimestampMixin",
+    "KpiRollup",
     "MediaRequest",
     "Note",
     "PsychRequest",
@@ -27,6 +27,7 @@ class TimestampMixin:
 
 
 from .broadcast import Broadcast  # noqa
+from .kpi_rollup import KpiRollup  # noqa
 from .media_request import MediaRequest  # noqa
 from .note import Note  # noqa
 from .notification import Notification  # noqa
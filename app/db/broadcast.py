@@ -24,8 +24,14 @@ class Broadcast(Base):
     target_role = Column(
         String(50), nullable=False
     )  # "teacher", "student", etc.
-    status = Column(String(50), default="sent")  # "draft", "sent", "delivered"
+    status = Column(
+        String(50), default="sent"
+    )  # "draft", "sending", "delivered", "partial", "failed"
+    total_count = Column(Integer, default=0, nullable=False)
+    sent_count = Column(Integer, default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
     sent_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
 
     # Связи
     author = relationship("User", back_populates="broadcasts")
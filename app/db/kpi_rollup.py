@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+
+from app.db.base import Base
+
+
+class KpiRollup(Base):
+    """Предрасчитанные KPI-счётчики (ключ → значение)"""
+
+    __tablename__ = "kpi_rollup"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<KpiRollup({self.key}={self.value})>"
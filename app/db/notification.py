@@ -44,8 +44,13 @@ class Notification(Base, TimestampMixin):
     user_id = Column(
         Integer, ForeignKey("users.id"), nullable=False, index=True
     )
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id"), nullable=True)
     title = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
+    status = Column(
+        String(20), default=NotificationStatus.PENDING.value, nullable=False
+    )
+    error = Column(String(255), nullable=True)  # Причина недоставки
     scheduled_at = Column(DateTime, nullable=True)  # Когда отправить
     sent_at = Column(DateTime, nullable=True)  # Когда было отправлено
     read_at = Column(DateTime, nullable=True)  # Когда было прочитано
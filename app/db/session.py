@@ -1,15 +1,171 @@
-from typing import AsyncGenerator
+import logging
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict
 
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.config import settings
+from app.services.performance_monitor import db_profiler
 
-# Создание асинхронного движка
-engine = create_async_engine(
-    settings.DATABASE_URL, echo=False, pool_pre_ping=True, pool_recycle=300
+logger = logging.getLogger(__name__)
+
+# Метрики пула соединений
+POOL_SIZE = Gauge("db_pool_size", "Configured connection pool size")
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out"
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (overflow)"
 )
+POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Pool checkouts")
+POOL_CONNECTS = Counter("db_pool_connects_total", "New DBAPI connections")
+POOL_DISCONNECTS = Counter(
+    "db_pool_disconnects_total", "Errors detected as lost connections"
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+POOL_CONNECTION_AGE = Histogram(
+    "db_pool_connection_age_seconds",
+    "Age of connections at checkout",
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200),
+)
+
+
+class TimedCheckout:
+    """Примесь к пулу: замер ожидания свободного соединения"""
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    """Асинхронная очередь соединений с замером ожидания"""
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Подписать пул движка на события для метрик Prometheus"""
+
+    def _gauges(returning: int = 0) -> None:
+        # Пул берётся заново: после dispose() движок создаёт новый
+        pool = engine.pool
+        # NullPool не держит соединений: счётчиков у него нет
+        if isinstance(pool, QueuePool):
+            POOL_CHECKED_OUT.set(pool.checkedout() - returning)
+            POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, record: Any) -> None:
+        POOL_CONNECTS.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        POOL_CHECKOUTS.inc()
+        POOL_CONNECTION_AGE.observe(time.time() - record.starttime)
+        _gauges()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection: Any, record: Any) -> None:
+        # Событие приходит до возврата соединения в очередь
+        _gauges(returning=1)
+
+    if isinstance(engine.pool, QueuePool):
+        POOL_SIZE.set(engine.pool.size())
+
+
+def engine_options(
+    pgbouncer: bool | None = None, pre_ping: bool | None = None
+) -> Dict[str, Any]:
+    """
+    Параметры create_async_engine из настроек.
+
+    pgbouncer — режим за PgBouncer (transaction pooling): пул держит сам
+    PgBouncer, поэтому NullPool; кэш подготовленных выражений asyncpg
+    выключен, имена выражений уникальны.
+
+    pre_ping — пессимистичная проверка соединения перед каждой выдачей
+    (лишний round-trip). По умолчанию режим оптимистичный: соединения
+    обновляются по POOL_RECYCLE, а при обрыве SQLAlchemy помечает пул
+    недействительным и следующие запросы получают новые соединения.
+    """
+    if pgbouncer is None:
+        pgbouncer = settings.DB_PGBOUNCER
+    if pre_ping is None:
+        pre_ping = settings.DB_POOL_PRE_PING
+
+    if pgbouncer:
+        return {
+            "poolclass": NullPool,
+            "pool_pre_ping": pre_ping,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: (
+                    f"__asyncpg_{uuid.uuid4()}__"
+                ),
+            },
+        }
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.CONNECTION_POOL_SIZE,
+        "max_overflow": settings.MAX_OVERFLOW,
+        "pool_timeout": settings.POOL_TIMEOUT,
+        "pool_recycle": settings.POOL_RECYCLE,
+        "pool_pre_ping": pre_ping,
+    }
+
+
+def build_engine(
+    url: str | None = None,
+    pgbouncer: bool | None = None,
+    pre_ping: bool | None = None,
+    **overrides: Any,
+) -> AsyncEngine:
+    """
+    Асинхронный движок с пулом из настроек, метриками пула
+    и профилировщиком запросов. overrides — любые параметры
+    create_async_engine поверх настроек.
+    """
+    options = engine_options(pgbouncer, pre_ping)
+    options.update(overrides)
+    new_engine = create_async_engine(
+        url or settings.DATABASE_URL, echo=False, **options
+    )
+
+    instrument_pool(new_engine.sync_engine)
+
+    @event.listens_for(new_engine.sync_engine, "handle_error")
+    def _on_error(context: Any) -> None:
+        if context.is_disconnect:
+            POOL_DISCONNECTS.inc()
+            logger.warning(
+                f"Соединение с БД потеряно, пул будет обновлён: "
+                f"{context.original_exception}"
+            )
+
+    # Все запросы движка попадают в профилировщик (отпечатки, N+1)
+    db_profiler.install(new_engine)
+    return new_engine
+
+
+# Создание асинхронного движка
+engine = build_engine()
 
 # Создание фабрики сессий
 AsyncSessionLocal = sessionmaker(
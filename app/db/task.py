@@ -42,6 +42,26 @@ class Task(Base, TimestampMixin):
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
     due_date = Column(DateTime, nullable=True)
+    status = Column(
+        Enum(
+            TaskStatus,
+            native_enum=False,
+            length=20,
+            values_callable=lambda e: [m.value for m in e],
+        ),
+        default=TaskStatus.PENDING,
+        nullable=False,
+    )
+    priority = Column(
+        Enum(
+            TaskPriority,
+            native_enum=False,
+            length=20,
+            values_callable=lambda e: [m.value for m in e],
+        ),
+        default=TaskPriority.MEDIUM,
+        nullable=False,
+    )
     deadline = Column(Date, nullable=True)  # Дедлайн для KPI
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=True)
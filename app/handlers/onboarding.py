@@ -3,10 +3,11 @@ from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, FSInputFile, Message
+from aiogram.types import CallbackQuery, Message
 
 from app.keyboards.onboarding import get_role_selection_keyboard
 from app.roles import ROLES
+from app.services.assets import asset_registry
 
 router = Router()
 
@@ -131,7 +132,6 @@ async def send_role_carousel(
 
     try:
         image_path = ROLE_IMAGES[role]
-        photo = FSInputFile(image_path)
 
         caption = (
             f"**{role_info['title']}**\n\n"
@@ -182,8 +182,9 @@ async def send_role_carousel(
 
         keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
 
-        await message.answer_photo(
-            photo=photo,
+        await asset_registry.answer_photo(
+            message,
+            image_path,
             caption=caption,
             reply_markup=keyboard,
             parse_mode="Markdown",
@@ -268,7 +269,6 @@ async def handle_role_selection(
     # Отправляем изображение с описанием
     try:
         image_path = ROLE_IMAGES[role]
-        photo = FSInputFile(image_path)
 
         caption = (
             f"**{role_info['title']}**\n\n"
@@ -279,8 +279,11 @@ async def handle_role_selection(
         if callback.message is not None and hasattr(
             callback.message, "answer_photo"
         ):
-            await callback.message.answer_photo(
-                photo=photo, caption=caption, parse_mode="Markdown"
+            await asset_registry.answer_photo(
+                callback.message,
+                image_path,
+                caption=caption,
+                parse_mode="Markdown",
             )
 
             # Обновляем клавиатуру для подтверждения
@@ -422,7 +425,6 @@ async def show_role_info(
 
     try:
         image_path = ROLE_IMAGES[role]
-        photo = FSInputFile(image_path)
 
         caption = (
             f"**{role_info['title']}**\n\n"
@@ -431,8 +433,11 @@ async def show_role_info(
         )
 
         if callback.message is not None:
-            await callback.message.answer_photo(
-                photo=photo, caption=caption, parse_mode="Markdown"
+            await asset_registry.answer_photo(
+                callback.message,
+                image_path,
+                caption=caption,
+                parse_mode="Markdown",
             )
 
             # Кнопка для выбора этой роли
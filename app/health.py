@@ -3,11 +3,11 @@ Health check endpoint for monitoring
 """
 
 import asyncio
+import hmac
 import os
 import time
 from typing import Dict, Any
 
-import redis.asyncio as redis
 import sentry_sdk
 from aiohttp import web
 from prometheus_client import generate_latest
@@ -16,6 +16,10 @@ from sqlalchemy import select
 from app.config import settings
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
+from app.services.performance_monitor import db_profiler
+from app.services.redis_pool import redis_registry
+from app.services.warmup import cache_warmer
+from app.services.update_queue import update_queue
 
 
 async def health_check(request: web.Request) -> web.Response:
@@ -51,18 +55,15 @@ async def health_check(request: web.Request) -> web.Response:
         # Check Redis connection
         redis_start = time.time()
         try:
-            redis_client = redis.from_url(
-                settings.REDIS_URL, decode_responses=True
-            )
-            await redis_client.ping()
+            # Общий клиент процесса: проверка не открывает соединений
+            await redis_registry.client("state").ping()
             redis_time = time.time() - redis_start
 
             health_data["redis"] = {
                 "status": "connected",
                 "response_time": round(redis_time * 1000, 2),  # ms
+                "pools": redis_registry.stats(),
             }
-
-            await redis_client.close()
         except Exception as redis_error:
             health_data["redis"] = {
                 "status": "error",
@@ -82,8 +83,10 @@ async def health_check(request: web.Request) -> web.Response:
         try:
             import psutil
 
+            # interval=None does not block the loop that also serves
+            # /webhook; CPU load is measured since the previous call
             health_data["system"] = {
-                "cpu_percent": psutil.cpu_percent(interval=1),
+                "cpu_percent": psutil.cpu_percent(interval=None),
                 "memory_percent": psutil.virtual_memory().percent,
                 "disk_percent": psutil.disk_usage("/").percent,
             }
@@ -157,6 +160,23 @@ async def detailed_health_check(request: web.Request) -> web.Response:
         )
 
 
+async def readiness(request: web.Request) -> web.Response:
+    """Готовность принимать трафик: после прогрева кешей"""
+    if not cache_warmer.ready or cache_warmer.report is None:
+        return web.json_response({"status": "warming_up"}, status=503)
+    return web.json_response(
+        {"status": "ready", "warmup": cache_warmer.report.as_dict()}
+    )
+
+
+async def query_stats(request: web.Request) -> web.Response:
+    """Статистика запросов к БД: отпечатки, медленные запросы, N+1"""
+    top = request.query.get("top", "20")
+    if not top.isdigit():
+        return web.json_response({"error": "top must be a number"}, status=400)
+    return web.json_response(db_profiler.get_query_stats(top=int(top)))
+
+
 async def init_health_app() -> web.Application:
     """Initialize health check app"""
     app = web.Application()
@@ -165,9 +185,42 @@ async def init_health_app() -> web.Application:
     app.router.add_get("/health/detailed", detailed_health_check)
     app.router.add_get("/", health_check)  # Root endpoint
     app.router.add_get("/metrics", metrics)  # Prometheus metrics
+    app.router.add_get("/health/queries", query_stats)
+    app.router.add_get("/ready", readiness)
+    app.router.add_get("/readyz", readiness)
+    if settings.BOT_MODE == "webhook":
+        # Без секрета любой, кто знает адрес, подделает апдейт от имени
+        # любого пользователя
+        if not settings.WEBHOOK_SECRET:
+            raise RuntimeError("WEBHOOK_SECRET обязателен в режиме webhook")
+        app.router.add_post(settings.WEBHOOK_PATH, telegram_webhook)
     return app
 
 
+async def telegram_webhook(request: web.Request) -> web.Response:
+    """Приём апдейтов Telegram: только кладём в очередь и сразу отвечаем"""
+    secret = settings.WEBHOOK_SECRET or ""
+    if not secret or not hmac.compare_digest(
+        request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret
+    ):
+        return web.Response(status=401)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+
+    try:
+        await update_queue.publish(payload)
+    except Exception as e:
+        # 5xx — Telegram повторит доставку апдейта
+        if sentry_sdk.Hub.current:
+            sentry_sdk.capture_exception(e)
+        return web.json_response({"error": str(e)}, status=503)
+
+    return web.Response(text="ok")
+
+
 async def metrics(request: web.Request) -> web.Response:
     """Prometheus metrics endpoint"""
     try:
@@ -1,9 +1,37 @@
-import importlib.resources
-from typing import Any, Dict
+"""
+Локализация: скомпилированный каталог строк.
+
+TOML-файлы при первом обращении разворачиваются в плоские словари
+("section.key" → строка) по одному на язык, с уже применённой цепочкой
+fallback. Готовый каталог можно сохранить в бинарный кэш
+(settings.I18N_CACHE_FILE), тогда при старте TOML не разбирается.
+"""
+
+import logging
+import os
+import pickle
+import string
+from pathlib import Path
+from typing import Any, Dict, Tuple
 
 import tomllib
 
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANG = "ru"
+CACHE_VERSION = 1
+
+# Цепочки fallback; язык без записи: сам язык → DEFAULT_LANG
+FALLBACKS: Dict[str, Tuple[str, ...]] = {}
+
+_DIR = Path(__file__).parent
+_formatter = string.Formatter()
+
 _cache: Dict[str, Dict[str, Any]] = {}
+_catalogs: Dict[str, Dict[str, str]] = {}
+_templates: Dict[Tuple[str, str], Tuple[str, bool]] = {}
 
 
 def load_lang(lang: str) -> Dict[str, Any]:
@@ -12,20 +40,96 @@ def load_lang(lang: str) -> Dict[str, Any]:
         return _cache[lang]
 
     try:
-        data = (
-            importlib.resources.files(__package__)
-            .joinpath(f"{lang}.toml")
-            .read_bytes()
-        )
+        data = (_DIR / f"{lang}.toml").read_bytes()
         _cache[lang] = tomllib.loads(data.decode())
         return _cache[lang]
     except (FileNotFoundError, tomllib.TOMLDecodeError):
         # Fallback к русскому языку
-        if lang != "ru":
-            return load_lang("ru")
+        if lang != DEFAULT_LANG:
+            return load_lang(DEFAULT_LANG)
         return {}
 
 
+def _flatten(node: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    flat: Dict[str, str] = {}
+    for key, value in node.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, str):
+            flat[path] = value
+    return flat
+
+
+def _sources() -> Dict[str, Path]:
+    return {path.stem: path for path in sorted(_DIR.glob("*.toml"))}
+
+
+def _fingerprint(sources: Dict[str, Path]) -> Tuple[Any, ...]:
+    return (CACHE_VERSION,) + tuple(
+        (lang, path.stat().st_mtime_ns, path.stat().st_size)
+        for lang, path in sources.items()
+    )
+
+
+def compile_catalog() -> Dict[str, Dict[str, str]]:
+    """Собрать плоские каталоги всех языков с учётом fallback"""
+    flat = {lang: _flatten(load_lang(lang)) for lang in _sources()}
+    catalogs = {}
+    for lang in flat:
+        chain = FALLBACKS.get(lang, (lang, DEFAULT_LANG))
+        merged: Dict[str, str] = {}
+        for source in reversed(chain):
+            merged.update(flat.get(source, {}))
+        catalogs[lang] = merged
+    return catalogs
+
+
+def _read_cache(path: str, fingerprint: Tuple[Any, ...]) -> Any:
+    try:
+        with open(path, "rb") as f:
+            cached_fingerprint, catalogs = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+        return None
+    return catalogs if cached_fingerprint == fingerprint else None
+
+
+def _write_cache(
+    path: str,
+    fingerprint: Tuple[Any, ...],
+    catalogs: Dict[str, Dict[str, str]],
+) -> None:
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump((fingerprint, catalogs), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить кэш локализации {path}: {e}")
+
+
+def _load_catalogs() -> Dict[str, Dict[str, str]]:
+    cache_file = settings.I18N_CACHE_FILE
+    if not cache_file:
+        return compile_catalog()
+    fingerprint = _fingerprint(_sources())
+    catalogs = _read_cache(cache_file, fingerprint)
+    if catalogs is None:
+        catalogs = compile_catalog()
+        _write_cache(cache_file, fingerprint, catalogs)
+    return catalogs
+
+
+def catalog(lang: str = DEFAULT_LANG) -> Dict[str, str]:
+    """Плоский каталог языка (неизвестный язык → DEFAULT_LANG)"""
+    if not _catalogs:
+        _catalogs.update(_load_catalogs())
+    found = _catalogs.get(lang)
+    if found is None:
+        found = _catalogs.get(DEFAULT_LANG, {})
+    return found
+
+
 def t(key: str, lang: str = "ru") -> str:
     """
     Получает локализованную строку по ключу
@@ -37,18 +141,59 @@ def t(key: str, lang: str = "ru") -> str:
     Returns:
         Локализованная строка или ключ, если строка не найдена
     """
-    parts = key.split(".")
-    node: Any = load_lang(lang)
+    return catalog(lang).get(key, key)
+
 
-    for part in parts:
-        if isinstance(node, dict):
-            node = node.get(part, {})
-        else:
-            return key
+class _KeepMissing(dict):  # type: ignore[type-arg]
+    def __missing__(self, key: str) -> str:
+        return f"{{{key}}}"
 
-    return str(node) if isinstance(node, str) else key
+
+def _template(key: str, lang: str) -> Tuple[str, bool]:
+    """Разобрать шаблон один раз: есть ли в нём поля для подстановки"""
+    text = t(key, lang)
+    try:
+        has_fields = any(
+            name is not None for _, name, _, _ in _formatter.parse(text)
+        )
+    except ValueError:
+        # Непарные скобки: строка выводится как есть
+        has_fields = False
+    else:
+        if not has_fields:
+            text = text.format()
+    _templates[(lang, key)] = (text, has_fields)
+    return text, has_fields
+
+
+def t_format(key: str, lang: str = "ru", **kwargs: Any) -> str:
+    """
+    Локализованная строка с подстановкой параметров.
+
+    Разобранный шаблон кэшируется; отсутствующие параметры остаются
+    в тексте как {name}, а не роняют хэндлер.
+    """
+    try:
+        text, has_fields = _templates[(lang, key)]
+    except KeyError:
+        text, has_fields = _template(key, lang)
+    if not has_fields:
+        return text
+    try:
+        return text.format_map(kwargs)
+    except KeyError as e:
+        logger.warning(f"{key}: не хватает параметра {e}")
+    except (AttributeError, IndexError, ValueError) as e:
+        logger.warning(f"{key}: ошибка подстановки параметров: {e}")
+        return text
+    try:
+        return text.format_map(_KeepMissing(kwargs))
+    except (AttributeError, IndexError, ValueError):
+        return text
 
 
 def clear_cache() -> None:
     """Очищает кэш локализации (для разработки)"""
     _cache.clear()
+    _catalogs.clear()
+    _templates.clear()
@@ -1,4 +1,6 @@
 # app/keyboards/main_menu.py
+from dataclasses import dataclass
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from app.i18n import t
@@ -49,204 +51,188 @@ def get_back_btn(nonce: str = "") -> InlineKeyboardButton:
     )
 
 
-def menu(
-    role: str, lang: str = "ru", theme: str = "light", nonce: str = ""
-) -> InlineKeyboardMarkup:
+# Шаблон меню: ряды кнопок (текст, действие); callback_data собирается
+# как "{nonce}:{действие}", кроме действий из RAW_ACTIONS
+Layout = tuple[tuple[tuple[str, str], ...], ...]
+
+RAW_ACTIONS = frozenset({"switch_theme"})
+BACK_TO_DEMO = ("🔙 Вернуться к демо-меню", "switch_super")
+
+
+def _layout(role: str, lang: str, theme: str) -> Layout:
     e = EMOJI[theme]  # Получаем эмодзи для текущей темы
 
     if role == "super":  # Демо-учётка → меню переключения ролей
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text="👩‍🏫 Учитель",
-                    callback_data=f"{nonce}:switch_teacher",
-                ),
-                InlineKeyboardButton(
-                    text="🏛 Админ", callback_data=f"{nonce}:switch_admin"
-                ),
-            ],
-            [
-                InlineKeyboardButton(
-                    text="📈 Директор",
-                    callback_data=f"{nonce}:switch_director",
-                ),
-                InlineKeyboardButton(
-                    text="👪 Родитель", callback_data=f"{nonce}:switch_parent"
-                ),
-            ],
-            [
-                InlineKeyboardButton(
-                    text="👨‍🎓 Ученик", callback_data=f"{nonce}:switch_student"
-                ),
-                InlineKeyboardButton(
-                    text="🧑‍⚕️ Психолог", callback_data=f"{nonce}:switch_psych"
-                ),
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            (
+                ("👩‍🏫 Учитель", "switch_teacher"),
+                ("🏛 Админ", "switch_admin"),
+            ),
+            (
+                ("📈 Директор", "switch_director"),
+                ("👪 Родитель", "switch_parent"),
+            ),
+            (
+                ("👨‍🎓 Ученик", "switch_student"),
+                ("🧑‍⚕️ Психолог", "switch_psych"),
+            ),
+        )
 
     # «обычные» меню-заглушки
     if role == "teacher":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['teacher_notes']} {t('teacher.menu_notes', lang)}",
-                    callback_data=f"{nonce}:teacher_notes",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['teacher_add']} {t('teacher.menu_add', lang)}",
-                    callback_data=f"{nonce}:teacher_add",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['teacher_ticket']} {t('teacher.ticket_prompt', lang)}",
-                    callback_data=f"{nonce}:teacher_ticket",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['teacher_media']} Заявка в медиацентр",
-                    callback_data=f"{nonce}:teacher_media",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
-                )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            (
+                (
+                    f"{e['teacher_notes']} {t('teacher.menu_notes', lang)}",
+                    "teacher_notes",
+                ),
+            ),
+            (
+                (
+                    f"{e['teacher_add']} {t('teacher.menu_add', lang)}",
+                    "teacher_add",
+                ),
+            ),
+            (
+                (
+                    f"{e['teacher_ticket']} "
+                    f"{t('teacher.ticket_prompt', lang)}",
+                    "teacher_ticket",
+                ),
+            ),
+            ((f"{e['teacher_media']} Заявка в медиацентр", "teacher_media"),),
+            (BACK_TO_DEMO,),
+        )
 
     if role == "admin":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['admin_broadcast']} Рассылка",
-                    callback_data=f"{nonce}:admin_broadcast",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['admin_tickets']} Заявки IT",
-                    callback_data=f"{nonce}:admin_tickets",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['admin_media']} Медиацентр",
-                    callback_data=f"{nonce}:admin_media",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
-                )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            ((f"{e['admin_broadcast']} Рассылка", "admin_broadcast"),),
+            ((f"{e['admin_tickets']} Заявки IT", "admin_tickets"),),
+            ((f"{e['admin_media']} Медиацентр", "admin_media"),),
+            (BACK_TO_DEMO,),
+        )
 
     if role == "parent":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['par_tasks']} Задания ребёнка",
-                    callback_data=f"{nonce}:parent_tasks",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['par_cert']} Заказать справку",
-                    callback_data=f"{nonce}:parent_cert",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
-                )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            ((f"{e['par_tasks']} Задания ребёнка", "parent_tasks"),),
+            ((f"{e['par_cert']} Заказать справку", "parent_cert"),),
+            (BACK_TO_DEMO,),
+        )
 
     if role == "director":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['stub']} KPI", callback_data=f"{nonce}:stub"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="⏱ Поручения", callback_data=f"{nonce}:director_tasks"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
-                )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            ((f"{e['stub']} KPI", "stub"),),
+            (("⏱ Поручения", "director_tasks"),),
+            (BACK_TO_DEMO,),
+        )
 
     if role == "student":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['stu_tasks']} Задания",
-                    callback_data=f"{nonce}:stu_tasks",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=f"{e['stu_help']} Психолог",
-                    callback_data=f"{nonce}:stu_help",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
-                )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
+        return (
+            ((f"{e['stu_tasks']} Задания", "stu_tasks"),),
+            ((f"{e['stu_help']} Психолог", "stu_help"),),
+            (BACK_TO_DEMO,),
+        )
 
     if role == "psych":
-        kb = [
-            [
-                InlineKeyboardButton(
-                    text=f"{e['psy_inbox']} {t('psych.menu_requests', lang)}",
-                    callback_data=f"{nonce}:psych_inbox",
-                )
-            ],
+        return (
+            (
+                (
+                    f"{e['psy_inbox']} {t('psych.menu_requests', lang)}",
+                    "psych_inbox",
+                ),
+            ),
+            (BACK_TO_DEMO,),
+        )
+
+    # Прочие роли: только кнопка переключения темы
+    return (((f"{e['theme']} Тема", "switch_theme"),),)
+
+
+@dataclass(frozen=True, slots=True)
+class MenuTemplate:
+    """Провалидированные кнопки меню; nonce подставляется при выдаче"""
+
+    markup: InlineKeyboardMarkup
+    actions: tuple[tuple[str | None, ...], ...]
+
+    def render(self, nonce: str) -> InlineKeyboardMarkup:
+        # model_copy не запускает валидацию: копируется только __dict__
+        rows = [
             [
-                InlineKeyboardButton(
-                    text="🔙 Вернуться к демо-меню",
-                    callback_data=f"{nonce}:switch_super",
+                (
+                    button
+                    if action is None
+                    else button.model_copy(
+                        update={"callback_data": f"{nonce}:{action}"}
+                    )
                 )
-            ],
-        ]
-        return InlineKeyboardMarkup(inline_keyboard=kb)
-
-    mapping: dict[str, list[str]] = {}
-    kb = [
-        [InlineKeyboardButton(text=text, callback_data=f"{nonce}:stub")]
-        for text in sum(mapping.get(role, []), [])
-    ]
-
-    # Добавляем кнопку переключения темы во все меню
-    kb.append(
-        [
-            InlineKeyboardButton(
-                text=f"{e['theme']} Тема", callback_data="switch_theme"
+                for button, action in zip(buttons, actions)
+            ]
+            for buttons, actions in zip(
+                self.markup.inline_keyboard, self.actions
             )
         ]
-    )
+        return self.markup.model_copy(update={"inline_keyboard": rows})
+
+
+_templates: dict[tuple[str, str, str], MenuTemplate] = {}
+
+
+def compile_menu(role: str, lang: str, theme: str) -> MenuTemplate:
+    """Шаблон меню для (роль, язык, тема), собирается один раз"""
+    key = (role, lang, theme)
+    template = _templates.get(key)
+    if template is None:
+        layout = _layout(role, lang, theme)
+        template = _templates[key] = MenuTemplate(
+            markup=InlineKeyboardMarkup(
+                inline_keyboard=[
+                    [
+                        InlineKeyboardButton(
+                            text=text,
+                            callback_data=(
+                                action
+                                if action in RAW_ACTIONS
+                                else f":{action}"
+                            ),
+                        )
+                        for text, action in row
+                    ]
+                    for row in layout
+                ]
+            ),
+            actions=tuple(
+                tuple(
+                    None if action in RAW_ACTIONS else action
+                    for _, action in row
+                )
+                for row in layout
+            ),
+        )
+    return template
 
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+
+def menu(
+    role: str, lang: str = "ru", theme: str = "light", nonce: str = ""
+) -> InlineKeyboardMarkup:
+    template = compile_menu(role, lang, theme)
+    if not nonce:
+        # Без nonce разметка одинакова для всех: отдаём готовый объект
+        # (объекты aiogram неизменяемы, его можно переиспользовать)
+        return template.markup
+    return template.render(nonce)
+
+
+def precompile_menus(langs: tuple[str, ...] = ("ru", "en")) -> int:
+    """Собрать шаблоны всех меню заранее, например при старте бота"""
+    roles = ("super", "teacher", "admin", "parent", "director", "student")
+    for role in (*roles, "psych", ""):
+        for lang in langs:
+            for theme in EMOJI:
+                compile_menu(role, lang, theme)
+    return len(_templates)
+
+
+def clear_menu_cache() -> None:
+    """Сбросить шаблоны (например, после перезагрузки переводов)"""
+    _templates.clear()
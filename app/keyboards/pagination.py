@@ -0,0 +1,50 @@
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.repositories.pagination import Page
+
+# callback_data кнопок листания: "pg:{раздел}:{курсор}"
+PAGE_PREFIX = "pg"
+
+
+def page_data(section: str, cursor: str = "") -> str:
+    return f"{PAGE_PREFIX}:{section}:{cursor}"
+
+
+def page_cursor(data: str | None, section: str) -> str | None:
+    """Курсор из callback_data; первый экран раздела → None"""
+    prefix = page_data(section)
+    if data and data.startswith(prefix):
+        return data[len(prefix) :] or None
+    return None
+
+
+def page_nav(
+    section: str, page: Page, nonce: str = ""
+) -> list[InlineKeyboardButton]:
+    """Ряд «назад/вперёд»; пустой, если страница единственная"""
+    row = []
+    if page.prev_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text="⬅️",
+                callback_data=f"{nonce}:{page_data(section, page.prev_cursor)}",
+            )
+        )
+    if page.next_cursor:
+        row.append(
+            InlineKeyboardButton(
+                text="➡️",
+                callback_data=f"{nonce}:{page_data(section, page.next_cursor)}",
+            )
+        )
+    return row
+
+
+def with_page_nav(
+    markup: InlineKeyboardMarkup, section: str, page: Page, nonce: str = ""
+) -> InlineKeyboardMarkup:
+    """Добавить листание над кнопками меню"""
+    row = page_nav(section, page, nonce)
+    if not row:
+        return markup
+    return InlineKeyboardMarkup(inline_keyboard=[row, *markup.inline_keyboard])
@@ -7,10 +7,9 @@ from typing import Any, Awaitable, Callable
 
 from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject
-from sqlalchemy import select
 
-from app.db.session import AsyncSessionLocal
-from app.db.user import User
+from app.middlewares.current_user import CURRENT_USER_KEY
+from app.schemas.user import UserSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +24,7 @@ class AuditMiddleware(BaseMiddleware):
         data: dict[str, Any],
     ) -> Any:
         # Получаем информацию о пользователе
-        user_info = await self._get_user_info(event)
+        user_info = self._get_user_info(data)
 
         # Логируем действие
         await self._log_action(event, user_info)
@@ -35,36 +34,28 @@ class AuditMiddleware(BaseMiddleware):
 
         return result
 
-    async def _get_user_info(self, event: TelegramObject) -> dict[str, Any]:
-        """Получить информацию о пользователе"""
-        try:
-            if hasattr(event, "from_user") and event.from_user:
-                async with AsyncSessionLocal() as s:
-                    user = await s.scalar(
-                        select(User).where(User.tg_id == event.from_user.id)
-                    )
-                    if user:
-                        return {
-                            "user_id": user.id,
-                            "tg_id": user.tg_id,
-                            "role": user.role,
-                            "username": user.username,
-                            "first_name": user.first_name,
-                            "last_name": user.last_name,
-                        }
-                    else:
-                        return {
-                            "tg_id": event.from_user.id,
-                            "role": "unknown",
-                            "username": event.from_user.username,
-                            "first_name": event.from_user.first_name,
-                            "last_name": event.from_user.last_name,
-                        }
-        except Exception as e:
-            logger.error(
-                f"Ошибка при получении информации о пользователе: {e}"
-            )
-            return {"error": str(e)}
+    def _get_user_info(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Получить информацию о пользователе из снимка CurrentUserMiddleware"""
+        user: UserSnapshot | None = data.get(CURRENT_USER_KEY)
+        if user is not None:
+            return {
+                "user_id": user.id,
+                "tg_id": user.tg_id,
+                "role": user.role,
+                "username": user.username,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+            }
+
+        from_user = data.get("event_from_user")
+        if from_user is not None:
+            return {
+                "tg_id": from_user.id,
+                "role": "unknown",
+                "username": from_user.username,
+                "first_name": from_user.first_name,
+                "last_name": from_user.last_name,
+            }
         return {"error": "unknown"}
 
     async def _log_action(
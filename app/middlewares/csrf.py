@@ -3,10 +3,26 @@ from typing import Any
 from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery
 
-from app.utils.csrf import check_nonce
+from app.config import settings
+from app.utils import csrf
 
 
 class CSRFMiddleware(BaseMiddleware):
+    def __init__(self, mode: str | None = None) -> None:
+        self.mode = mode or settings.CSRF_MODE
+
+    async def _is_valid(
+        self, data: Any, chat_id: int, user_id: int, nonce: str, action: str
+    ) -> bool:
+        if self.mode == "signed":
+            # Подпись проверяется в процессе, без обращения к Redis
+            return csrf.verify_token(
+                nonce, chat_id, user_id, action
+            ) or csrf.verify_token(nonce, chat_id, user_id)
+        return await csrf.check_nonce(
+            data["dp"].storage, chat_id, user_id, nonce
+        )
+
     async def __call__(self, handler: Any, event: Any, data: Any) -> Any:
         if isinstance(event, CallbackQuery):
             if event.data is None:
@@ -22,14 +38,21 @@ class CSRFMiddleware(BaseMiddleware):
             if event.message is None:
                 await event.answer("⛔️ Ошибка сообщения.", show_alert=True)
                 return
-            ok = await check_nonce(
-                data["dp"].storage,
+            ok = await self._is_valid(
+                data,
                 event.message.chat.id,
                 event.from_user.id,
                 nonce,
+                real_data,
             )
             if not ok:
                 await event.answer("⚠️ Неверный токен.", show_alert=True)
                 return
             event.data = real_data  # подменяем для хэндлеров
+            # Токен для кнопок, которые хэндлер выдаст в ответ
+            data["nonce"] = (
+                csrf.issue_token(event.message.chat.id, event.from_user.id)
+                if self.mode == "signed"
+                else nonce
+            )
         return await handler(event, data)
@@ -0,0 +1,80 @@
+"""
+Middleware, загружающий пользователя один раз на апдейт
+"""
+
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from aiogram.types import User as TgUser
+
+from app.schemas.user import UserSnapshot
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# Ключ, под которым снимок пользователя доступен в data и в хэндлерах
+CURRENT_USER_KEY = "current_user"
+
+
+class _NotLoaded:
+    """Значение current_user по умолчанию: middleware не запускался"""
+
+    def __repr__(self) -> str:
+        return "NOT_LOADED"
+
+
+# None в current_user — пользователь не найден; NOT_LOADED — не искали.
+# Хэндлеры с запасным запросом объявляют current_user = NOT_LOADED
+NOT_LOADED: Any = _NotLoaded()
+
+
+async def load_user_snapshot(tg_id: int) -> UserSnapshot | None:
+    """Загрузить снимок пользователя через двухуровневый кеш"""
+    return await cache_service.get_user_snapshot(tg_id)
+
+
+async def resolve_user(
+    current_user: UserSnapshot | None,
+    tg_id: int,
+    load: Callable[[int], Awaitable[Any]],
+) -> Any:
+    """
+    Пользователь апдейта. Результат middleware берётся как есть, в том
+    числе None для незарегистрированного; load(tg_id) — только если
+    middleware не запускался (хэндлер вызван напрямую).
+    """
+    if current_user is NOT_LOADED:
+        return await load(tg_id)
+    return current_user
+
+
+class CurrentUserMiddleware(BaseMiddleware):
+    """
+    Outer-middleware уровня update: разрешает пользователя один раз
+    и кладёт неизменяемый UserSnapshot в data["current_user"].
+
+    Регистрируется после встроенного UserContextMiddleware aiogram,
+    поэтому event_from_user уже лежит в data.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if CURRENT_USER_KEY not in data:
+            from_user: TgUser | None = data.get("event_from_user")
+            snapshot = None
+            if from_user is not None:
+                try:
+                    snapshot = await load_user_snapshot(from_user.id)
+                except Exception as e:
+                    logger.error(
+                        f"Ошибка при загрузке пользователя {from_user.id}: {e}"
+                    )
+            data[CURRENT_USER_KEY] = snapshot
+
+        return await handler(event, data)
@@ -0,0 +1,35 @@
+"""
+Middleware подсчёта запросов к БД на апдейт
+"""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.services.performance_monitor import db_profiler
+
+
+class QueryCountMiddleware(BaseMiddleware):
+    """
+    Outer-middleware уровня update: все запросы, выполненные при обработке
+    апдейта (включая загрузку пользователя), относятся к нему. По итогам
+    пишется db_queries_per_update и проверяется N+1.
+
+    Регистрируется первым из outer-middleware апдейта.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        token, queries = db_profiler.begin_update()
+        try:
+            return await handler(event, data)
+        finally:
+            label = ""
+            if isinstance(event, Update):
+                label = f"{event.event_type} #{event.update_id}"
+            db_profiler.end_update(token, queries, label)
@@ -3,19 +3,77 @@ Middleware для показа индикаторов загрузки
 """
 
 import asyncio
+import logging
 from typing import Any, Awaitable, Callable
+from weakref import WeakKeyDictionary
 
-from aiogram import BaseMiddleware, Bot
+from aiogram import BaseMiddleware, Bot, Router
+from aiogram.dispatcher.flags import get_flag
+from aiogram.exceptions import TelegramAPIError
 from aiogram.types import CallbackQuery, Message, TelegramObject
+from prometheus_client import Counter
 
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Telegram показывает действие 5 секунд: для долгих хэндлеров повторяем
+REPEAT_INTERVAL = 4.5
+
+TYPING_INDICATOR = Counter(
+    "bot_typing_indicator_total",
+    "Handlers that did (sent) or did not (skipped) need a chat action",
+    ["result"],
+)
+
+# Настройки индикатора для отдельных роутеров: (задержка, действие);
+# задержка None отключает индикатор
+_router_settings: "WeakKeyDictionary[Router, tuple[float | None, str]]" = (
+    WeakKeyDictionary()
+)
 
-class LoadingMiddleware(BaseMiddleware):
-    """Middleware для показа индикаторов загрузки"""
 
-    def __init__(self, bot: Bot, min_delay: float = 0.5):
+def set_typing(
+    router: Router, delay: float | None, action: str = "typing"
+) -> None:
+    """Задать задержку и действие индикатора для хэндлеров роутера"""
+    _router_settings[router] = (delay, action)
+
+
+class LoadingMiddleware(BaseMiddleware):
+    """
+    Отложенный индикатор загрузки.
+
+    Действие ("бот печатает") отправляется, только если хэндлер работает
+    дольше delay, и снимается с его завершением: быстрые ответы обходятся
+    без лишнего запроса к API и без задержки. Настройка по приоритету:
+    флаг хэндлера typing (число — задержка, строка — действие, False —
+    выключить), set_typing для роутера, параметры middleware.
+    """
+
+    def __init__(
+        self, bot: Bot, delay: float | None = None, action: str = "typing"
+    ):
         super().__init__()
         self.bot = bot
-        self.min_delay = min_delay
+        self.delay = settings.TYPING_DELAY if delay is None else delay
+        self.action = action
+
+    def _settings(self, data: dict[str, Any]) -> tuple[float | None, str]:
+        delay: float | None = self.delay
+        action = self.action
+        router = data.get("event_router")
+        if router is not None and router in _router_settings:
+            delay, action = _router_settings[router]
+
+        flag = get_flag(data, "typing")
+        if flag is False:
+            delay = None
+        elif isinstance(flag, str):
+            action = flag
+        elif isinstance(flag, (int, float)) and flag is not True:
+            delay = flag
+        return delay, action
 
     async def __call__(
         self,
@@ -23,44 +81,39 @@ class LoadingMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        """Обрабатывает событие с показом индикатора загрузки"""
+        """Обрабатывает событие с отложенным индикатором загрузки"""
 
         # Определяем chat_id в зависимости от типа события
         if isinstance(event, Message):
-            chat_id: int = event.chat.id
+            chat_id: int | None = event.chat.id
         elif isinstance(event, CallbackQuery):
             chat_id = event.message.chat.id if event.message else None
         else:
             chat_id = None
 
-        if not chat_id:
+        delay, action = self._settings(data)
+        if not chat_id or delay is None:
             return await handler(event, data)
 
-        # Показываем индикатор "бот печатает"
-        await self.bot.send_chat_action(chat_id, "typing")
+        sent = 0
 
-        # Засекаем время начала
-        start_time = asyncio.get_event_loop().time()
+        async def indicate() -> None:
+            nonlocal sent
+            await asyncio.sleep(delay)
+            while True:
+                try:
+                    await self.bot.send_chat_action(chat_id, action)
+                except TelegramAPIError as e:
+                    logger.debug(f"Не удалось отправить {action}: {e}")
+                sent += 1
+                await asyncio.sleep(REPEAT_INTERVAL)
 
+        indicator = asyncio.create_task(indicate())
         try:
-            # Выполняем обработчик
-            result = await handler(event, data)
-
-            # Вычисляем время выполнения
-            execution_time = asyncio.get_event_loop().time() - start_time
-
-            # Если выполнение заняло меньше минимального времени, добавляем задержку
-            if execution_time < self.min_delay:
-                remaining_delay = self.min_delay - execution_time
-                await asyncio.sleep(remaining_delay)
-
-            return result
-
-        except Exception as e:
-            # В случае ошибки также показываем индикатор
-            await self.bot.send_chat_action(chat_id, "typing")
-            await asyncio.sleep(0.3)
-            raise e
+            return await handler(event, data)
+        finally:
+            indicator.cancel()
+            TYPING_INDICATOR.labels("sent" if sent else "skipped").inc()
 
 
 class LongOperationMiddleware(BaseMiddleware):
@@ -4,13 +4,34 @@ from aiogram import BaseMiddleware
 from aiogram.types import Message, TelegramObject
 
 from app.i18n import t
-from app.services.limiter import hit
+from app.services import limiter
+
+# Лимиты сообщений в окно по ролям; остальные роли получают limit
+ROLE_LIMITS: dict[str, int] = {
+    "teacher": 40,
+    "psych": 40,
+    "admin": 60,
+    "director": 60,
+    "super": 120,
+}
 
 
 class RateLimitMiddleware(BaseMiddleware):
-    def __init__(self, limit: int = 20, window: int = 60) -> None:
+    def __init__(
+        self,
+        limit: int = 20,
+        window: int = 60,
+        role_limits: dict[str, int] | None = None,
+    ) -> None:
         self.limit = limit
         self.window = window
+        self.role_limits = ROLE_LIMITS if role_limits is None else role_limits
+
+    def limit_for(self, data: dict[str, Any]) -> int:
+        """Лимит для роли текущего пользователя"""
+        user = data.get("current_user")
+        role = getattr(user, "role", None)
+        return self.role_limits.get(role, self.limit) if role else self.limit
 
     async def __call__(
         self,
@@ -21,8 +42,8 @@ class RateLimitMiddleware(BaseMiddleware):
         if isinstance(event, Message):
             if event.from_user is None:
                 return await handler(event, data)
-            res = await hit(
-                f"rl:{event.from_user.id}", self.limit, self.window
+            res = await limiter.hit(
+                f"rl:{event.from_user.id}", self.limit_for(data), self.window
             )
             if not res.allowed:
                 lang = data.get("lang", "ru")
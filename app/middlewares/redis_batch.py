@@ -0,0 +1,30 @@
+"""
+Middleware пакетной записи в Redis на апдейт
+"""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.services.redis_pool import begin_batch, end_batch
+
+
+class RedisBatchMiddleware(BaseMiddleware):
+    """
+    Outer-middleware уровня update: команды Redis из блоков batch(),
+    выполненные при обработке апдейта, уходят одним pipeline на клиента
+    после хэндлера.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        token = begin_batch()
+        try:
+            return await handler(event, data)
+        finally:
+            await end_batch(token)
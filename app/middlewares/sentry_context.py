@@ -1,21 +1,17 @@
 from typing import Any
 
 from aiogram import BaseMiddleware
-from sqlalchemy import select
 
-from app.db.session import AsyncSessionLocal
-from app.db.user import User
+from app.middlewares.current_user import CURRENT_USER_KEY
+from app.schemas.user import UserSnapshot
 from app.utils.sentry import enrich_scope
 
+# Заглушка для неавторизованных пользователей
+GUEST = UserSnapshot(id=0, tg_id=None, role="guest", login="unknown")
+
 
 class SentryContext(BaseMiddleware):
     async def __call__(self, handler: Any, event: Any, data: Any) -> Any:
         if data.get("sentry_enabled", False):
-            async with AsyncSessionLocal() as s:
-                user = await s.scalar(
-                    select(User).where(User.tg_id == event.from_user.id)
-                )
-            await enrich_scope(
-                event, user or User(login="unknown", role="guest")
-            )
+            await enrich_scope(event, data.get(CURRENT_USER_KEY) or GUEST)
         return await handler(event, data)
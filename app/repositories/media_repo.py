@@ -6,6 +6,7 @@ from sqlalchemy import select, update
 from app.db.enums import Status
 from app.db.media_request import MediaRequest
 from app.db.session import AsyncSessionLocal
+from app.repositories.pagination import Page, paginate
 
 
 async def create(
@@ -31,6 +32,21 @@ async def list_all() -> List[MediaRequest]:
         return list(rows)
 
 
+async def page_all(
+    cursor: str | None = None, limit: int | None = None
+) -> Page[MediaRequest]:
+    """Страница медиа-заявок, новые сверху"""
+    async with AsyncSessionLocal() as s:
+        return await paginate(
+            s,
+            select(MediaRequest),
+            MediaRequest.created_at,
+            MediaRequest.id,
+            cursor,
+            limit,
+        )
+
+
 async def set_status(req_id: int, status: Status) -> bool:
     try:
         async with AsyncSessionLocal() as s:
@@ -5,6 +5,9 @@ from sqlalchemy import select
 
 from app.db.note import Note
 from app.db.session import AsyncSessionLocal
+from app.repositories.pagination import Page, paginate
+from app.repositories.stats_repo import request_kpi_refresh
+from app.services.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,8 @@ async def create_note(teacher_id: int, student: str, text: str) -> None:
             note = Note(teacher_id=teacher_id, student_name=student, text=text)
             s.add(note)
             await s.commit()
+        await cache_service.invalidate_user_notes(teacher_id)
+        request_kpi_refresh()
     except Exception as e:
         logger.error(f"Ошибка при создании заметки: {e}")
         raise
@@ -34,3 +39,22 @@ async def list_notes(teacher_id: int) -> List[Note]:
     except Exception as e:
         logger.error(f"Ошибка при получении заметок: {e}")
         return []
+
+
+async def page_notes(
+    teacher_id: int, cursor: str | None = None, limit: int | None = None
+) -> Page[Note]:
+    """Страница заметок учителя, новые сверху"""
+    try:
+        async with AsyncSessionLocal() as s:
+            return await paginate(
+                s,
+                select(Note).where(Note.teacher_id == teacher_id),
+                Note.created_at,
+                Note.id,
+                cursor,
+                limit,
+            )
+    except Exception as e:
+        logger.error(f"Ошибка при получении заметок: {e}")
+        return Page()
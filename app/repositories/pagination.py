@@ -0,0 +1,124 @@
+"""
+Keyset-пагинация списков по (created_at, id).
+
+Страница выбирается условием по индексу, а не OFFSET: стоимость запроса
+не зависит от номера страницы и размера таблицы. Курсор — короткая
+непрозрачная строка для callback_data: направление, created_at
+в микросекундах (наивное время считается UTC) и id в base36.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+T = TypeVar("T")
+
+NEXT = "n"
+PREV = "p"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+@dataclass(frozen=True, slots=True)
+class Page(Generic[T]):
+    """Страница списка и курсоры соседних страниц"""
+
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def _b36(value: int) -> str:
+    out = ""
+    while True:
+        value, rem = divmod(value, 36)
+        out = _DIGITS[rem] + out
+        if not value:
+            return out
+
+
+def encode_cursor(direction: str, created_at: datetime, row_id: int) -> str:
+    """Курсор на строку: следующая/предыдущая страница от неё"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{direction}{_b36(micros)}.{_b36(row_id)}"
+
+
+def decode_cursor(cursor: str | None) -> Optional[Tuple[str, datetime, int]]:
+    """Разобрать курсор; мусор из callback_data → None (первая страница)"""
+    if not cursor or cursor[0] not in (NEXT, PREV):
+        return None
+    try:
+        micros, row_id = cursor[1:].split(".")
+        created_at = _EPOCH + timedelta(microseconds=int(micros, 36))
+        return cursor[0], created_at, int(row_id, 36)
+    except (ValueError, OverflowError):
+        return None
+
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select[Any],
+    created_col: Any,
+    id_col: Any,
+    cursor: str | None = None,
+    limit: int | None = None,
+    descending: bool = True,
+) -> Page[Any]:
+    """
+    Выбрать страницу stmt по курсору.
+
+    stmt — select(Model) с фильтрами, но без ORDER BY; порядок задаётся
+    здесь по (created_col, id_col). Читается limit + 1 строка: лишняя
+    показывает, есть ли страница дальше.
+    """
+    limit = limit or settings.PAGE_SIZE
+    position = decode_cursor(cursor)
+    direction = position[0] if position else NEXT
+    # Назад по убывающему списку — вперёд по возрастающему и наоборот
+    forward_desc = descending == (direction == NEXT)
+
+    key = tuple_(created_col, id_col)
+    if position is not None:
+        _, created_at, row_id = position
+        if not getattr(created_col.type, "timezone", False):
+            # timestamp without time zone: сравниваем с наивным значением
+            created_at = created_at.replace(tzinfo=None)
+        bound = tuple_(created_at, row_id)
+        stmt = stmt.where(key < bound if forward_desc else key > bound)
+    if forward_desc:
+        stmt = stmt.order_by(created_col.desc(), id_col.desc())
+    else:
+        stmt = stmt.order_by(created_col.asc(), id_col.asc())
+
+    rows = list(await session.scalars(stmt.limit(limit + 1)))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == PREV:
+        rows.reverse()
+    if not rows:
+        return Page()
+
+    first, last = rows[0], rows[-1]
+    more_after = has_more if direction == NEXT else True
+    more_before = has_more if direction == PREV else position is not None
+    return Page(
+        items=rows,
+        next_cursor=(
+            encode_cursor(NEXT, last.created_at, last.id)
+            if more_after
+            else None
+        ),
+        prev_cursor=(
+            encode_cursor(PREV, first.created_at, first.id)
+            if more_before
+            else None
+        ),
+    )
@@ -5,6 +5,7 @@ from sqlalchemy import select, update
 from app.db.enums import Status
 from app.db.psych_request import PsychRequest
 from app.db.session import AsyncSessionLocal
+from app.repositories.pagination import Page, paginate
 
 
 async def create(from_id: int, text: str | None, file_id: str | None) -> None:
@@ -23,6 +24,22 @@ async def list_open() -> List[PsychRequest]:
         return list(rows)
 
 
+async def page_open(
+    cursor: str | None = None, limit: int | None = None
+) -> Page[PsychRequest]:
+    """Страница открытых обращений, старые сверху (как в list_open)"""
+    async with AsyncSessionLocal() as s:
+        return await paginate(
+            s,
+            select(PsychRequest).where(PsychRequest.status == Status.open),
+            PsychRequest.created_at,
+            PsychRequest.id,
+            cursor,
+            limit,
+            descending=False,
+        )
+
+
 async def list_all() -> List[PsychRequest]:
     async with AsyncSessionLocal() as s:
         rows = await s.scalars(
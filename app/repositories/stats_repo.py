@@ -1,61 +1,155 @@
+import asyncio
+import logging
 from datetime import date
 from typing import Any, Dict
 
 from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 
+from app.db.enums import Status
+from app.db.kpi_rollup import KpiRollup
 from app.db.note import Note
 from app.db.session import AsyncSessionLocal
 from app.db.task import Task, TaskStatus
 from app.db.ticket import Ticket
+from app.db.user import User
+from app.roles import UserRole
 
+logger = logging.getLogger(__name__)
 
-async def kpi_summary() -> Dict[str, Any]:
-    """Получить сводку KPI метрик"""
+# Задержка пересчёта после записи: серия изменений схлопывается в один
+KPI_REFRESH_DEBOUNCE = 2.0
+
+KPI_KEYS = (
+    "notes_total",
+    "tickets_total",
+    "tickets_done",
+    "tickets_open",
+    "tasks_total",
+    "tasks_done",
+    "tasks_pending",
+    "overdue",
+    *(f"users_{role.value}" for role in UserRole),
+)
+
+
+def kpi_query() -> Any:
+    """
+    Все KPI одним запросом: по одному агрегирующему подзапросу на таблицу
+    с COUNT(*) FILTER (...), каждая таблица читается один раз.
+    """
+    notes = select(func.count().label("notes_total")).select_from(Note)
+    tickets = select(
+        func.count().label("tickets_total"),
+        func.count()
+        .filter(Ticket.status == Status.done)
+        .label("tickets_done"),
+        func.count()
+        .filter(Ticket.status == Status.open)
+        .label("tickets_open"),
+    ).select_from(Ticket)
+    tasks = select(
+        func.count().label("tasks_total"),
+        func.count()
+        .filter(Task.status == TaskStatus.COMPLETED)
+        .label("tasks_done"),
+        func.count()
+        .filter(Task.status == TaskStatus.PENDING)
+        .label("tasks_pending"),
+        func.count()
+        .filter(
+            Task.status == TaskStatus.PENDING, Task.deadline < date.today()
+        )
+        .label("overdue"),
+    ).select_from(Task)
+    users = select(
+        *(
+            func.count()
+            .filter(User.role == role.value)
+            .label(f"users_{role.value}")
+            for role in UserRole
+        )
+    ).select_from(User)
+    return select(
+        notes.subquery(),
+        tickets.subquery(),
+        tasks.subquery(),
+        users.subquery(),
+    )
+
+
+async def compute_kpi() -> Dict[str, int]:
+    """Посчитать KPI по базовым таблицам"""
+    async with AsyncSessionLocal() as s:
+        row = (await s.execute(kpi_query())).mappings().one()
+    return {key: int(row[key] or 0) for key in KPI_KEYS}
+
+
+async def refresh_kpi_rollup() -> Dict[str, int]:
+    """Пересчитать KPI и сохранить их в kpi_rollup"""
+    counters = await compute_kpi()
+    stmt = insert(KpiRollup).values(
+        [{"key": key, "value": value} for key, value in counters.items()]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[KpiRollup.key],
+        set_={"value": stmt.excluded.value, "updated_at": func.now()},
+    )
+    async with AsyncSessionLocal() as s:
+        await s.execute(stmt)
+        await s.commit()
+    return counters
+
+
+async def read_kpi_rollup() -> Dict[str, int]:
+    """Прочитать KPI из rollup; пустой rollup заполняется на лету"""
+    async with AsyncSessionLocal() as s:
+        rows = (await s.execute(select(KpiRollup.key, KpiRollup.value))).all()
+    if not rows:
+        return await refresh_kpi_rollup()
+    counters = dict.fromkeys(KPI_KEYS, 0)
+    counters.update({key: value for key, value in rows})
+    return counters
+
+
+_refresh_task: "asyncio.Task[None] | None" = None
+
+
+async def _delayed_refresh(delay: float) -> None:
+    await asyncio.sleep(delay)
     try:
-        async with AsyncSessionLocal() as s:
-            # всего заметок
-            notes_total = await s.scalar(
-                select(func.count()).select_from(Note)
-            )
+        await refresh_kpi_rollup()
+    except Exception as e:
+        logger.error(f"Ошибка пересчёта KPI: {e}")
 
-            # заявки IT
-            tickets_total = await s.scalar(
-                select(func.count()).select_from(Ticket)
-            )
-            tickets_done = await s.scalar(
-                select(func.count())
-                .select_from(Ticket)
-                .where(Ticket.status == "done")
-            )
 
-            # поручения директора
-            tasks_total = await s.scalar(
-                select(func.count()).select_from(Task)
-            )
-            tasks_done = await s.scalar(
-                select(func.count())
-                .select_from(Task)
-                .where(Task.status == TaskStatus.COMPLETED)
-            )
+def request_kpi_refresh(delay: float = KPI_REFRESH_DEBOUNCE) -> None:
+    """Запланировать пересчёт rollup после записи (с дебаунсом)"""
+    global _refresh_task
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    _refresh_task = loop.create_task(_delayed_refresh(delay))
 
-            # просроченные поручения
-            overdue = await s.scalar(
-                select(func.count())
-                .select_from(Task)
-                .where(
-                    Task.status == TaskStatus.PENDING,
-                    Task.deadline < date.today(),
-                )
-            )
 
-        return dict(
-            notes_total=notes_total or 0,
-            tickets_total=tickets_total or 0,
-            tickets_done=tickets_done or 0,
-            tasks_total=tasks_total or 0,
-            tasks_done=tasks_done or 0,
-            overdue=overdue or 0,
-        )
+async def kpi_summary() -> Dict[str, Any]:
+    """Получить сводку KPI метрик"""
+    try:
+        counters = await read_kpi_rollup()
+        return {
+            key: counters[key]
+            for key in (
+                "notes_total",
+                "tickets_total",
+                "tickets_done",
+                "tasks_total",
+                "tasks_done",
+                "overdue",
+            )
+        }
     except Exception:
         # Возвращаем нулевые значения в случае ошибки
         return dict(
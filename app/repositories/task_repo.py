@@ -6,6 +6,8 @@ from sqlalchemy import select, update
 from app.db.enums import Status
 from app.db.session import AsyncSessionLocal
 from app.db.task import Task, TaskStatus
+from app.repositories.pagination import Page, paginate
+from app.repositories.stats_repo import request_kpi_refresh
 
 
 async def create_task(
@@ -23,6 +25,7 @@ async def create_task(
         s.add(task)
         await s.commit()
         await s.refresh(task)
+        request_kpi_refresh()
         return task
 
 
@@ -36,6 +39,21 @@ async def list_open() -> List[Task]:
         return list(tasks)
 
 
+async def page_open(
+    cursor: str | None = None, limit: int | None = None
+) -> Page[Task]:
+    """Страница открытых поручений, новые сверху"""
+    async with AsyncSessionLocal() as s:
+        return await paginate(
+            s,
+            select(Task).where(Task.status == TaskStatus.PENDING),
+            Task.created_at,
+            Task.id,
+            cursor,
+            limit,
+        )
+
+
 async def set_status(task_id: int, status: Status) -> bool:
     """Изменить статус поручения"""
     try:
@@ -52,6 +70,7 @@ async def set_status(task_id: int, status: Status) -> bool:
                 .values(status=task_status_map[status])
             )
             await s.commit()
+            request_kpi_refresh()
             return True
     except Exception:
         return False
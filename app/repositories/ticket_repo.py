@@ -6,6 +6,8 @@ from app.db.enums import Status
 from app.db.session import AsyncSessionLocal
 from app.db.ticket import Ticket
 from app.middlewares.metrics import decrement_tickets, increment_tickets
+from app.repositories.pagination import Page, paginate
+from app.repositories.stats_repo import request_kpi_refresh
 
 
 async def create_ticket(
@@ -18,6 +20,7 @@ async def create_ticket(
         await s.refresh(ticket)
         # Увеличиваем счетчик открытых заявок
         increment_tickets()
+        request_kpi_refresh()
         return ticket
 
 
@@ -29,6 +32,16 @@ async def list_all() -> List[Ticket]:
         return list(rows)
 
 
+async def page_all(
+    cursor: str | None = None, limit: int | None = None
+) -> Page[Ticket]:
+    """Страница заявок, новые сверху"""
+    async with AsyncSessionLocal() as s:
+        return await paginate(
+            s, select(Ticket), Ticket.created_at, Ticket.id, cursor, limit
+        )
+
+
 async def set_status(tkt_id: int, status: Status) -> bool:
     try:
         async with AsyncSessionLocal() as s:
@@ -39,6 +52,7 @@ async def set_status(tkt_id: int, status: Status) -> bool:
             # Если заявка закрыта, уменьшаем счетчик
             if status == Status.done:
                 decrement_tickets()
+            request_kpi_refresh()
             return True
     except Exception:
         return False
@@ -5,10 +5,28 @@ from sqlalchemy import select, update
 
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
+from app.services.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
 
+async def tg_ids_by_role(role: str) -> List[int]:
+    """Получить список Telegram ID активных пользователей роли"""
+    try:
+        async with AsyncSessionLocal() as s:
+            rows = await s.scalars(
+                select(User.tg_id).where(
+                    User.role == role,
+                    User.is_active.is_(True),
+                    User.tg_id.is_not(None),
+                )
+            )
+            return list(rows)
+    except Exception as e:
+        logger.error(f"Ошибка при получении ID пользователей {role}: {e}")
+        return []
+
+
 async def teacher_ids() -> List[int]:
     """Получить список Telegram ID учителей"""
     try:
@@ -71,6 +89,7 @@ async def update_user_intro(tg_id: int, seen_intro: bool) -> None:
                 .values(seen_intro=seen_intro)
             )
             await s.commit()
+        await cache_service.invalidate_user(tg_id)
     except Exception as e:
         logger.error(f"Ошибка при обновлении онбординга для {tg_id}: {e}")
         raise
@@ -1,5 +1,7 @@
 # app/roles.py
 from enum import Enum
+from functools import lru_cache
+from typing import Any
 
 from app.utils.hash import hash_pwd
 
@@ -30,11 +32,28 @@ ROLES = {
 }
 
 
+# Демо-учётки: (префикс логина, количество, пароль, роль)
+DEMO_ACCOUNTS = (
+    ("teacher", 5, "teacher", "teacher"),
+    ("admin", 5, "admin", "admin"),
+    ("director", 5, "director", "director"),
+    ("student", 10, "student", "student"),
+    ("parent", 10, "parent", "parent"),
+    ("psy", 5, "psy", "psych"),
+)
+
+
+@lru_cache(maxsize=None)
+def _demo_hash(pwd: str) -> str:
+    # Один хэш на пароль: у демо-учёток пароли общие и публичные
+    return hash_pwd(pwd)
+
+
 def _make(prefix: str, n: int, pwd: str, role: str) -> list[dict[str, str]]:
     return [
         {
             "login": f"{prefix}{str(i).zfill(2)}",
-            "password": hash_pwd(pwd),
+            "password": _demo_hash(pwd),
             "role": role,
             "theme": "light",
         }  # дефолтная тема
@@ -42,19 +61,27 @@ def _make(prefix: str, n: int, pwd: str, role: str) -> list[dict[str, str]]:
     ]
 
 
-DEMO_USERS = (
-    _make("teacher", 5, "teacher", "teacher")
-    + _make("admin", 5, "admin", "admin")
-    + _make("director", 5, "director", "director")
-    + _make("student", 10, "student", "student")
-    + _make("parent", 10, "parent", "parent")
-    + _make("psy", 5, "psy", "psych")
-    + [
+@lru_cache(maxsize=None)
+def demo_users() -> list[dict[str, str]]:
+    """
+    Демо-учётки с bcrypt-хэшами паролей.
+
+    Хэши считаются при первом обращении, а не при импорте модуля.
+    """
+    users = [user for spec in DEMO_ACCOUNTS for user in _make(*spec)]
+    users.append(
         {
             "login": "demo01",
-            "password": hash_pwd("demo"),
+            "password": _demo_hash("demo"),
             "role": "super",
             "theme": "light",
         }
-    ]  # ← FIXED
-)
+    )
+    return users
+
+
+def __getattr__(name: str) -> Any:
+    # Обратная совместимость: DEMO_USERS вычисляется лениво
+    if name == "DEMO_USERS":
+        return demo_users()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,15 +3,19 @@ from typing import Any
 
 from aiogram import F, Router
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 from sqlalchemy import select
 
 from app.db.enums import Status
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
+from app.keyboards.pagination import page_cursor, page_data, with_page_nav
+from app.middlewares.current_user import NOT_LOADED, resolve_user
 from app.repositories import media_repo, ticket_repo, user_repo
-from app.services.notifier import broadcast
+from app.schemas.user import UserSnapshot
+from app.services.delivery import create_broadcast
+from app.services.job_queue import job_queue
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -23,10 +27,14 @@ class BroadcastFSM(StatesGroup):
 
 
 # helper: get current user
-async def get_user_role(tg_id: int) -> Any:
+async def find_user(tg_id: int) -> User | None:
     async with AsyncSessionLocal() as s:
-        user = await s.scalar(select(User).where(User.tg_id == tg_id))
-        return user.role if user else None
+        return await s.scalar(select(User).where(User.tg_id == tg_id))
+
+
+async def get_user_role(tg_id: int) -> Any:
+    user = await find_user(tg_id)
+    return user.role if user else None
 
 
 def ticket_lines(tickets: list[Any]) -> str:
@@ -36,22 +44,65 @@ def ticket_lines(tickets: list[Any]) -> str:
     )
 
 
+def media_lines(requests: list[Any]) -> str:
+    ico = {Status.open: "🟡", Status.in_progress: "🔵", Status.done: "🟢"}
+    return "\n".join(
+        f"{ico[r.status]} <b>#{r.id}</b> — "
+        f"{r.event_date.strftime('%d.%m.%Y') if r.event_date else '—'} "
+        f"{r.comment or ''}"
+        for r in requests
+    )
+
+
+async def tickets_screen(
+    cursor: str | None = None, nonce: str = ""
+) -> tuple[str, InlineKeyboardMarkup]:
+    """Страница заявок техподдержки с кнопками листания"""
+    page = await ticket_repo.page_all(cursor)
+    if not page.items:
+        txt = "📋 <b>Заявки техподдержки</b>\n\nНет активных заявок"
+    else:
+        txt = "📋 <b>Заявки техподдержки</b>\n\n" + ticket_lines(page.items)
+    markup = menu("admin", "ru", nonce=nonce)
+    return txt, with_page_nav(markup, "tickets", page, nonce)
+
+
+async def media_screen(
+    cursor: str | None = None, nonce: str = ""
+) -> tuple[str, InlineKeyboardMarkup]:
+    """Страница заявок медиацентра с кнопками листания"""
+    page = await media_repo.page_all(cursor)
+    if not page.items:
+        txt = "📹 <b>Заявки медиацентра</b>\n\nНет активных заявок"
+    else:
+        txt = "📹 <b>Заявки медиацентра</b>\n\n" + media_lines(page.items)
+    markup = menu("admin", "ru", nonce=nonce)
+    return txt, with_page_nav(markup, "media", page, nonce)
+
+
 # ─────────── Заявки ───────────
 @router.callback_query(F.data == "admin_tickets")  # type: ignore[misc]
-async def view_tickets(call: CallbackQuery) -> None:
+@router.callback_query(F.data.startswith(page_data("tickets")))  # type: ignore[misc]
+async def view_tickets(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["admin", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
 
-        tickets = await ticket_repo.list_all()
-        if not tickets:
-            txt = "📋 <b>Заявки техподдержки</b>\n\nНет активных заявок"
-        else:
-            txt = "📋 <b>Заявки техподдержки</b>\n\n" + ticket_lines(tickets)
+        txt, markup = await tickets_screen(
+            page_cursor(call.data, "tickets"), nonce
+        )
         if call.message is not None and hasattr(call.message, "edit_text"):
-            await call.message.edit_text(txt, reply_markup=menu("admin", "ru"))
+            await call.message.edit_text(txt, reply_markup=markup)
         await call.answer()
     except Exception as e:
         logger.error(f"Ошибка при получении заявок: {e}")
@@ -59,9 +110,17 @@ async def view_tickets(call: CallbackQuery) -> None:
 
 
 @router.callback_query(lambda c: c.data.startswith(("mark_done", "mark_prog")))
-async def change_status(call: CallbackQuery) -> None:
+async def change_status(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["admin", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
@@ -79,13 +138,10 @@ async def change_status(call: CallbackQuery) -> None:
         success = await ticket_repo.set_status(ticket_id, status)
         if success:
             await call.answer("Статус обновлен", show_alert=True)
-            # Обновляем список заявок
-            tickets = await ticket_repo.list_all()
-            txt = "📋 <b>Заявки техподдержки</b>\n\n" + ticket_lines(tickets)
+            # Обновляем список заявок (первая страница)
+            txt, markup = await tickets_screen(nonce=nonce)
             if call.message is not None and hasattr(call.message, "edit_text"):
-                await call.message.edit_text(
-                    txt, reply_markup=menu("admin", "ru")
-                )
+                await call.message.edit_text(txt, reply_markup=markup)
         else:
             await call.answer("Ошибка обновления статуса", show_alert=True)
     except Exception as e:
@@ -95,25 +151,27 @@ async def change_status(call: CallbackQuery) -> None:
 
 # ─────────── Медиа-заявки ───────────
 @router.callback_query(F.data == "admin_media")  # type: ignore[misc]
-async def view_media(call: CallbackQuery) -> None:
+@router.callback_query(F.data.startswith(page_data("media")))  # type: ignore[misc]
+async def view_media(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["admin", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
 
-        requests = await media_repo.list_all()
-        if not requests:
-            txt = "📹 <b>Заявки медиацентра</b>\n\nНет активных заявок"
-        else:
-            ico = {
-                Status.open: "🟡",
-                Status.in_progress: "🔵",
-                Status.done: "🟢",
-            }
-            txt = "📹 <b>Заявки медиацентра</b>\n\n" + "\n".join()
+        txt, markup = await media_screen(
+            page_cursor(call.data, "media"), nonce
+        )
         if call.message is not None and hasattr(call.message, "edit_text"):
-            await call.message.edit_text(txt, reply_markup=menu("admin", "ru"))
+            await call.message.edit_text(txt, reply_markup=markup)
         await call.answer()
     except Exception as e:
         logger.error(f"Ошибка при получении медиа-заявок: {e}")
@@ -123,9 +181,17 @@ async def view_media(call: CallbackQuery) -> None:
 @router.callback_query(
     lambda c: c.data.startswith(("media_done", "media_prog"))
 )
-async def change_media_status(call: CallbackQuery) -> None:
+async def change_media_status(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["admin", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
@@ -143,18 +209,10 @@ async def change_media_status(call: CallbackQuery) -> None:
         success = await media_repo.set_status(req_id, status)
         if success:
             await call.answer("Статус обновлен", show_alert=True)
-            # Обновляем список заявок
-            requests = await media_repo.list_all()
-            ico = {
-                Status.open: "🟡",
-                Status.in_progress: "🔵",
-                Status.done: "🟢",
-            }
-            txt = "📹 <b>Заявки медиацентра</b>\n\n" + "\n".join()
+            # Обновляем список заявок (первая страница)
+            txt, markup = await media_screen(nonce=nonce)
             if call.message is not None and hasattr(call.message, "edit_text"):
-                await call.message.edit_text(
-                    txt, reply_markup=menu("admin", "ru")
-                )
+                await call.message.edit_text(txt, reply_markup=markup)
         else:
             await call.answer("Ошибка обновления статуса", show_alert=True)
     except Exception as e:
@@ -164,9 +222,15 @@ async def change_media_status(call: CallbackQuery) -> None:
 
 # ─────────── Рассылка ───────────
 @router.callback_query(F.data == "admin_broadcast")  # type: ignore[misc]
-async def start_broadcast(call: CallbackQuery, state: Any) -> None:
+async def start_broadcast(
+    call: CallbackQuery, state: Any, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["admin", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
@@ -184,15 +248,19 @@ async def start_broadcast(call: CallbackQuery, state: Any) -> None:
 
 
 @router.message(BroadcastFSM.waiting_text, F.text)  # type: ignore[misc]
-async def send_broadcast(msg: Message, state: Any) -> None:
+async def send_broadcast(
+    msg: Message, state: Any, current_user: UserSnapshot | None = NOT_LOADED
+) -> None:
     try:
         if msg.from_user is None:
             await msg.answer("Доступ запрещен")
             await state.clear()
             return
 
-        user_role = await get_user_role(msg.from_user.id)
-        if not user_role or user_role not in ["admin", "super"]:
+        # Автор рассылки нужен для Broadcast: без middleware
+        # загружаем пользователя, а не рассылаем в обработчике
+        author = await resolve_user(current_user, msg.from_user.id, find_user)
+        if author is None or author.role not in ["admin", "super"]:
             await msg.answer("Доступ запрещен")
             await state.clear()
             return
@@ -219,18 +287,21 @@ async def send_broadcast(msg: Message, state: Any) -> None:
             await state.clear()
             return
 
-        # Отправляем рассылку
-        sent_count = await broadcast(teacher_ids, text)
-
-        await state.clear()
-        await msg.answer(
-            f"✅ Рассылка отправлена!\n\n"
-            f"📊 Статистика:\n"
-            f"• Всего получателей: {len(teacher_ids)}\n"
-            f"• Успешно отправлено: {sent_count}\n"
-            f"• Ошибок: {len(teacher_ids) - sent_count}",
-            reply_markup=menu("admin", "ru"),
+        # Получатели фиксируются в БД, доставкой занимается воркер;
+        # прогресс обновляется в одном сообщении
+        broadcast_id = await create_broadcast(
+            author.id, text, "teacher", teacher_ids
         )
+        status_msg = await msg.answer(
+            f"📤 Рассылка поставлена в очередь: 0/{len(teacher_ids)}"
+        )
+        await job_queue.enqueue(
+            "broadcast",
+            broadcast_id=broadcast_id,
+            status_chat_id=status_msg.chat.id,
+            status_message_id=status_msg.message_id,
+        )
+        await state.clear()
     except Exception as e:
         logger.error(f"Ошибка при отправке рассылки: {e}")
         await msg.answer("Произошла ошибка при отправке рассылки")
@@ -4,14 +4,17 @@ from typing import Any
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 from sqlalchemy import select
 
 from app.db.enums import Status
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
+from app.keyboards.pagination import page_cursor, page_data, with_page_nav
+from app.middlewares.current_user import NOT_LOADED, resolve_user
 from app.repositories import stats_repo, task_repo
+from app.schemas.user import UserSnapshot
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -32,13 +35,15 @@ async def me(tg_id: int) -> Any:
 
 # ─────────── KPI ───────────
 @router.message(Command("kpi"))
-async def kpi_cmd(msg: Message) -> None:
+async def kpi_cmd(
+    msg: Message, current_user: UserSnapshot | None = NOT_LOADED
+) -> None:
     try:
         if msg.from_user is None:
             await msg.answer("Команда доступна только директору.")
             return
 
-        user = await me(msg.from_user.id)
+        user = await resolve_user(current_user, msg.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -70,9 +75,11 @@ async def kpi_cmd(msg: Message) -> None:
 
 # ─────────── KPI ───────────
 @router.callback_query(F.data == "stub")  # type: ignore[misc]
-async def view_kpi(call: CallbackQuery) -> None:
+async def view_kpi(
+    call: CallbackQuery, current_user: UserSnapshot | None = NOT_LOADED
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -104,11 +111,33 @@ async def view_kpi(call: CallbackQuery) -> None:
         await call.answer("Произошла ошибка", show_alert=True)
 
 
+async def tasks_screen(
+    cursor: str | None = None, nonce: str = ""
+) -> tuple[str, InlineKeyboardMarkup]:
+    """Страница открытых поручений с кнопками листания"""
+    page = await task_repo.page_open(cursor)
+    if not page.items:
+        txt = "📋 <b>Задачи директора</b>\n\nНет активных задач"
+    else:
+        txt = "📋 <b>Задачи директора</b>\n\n" + "\n".join(
+            f"📝 {t.description}\n"
+            f"⏰ Дедлайн: {t.deadline.strftime('%d.%m.%Y') if t.deadline else 'Не установлен'}"
+            for t in page.items
+        )
+    markup = menu("director", "ru", nonce=nonce)
+    return txt, with_page_nav(markup, "tasks", page, nonce)
+
+
 # ─────────── Задачи ───────────
 @router.callback_query(F.data == "director_tasks")  # type: ignore[misc]
-async def view_tasks(call: CallbackQuery) -> None:
+@router.callback_query(F.data.startswith(page_data("tasks")))  # type: ignore[misc]
+async def view_tasks(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = NOT_LOADED,
+    nonce: str = "",
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -117,24 +146,11 @@ async def view_tasks(call: CallbackQuery) -> None:
             await call.answer("Доступ запрещен", show_alert=True)
             return
 
-        tasks = await task_repo.list_open()
-        if not tasks:
-            txt = "📋 <b>Задачи директора</b>\n\nНет активных задач"
-        else:
-            ico = {
-                Status.open: "🟡",
-                Status.in_progress: "🔵",
-                Status.done: "🟢",
-            }
-            txt = "📋 <b>Задачи директора</b>\n\n" + "\n".join(
-                f"📝 {t.description}\n"
-                f"⏰ Дедлайн: {t.deadline.strftime('%d.%m.%Y') if t.deadline else 'Не установлен'}"
-                for t in tasks
-            )
+        txt, markup = await tasks_screen(
+            page_cursor(call.data, "tasks"), nonce
+        )
         if call.message is not None and hasattr(call.message, "edit_text"):
-            await call.message.edit_text(
-                txt, reply_markup=menu("director", "ru")
-            )
+            await call.message.edit_text(txt, reply_markup=markup)
         await call.answer()
     except Exception as e:
         logger.error(f"Ошибка при получении задач: {e}")
@@ -142,9 +158,13 @@ async def view_tasks(call: CallbackQuery) -> None:
 
 
 @router.callback_query(F.data == "director_add_task")  # type: ignore[misc]
-async def start_add_task(call: CallbackQuery, state: Any) -> None:
+async def start_add_task(
+    call: CallbackQuery,
+    state: Any,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -219,7 +239,9 @@ async def task_description(msg: Message, state: Any) -> None:
 
 
 @router.message(AddTask.waiting_deadline, F.text)  # type: ignore[misc]
-async def task_deadline(msg: Message, state: Any) -> None:
+async def task_deadline(
+    msg: Message, state: Any, current_user: UserSnapshot | None = NOT_LOADED
+) -> None:
     try:
         if msg.text is None:
             await msg.answer("Пожалуйста, введите дедлайн.")
@@ -245,7 +267,7 @@ async def task_deadline(msg: Message, state: Any) -> None:
             await state.clear()
             return
 
-        user = await me(msg.from_user.id)
+        user = await resolve_user(current_user, msg.from_user.id, me)
         if not user or user.role not in ["director", "super"]:
             await msg.answer("Доступ запрещен")
             await state.clear()
@@ -269,9 +291,13 @@ async def task_deadline(msg: Message, state: Any) -> None:
 
 
 @router.callback_query(lambda c: c.data.startswith(("task_done", "task_prog")))
-async def change_task_status(call: CallbackQuery) -> None:
+async def change_task_status(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = NOT_LOADED,
+    nonce: str = "",
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if not user or user.role not in ["director", "super"]:
             await call.answer("Доступ запрещен", show_alert=True)
             return
@@ -289,22 +315,10 @@ async def change_task_status(call: CallbackQuery) -> None:
         success = await task_repo.set_status(task_id, status)
         if success:
             await call.answer("Статус обновлен", show_alert=True)
-            # Обновляем список задач
-            tasks = await task_repo.list_open()
-            ico = {
-                Status.open: "🟡",
-                Status.in_progress: "🔵",
-                Status.done: "🟢",
-            }
-            txt = "📋 <b>Задачи директора</b>\n\n" + "\n".join(
-                f"📝 {t.description}\n"
-                f"⏰ Дедлайн: {t.deadline.strftime('%d.%m.%Y') if t.deadline else 'Не установлен'}"
-                for t in tasks
-            )
+            # Обновляем список задач (первая страница)
+            txt, markup = await tasks_screen(nonce=nonce)
             if call.message is not None and hasattr(call.message, "edit_text"):
-                await call.message.edit_text(
-                    txt, reply_markup=menu("director", "ru")
-                )
+                await call.message.edit_text(txt, reply_markup=markup)
         else:
             await call.answer("Ошибка обновления статуса", show_alert=True)
     except Exception as e:
@@ -15,7 +15,8 @@ from aiogram.types import (
     Message,
 )
 
-from app.i18n import t
+from app.i18n import t, t_format
+from app.middlewares.loading import set_typing
 from app.repositories.user_repo import get_user
 from app.roles import UserRole
 from app.services.news_parser import get_news_cards
@@ -23,13 +24,15 @@ from app.services.news_parser import get_news_cards
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Новости могут загружаться из сети: индикатор показываем раньше
+set_typing(router, delay=0.2)
+
 
 def get_localized_text(key: str, **kwargs) -> str:
     """Получить локализованный текст с подстановкой параметров согласно Context7"""
-    text = t(key)
     if kwargs:
-        return text.format(**kwargs)
-    return text
+        return t_format(key, **kwargs)
+    return t(key)
 
 
 @router.errors()
@@ -20,6 +20,7 @@ from app.db.user import User
 from app.i18n import t
 from app.repositories.user_repo import get_user
 from app.roles import UserRole
+from app.schemas.user import UserSnapshot
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -773,12 +774,18 @@ def get_detailed_help(role: str, section: str) -> str:
 
 # ─────────── Кнопка справки ───────────
 @router.callback_query(F.data == "help")  # type: ignore[misc]
-async def help_button(call: CallbackQuery, lang: str) -> None:
+async def help_button(
+    call: CallbackQuery, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     try:
         if call.from_user is None:
             await call.answer(t("help.help_user_not_found"), show_alert=True)
             return
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if not user_role:
             await call.answer(t("help.help_please_login"), show_alert=True)
             return
@@ -816,13 +823,19 @@ def get_faq_text(lang: str) -> str:
 
 # ─────────── Команды для учителей ───────────
 @router.message(Command("notes"))
-async def teacher_notes_command(msg: Message, lang: str) -> None:
+async def teacher_notes_command(
+    msg: Message, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     """Команда /notes для учителей"""
     try:
         if msg.from_user is None:
             await msg.answer("Ошибка: пользователь не найден.")
             return
-        user = await get_user_role(msg.from_user.id)
+        user = (
+            current_user.role
+            if current_user
+            else await get_user_role(msg.from_user.id)
+        )
         if not user or user not in ["teacher", "super"]:
             await msg.answer("Доступ запрещен")
             return
@@ -837,13 +850,19 @@ async def teacher_notes_command(msg: Message, lang: str) -> None:
 
 
 @router.message(Command("addnote"))
-async def teacher_addnote_command(msg: Message, lang: str) -> None:
+async def teacher_addnote_command(
+    msg: Message, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     """Команда /addnote для учителей"""
     try:
         if msg.from_user is None:
             await msg.answer("Ошибка: пользователь не найден.")
             return
-        user = await get_user_role(msg.from_user.id)
+        user = (
+            current_user.role
+            if current_user
+            else await get_user_role(msg.from_user.id)
+        )
         if not user or user not in ["teacher", "super"]:
             await msg.answer("Доступ запрещен")
             return
@@ -872,13 +891,19 @@ async def teacher_addnote_command(msg: Message, lang: str) -> None:
 
 
 @router.message(Command("ticket"))
-async def teacher_ticket_command(msg: Message, lang: str) -> None:
+async def teacher_ticket_command(
+    msg: Message, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     """Команда /ticket для учителей"""
     try:
         if msg.from_user is None:
             await msg.answer("Ошибка: пользователь не найден.")
             return
-        user = await get_user_role(msg.from_user.id)
+        user = (
+            current_user.role
+            if current_user
+            else await get_user_role(msg.from_user.id)
+        )
         if not user or user not in ["teacher", "super"]:
             await msg.answer("Доступ запрещен")
             return
@@ -10,7 +10,11 @@ from aiogram.types import CallbackQuery, Message
 from app.i18n import t
 from app.repositories.user_repo import get_user
 from app.roles import UserRole
-from app.services.notification_service import interaction_service
+from app.services.job_queue import job_queue
+from app.services.notification_service import (
+    InteractionService,
+    interaction_service,
+)
 
 router = Router()
 
@@ -261,9 +265,26 @@ async def handle_broadcast_message(
             )
             return
 
-        # Отправляем рассылку
-        sent_count = await interaction_service.admin_broadcast(
-            admin_id=message.from_user.id, message=broadcast_text
+        user = await get_user(message.from_user.id)
+        if not user or user.role not in (
+            UserRole.ADMIN.value,
+            UserRole.DIRECTOR.value,
+        ):
+            await message.answer(
+                "❌ Эта команда доступна только администраторам."
+            )
+            await state.clear()
+            return
+
+        # Получатели фиксируются в БД, доставку выполняет воркер;
+        # повтор задачи продолжает с недоставленных
+        broadcast_ids = await InteractionService.create_admin_broadcast(
+            user.id, broadcast_text
+        )
+        await job_queue.enqueue(
+            "admin_broadcast",
+            admin_id=message.from_user.id,
+            broadcast_ids=broadcast_ids,
         )
 
         # Очищаем состояние
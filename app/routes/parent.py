@@ -2,14 +2,15 @@ import logging
 from typing import Any
 
 from aiogram import F, Router
-from aiogram.types import BufferedInputFile, CallbackQuery
+from aiogram.types import CallbackQuery
 from sqlalchemy import select
 
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
 from app.repositories import task_repo
-from app.services.pdf_factory import make_certificate
+from app.schemas.user import UserSnapshot
+from app.services.job_queue import job_queue
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -24,9 +25,15 @@ async def get_user_role(tg_id: int) -> Any:
 
 # ─────────── Задания ребенка ───────────
 @router.callback_query(F.data == "parent_tasks")  # type: ignore[misc]
-async def view_child_tasks(call: CallbackQuery) -> None:
+async def view_child_tasks(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["parent", "super"]:
             await call.answer(
                 "Эта функция доступна только родителям", show_alert=True
@@ -59,9 +66,15 @@ async def view_child_tasks(call: CallbackQuery) -> None:
 
 # ─────────── Справки ───────────
 @router.callback_query(F.data == "parent_cert")  # type: ignore[misc]
-async def request_certificate(call: CallbackQuery) -> None:
+async def request_certificate(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["parent", "super"]:
             await call.answer(
                 "Эта функция доступна только родителям", show_alert=True
@@ -80,36 +93,32 @@ async def request_certificate(call: CallbackQuery) -> None:
 
 
 @router.callback_query(F.data == "cert_attendance")  # type: ignore[misc]
-async def generate_attendance_cert(call: CallbackQuery) -> None:
+async def generate_attendance_cert(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["parent", "super"]:
             await call.answer(
                 "Эта функция доступна только родителям", show_alert=True
             )
             return
 
-        # Генерируем справку о посещаемости
-        pdf_data = make_certificate(
+        # Генерируем справку о посещаемости в воркере очереди
+        await job_queue.enqueue(
+            "certificate",
+            chat_id=call.from_user.id,
             cert_type="school",
             child_name="Иванов Иван",
+            caption="📄 Справка о посещаемости\n\n"
+            "Справка сгенерирована автоматически.\n"
+            "Для получения официальной справки обратитесь в секретариат.",
         )
-
-        if call.message is not None and hasattr(
-            call.message, "answer_document"
-        ):
-            # Конвертируем BytesIO в InputFile
-            pdf_data.seek(0)
-            input_file = BufferedInputFile(
-                pdf_data.getvalue(), filename="certificate.pdf"
-            )
-            await call.message.answer_document(
-                document=input_file,
-                caption="📄 Справка о посещаемости\n\n"
-                "Справка сгенерирована автоматически.\n"
-                "Для получения официальной справки обратитесь в секретариат.",
-            )
-        await call.answer()
+        await call.answer("⏳ Справка готовится и придёт сообщением")
     except Exception as e:
         logger.error(f"Ошибка при генерации справки о посещаемости: {e}")
         await call.answer(
@@ -118,36 +127,32 @@ async def generate_attendance_cert(call: CallbackQuery) -> None:
 
 
 @router.callback_query(F.data == "cert_progress")  # type: ignore[misc]
-async def generate_progress_cert(call: CallbackQuery) -> None:
+async def generate_progress_cert(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["parent", "super"]:
             await call.answer(
                 "Эта функция доступна только родителям", show_alert=True
             )
             return
 
-        # Генерируем справку об успеваемости
-        pdf_data = make_certificate(
+        # Генерируем справку об успеваемости в воркере очереди
+        await job_queue.enqueue(
+            "certificate",
+            chat_id=call.from_user.id,
             cert_type="school",
             child_name="Иванов Иван",
+            caption="📄 Справка об успеваемости\n\n"
+            "Справка сгенерирована автоматически.\n"
+            "Для получения официальной справки обратитесь в секретариат.",
         )
-
-        if call.message is not None and hasattr(
-            call.message, "answer_document"
-        ):
-            # Конвертируем BytesIO в InputFile
-            pdf_data.seek(0)
-            input_file = BufferedInputFile(
-                pdf_data.getvalue(), filename="certificate.pdf"
-            )
-            await call.message.answer_document(
-                document=input_file,
-                caption="📄 Справка об успеваемости\n\n"
-                "Справка сгенерирована автоматически.\n"
-                "Для получения официальной справки обратитесь в секретариат.",
-            )
-        await call.answer()
+        await call.answer("⏳ Справка готовится и придёт сообщением")
     except Exception as e:
         logger.error(f"Ошибка при генерации справки об успеваемости: {e}")
         await call.answer(
@@ -156,36 +161,32 @@ async def generate_progress_cert(call: CallbackQuery) -> None:
 
 
 @router.callback_query(F.data == "cert_behavior")  # type: ignore[misc]
-async def generate_behavior_cert(call: CallbackQuery) -> None:
+async def generate_behavior_cert(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["parent", "super"]:
             await call.answer(
                 "Эта функция доступна только родителям", show_alert=True
             )
             return
 
-        # Генерируем справку о поведении
-        pdf_data = make_certificate(
+        # Генерируем справку о поведении в воркере очереди
+        await job_queue.enqueue(
+            "certificate",
+            chat_id=call.from_user.id,
             cert_type="family",
             child_name="Иванов Иван",
+            caption="📄 Справка о поведении\n\n"
+            "Справка сгенерирована автоматически.\n"
+            "Для получения официальной справки обратитесь в секретариат.",
         )
-
-        if call.message is not None and hasattr(
-            call.message, "answer_document"
-        ):
-            # Конвертируем BytesIO в InputFile
-            pdf_data.seek(0)
-            input_file = BufferedInputFile(
-                pdf_data.getvalue(), filename="certificate.pdf"
-            )
-            await call.message.answer_document(
-                document=input_file,
-                caption="📄 Справка о поведении\n\n"
-                "Справка сгенерирована автоматически.\n"
-                "Для получения официальной справки обратитесь в секретариат.",
-            )
-        await call.answer()
+        await call.answer("⏳ Справка готовится и придёт сообщением")
     except Exception as e:
         logger.error(f"Ошибка при генерации справки о поведении: {e}")
         await call.answer(
@@ -2,14 +2,16 @@ import logging
 from typing import Any
 
 from aiogram import F, Router
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 from sqlalchemy import select
 
 from app.db.enums import Status
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
+from app.keyboards.pagination import page_cursor, page_data, with_page_nav
 from app.repositories import psych_repo
+from app.schemas.user import UserSnapshot
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -22,29 +24,49 @@ async def get_user_role(tg_id: int) -> Any:
         return user.role if user else None
 
 
+async def inbox_screen(
+    cursor: str | None = None, nonce: str = ""
+) -> tuple[str, InlineKeyboardMarkup]:
+    """Страница открытых обращений с кнопками листания"""
+    page = await psych_repo.page_open(cursor)
+    if not page.items:
+        txt = "📥 <b>Входящие обращения</b>\n\nНет новых обращений"
+    else:
+        txt = "📥 <b>Входящие обращения</b>\n\n" + "\n".join(
+            f"📝 <b>#{r.id}</b> — {r.text[:100]}{'...' if len(r.text) > 100 else ''}\n"
+            f"👤 От: {r.from_id}\n"
+            f"📅 {r.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+            for r in page.items
+        )
+    markup = menu("psych", "ru", nonce=nonce)
+    return txt, with_page_nav(markup, "inbox", page, nonce)
+
+
 # ─────────── Входящие обращения ───────────
 @router.callback_query(F.data == "psych_inbox")  # type: ignore[misc]
-async def view_inbox(call: CallbackQuery) -> None:
+@router.callback_query(F.data.startswith(page_data("inbox")))  # type: ignore[misc]
+async def view_inbox(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["psych", "super"]:
             await call.answer(
                 "Эта функция доступна только психологу", show_alert=True
             )
             return
 
-        requests = await psych_repo.list_open()
-        if not requests:
-            txt = "📥 <b>Входящие обращения</b>\n\nНет новых обращений"
-        else:
-            txt = "📥 <b>Входящие обращения</b>\n\n" + "\n".join(
-                f"📝 <b>#{r.id}</b> — {r.text[:100]}{'...' if len(r.text) > 100 else ''}\n"
-                f"👤 От: {r.from_id}\n"
-                f"📅 {r.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-                for r in requests
-            )
+        txt, markup = await inbox_screen(
+            page_cursor(call.data, "inbox"), nonce
+        )
         if call.message is not None and hasattr(call.message, "edit_text"):
-            await call.message.edit_text(txt, reply_markup=menu("psych", "ru"))
+            await call.message.edit_text(txt, reply_markup=markup)
             await call.answer()
         else:
             await call.answer()
@@ -54,9 +76,17 @@ async def view_inbox(call: CallbackQuery) -> None:
 
 
 @router.callback_query(lambda c: c.data.startswith("psych_mark_done_"))
-async def mark_request_done(call: CallbackQuery) -> None:
+async def mark_request_done(
+    call: CallbackQuery,
+    current_user: UserSnapshot | None = None,
+    nonce: str = "",
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["psych", "super"]:
             await call.answer(
                 "Эта функция доступна только психологу", show_alert=True
@@ -73,21 +103,10 @@ async def mark_request_done(call: CallbackQuery) -> None:
             await call.answer(
                 "Обращение отмечено как обработанное", show_alert=True
             )
-            # Обновляем список обращений
-            requests = await psych_repo.list_open()
-            if not requests:
-                txt = "📥 <b>Входящие обращения</b>\n\nНет новых обращений"
-            else:
-                txt = "📥 <b>Входящие обращения</b>\n\n" + "\n".join(
-                    f"📝 <b>#{r.id}</b> — {r.text[:100]}{'...' if len(r.text) > 100 else ''}\n"
-                    f"👤 От: {r.from_id}\n"
-                    f"📅 {r.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-                    for r in requests
-                )
+            # Обновляем список обращений (первая страница)
+            txt, markup = await inbox_screen(nonce=nonce)
             if call.message is not None and hasattr(call.message, "edit_text"):
-                await call.message.edit_text(
-                    txt, reply_markup=menu("psych", "ru")
-                )
+                await call.message.edit_text(txt, reply_markup=markup)
             return
         else:
             await call.answer(
@@ -100,9 +119,15 @@ async def mark_request_done(call: CallbackQuery) -> None:
 
 # ─────────── Статистика ───────────
 @router.callback_query(F.data == "psych_stats")  # type: ignore[misc]
-async def view_stats(call: CallbackQuery) -> None:
+async def view_stats(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["psych", "super"]:
             await call.answer(
                 "Эта функция доступна только психологу", show_alert=True
@@ -9,6 +9,7 @@ from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
 from app.repositories import psych_repo, task_repo
+from app.schemas.user import UserSnapshot
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -23,9 +24,15 @@ async def get_user_role(tg_id: int) -> Any:
 
 # ─────────── Задания ───────────
 @router.callback_query(F.data == "stu_tasks")  # type: ignore[misc]
-async def view_tasks(call: CallbackQuery) -> None:
+async def view_tasks(
+    call: CallbackQuery, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["student", "super"]:
             await call.answer(
                 "Эта функция доступна только ученикам", show_alert=True
@@ -58,9 +65,15 @@ async def view_tasks(call: CallbackQuery) -> None:
 
 # ─────────── Помощь психолога ───────────
 @router.callback_query(F.data == "stu_help")  # type: ignore[misc]
-async def ask_help(call: CallbackQuery, lang: str) -> None:
+async def ask_help(
+    call: CallbackQuery, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     try:
-        user_role = await get_user_role(call.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(call.from_user.id)
+        )
         if user_role not in ["student", "super"]:
             await call.answer(
                 "Эта функция доступна только ученикам", show_alert=True
@@ -81,12 +94,18 @@ async def ask_help(call: CallbackQuery, lang: str) -> None:
 
 
 @router.message(F.content_type.in_({"voice", "text"}))
-async def receive_help(msg: Message, lang: str) -> None:
+async def receive_help(
+    msg: Message, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     try:
         if msg.from_user is None:
             await msg.answer("Ошибка: пользователь не найден.")
             return
-        user_role = await get_user_role(msg.from_user.id)
+        user_role = (
+            current_user.role
+            if current_user
+            else await get_user_role(msg.from_user.id)
+        )
         if user_role not in ["student", "super"]:
             await msg.answer("Эта функция доступна только ученикам")
             return
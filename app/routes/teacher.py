@@ -9,13 +9,20 @@ from sqlalchemy import select
 
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
-from app.i18n import t
+from app.i18n import t, t_format
 from app.keyboards.main_menu import menu
+from app.keyboards.pagination import page_cursor, page_data, with_page_nav
+from app.middlewares.current_user import NOT_LOADED, resolve_user
 from app.repositories import media_repo, note_repo, ticket_repo
+from app.repositories.pagination import Page
+from app.schemas.user import UserSnapshot
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Длина заметки в списке: страница целиком укладывается в 4096 символов
+NOTE_PREVIEW = 300
+
 
 # ─────────── FSM ───────────
 class AddNote(StatesGroup):
@@ -39,11 +46,17 @@ async def me(tg_id: int) -> Any:
         return await s.scalar(select(User).where(User.tg_id == tg_id))
 
 
-# 1. список заметок
+# 1. список заметок (постранично)
 @router.callback_query(F.data == "teacher_notes")  # type: ignore[misc]
-async def teacher_notes(call: CallbackQuery, lang: str) -> None:
+@router.callback_query(F.data.startswith(page_data("notes")))  # type: ignore[misc]
+async def teacher_notes(
+    call: CallbackQuery,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+    nonce: str = "",
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -53,18 +66,24 @@ async def teacher_notes(call: CallbackQuery, lang: str) -> None:
             return
 
         if user is not None and hasattr(user, "id") and user.id is not None:
-            notes = await note_repo.list_notes(user.id)
+            page = await note_repo.page_notes(
+                user.id, page_cursor(call.data, "notes")
+            )
         else:
-            notes = []
-        if not notes:
+            page = Page()
+        if not page.items:
             txt = t("teacher.notes_empty", lang)
         else:
             txt = "📝 <b>Мои заметки</b>\n\n" + "\n".join(
-                f"• <i>{n.student_name}</i> — {n.text} " for n in notes
+                f"• <i>{n.student_name}</i> — {n.text[:NOTE_PREVIEW]} "
+                for n in page.items
             )
         if call.message is not None and hasattr(call.message, "edit_text"):
             await call.message.edit_text(
-                txt, reply_markup=menu("teacher", lang)
+                txt,
+                reply_markup=with_page_nav(
+                    menu("teacher", lang, nonce=nonce), "notes", page, nonce
+                ),
             )
         await call.answer()
     except Exception as e:
@@ -74,9 +93,14 @@ async def teacher_notes(call: CallbackQuery, lang: str) -> None:
 
 # 2. кнопка «➕ Добавить заметку»
 @router.callback_query(F.data == "teacher_add")  # type: ignore[misc]
-async def start_add(call: CallbackQuery, state: Any, lang: str) -> None:
+async def start_add(
+    call: CallbackQuery,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -96,14 +120,19 @@ async def start_add(call: CallbackQuery, state: Any, lang: str) -> None:
 
 # 3. приём строки, сохранение
 @router.message(AddNote.waiting_text, F.text)  # type: ignore[misc]
-async def save_note(msg: Message, state: Any, lang: str) -> None:
+async def save_note(
+    msg: Message,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
         if msg.from_user is None:
             await msg.answer("Доступ запрещен")
             await state.clear()
             return
 
-        user = await me(msg.from_user.id)
+        user = await resolve_user(current_user, msg.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -150,9 +179,14 @@ async def save_note(msg: Message, state: Any, lang: str) -> None:
 
 # ─────────── Заявки IT ───────────
 @router.callback_query(F.data == "teacher_ticket")  # type: ignore[misc]
-async def start_ticket(call: CallbackQuery, state: Any, lang: str) -> None:
+async def start_ticket(
+    call: CallbackQuery,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -199,7 +233,12 @@ async def ticket_title(msg: Message, state: Any, lang: str) -> None:
 
 
 @router.message(AddTicket.waiting_file, lambda m: m.document or m.photo or m.text)  # type: ignore[misc]
-async def ticket_file(msg: Message, state: Any, lang: str) -> None:
+async def ticket_file(
+    msg: Message,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
         data = await state.get_data()
         file_id = None
@@ -221,7 +260,7 @@ async def ticket_file(msg: Message, state: Any, lang: str) -> None:
             await state.clear()
             return
 
-        user = await me(msg.from_user.id)
+        user = await resolve_user(current_user, msg.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -236,7 +275,7 @@ async def ticket_file(msg: Message, state: Any, lang: str) -> None:
         )
         await state.clear()
         await msg.answer(
-            t("teacher.ticket_created", lang).format(ticket_id=ticket.id),
+            t_format("teacher.ticket_created", lang, ticket_id=ticket.id),
             reply_markup=menu("teacher", lang),
         )
     except Exception as e:
@@ -247,9 +286,14 @@ async def ticket_file(msg: Message, state: Any, lang: str) -> None:
 
 # ─────────── Медиа-заявки ───────────
 @router.callback_query(F.data == "teacher_media")  # type: ignore[misc]
-async def media_start(call: CallbackQuery, state: Any, lang: str) -> None:
+async def media_start(
+    call: CallbackQuery,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
-        user = await me(call.from_user.id)
+        user = await resolve_user(current_user, call.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
@@ -311,7 +355,12 @@ async def media_file(msg: Message, state: Any) -> None:
 
 
 @router.message(MediaFSM.waiting_text, F.text)  # type: ignore[misc]
-async def media_finish(msg: Message, state: Any, lang: str) -> None:
+async def media_finish(
+    msg: Message,
+    state: Any,
+    lang: str,
+    current_user: UserSnapshot | None = NOT_LOADED,
+) -> None:
     try:
         data = await state.get_data()
         if msg.from_user is None:
@@ -319,7 +368,7 @@ async def media_finish(msg: Message, state: Any, lang: str) -> None:
             await state.clear()
             return
 
-        user = await me(msg.from_user.id)
+        user = await resolve_user(current_user, msg.from_user.id, me)
         if (
             not user
             or not hasattr(user, "role")
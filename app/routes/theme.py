@@ -9,6 +9,8 @@ from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.i18n import t
 from app.keyboards.main_menu import menu
+from app.schemas.user import UserSnapshot
+from app.services.cache_service import cache_service
 
 router = Router()
 
@@ -31,18 +33,21 @@ async def toggle_theme(uid: int) -> str:
             update(User).where(User.id == user.id).values(theme=new)
         )
         await s.commit()
-        return new
+    await cache_service.invalidate_user(uid)
+    return new
 
 
 @router.message(Command("theme"))
-async def cmd_theme(msg: Message, lang: str) -> None:
+async def cmd_theme(
+    msg: Message, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     """Команда /theme для переключения темы"""
     if msg.from_user is None:
         await msg.answer(t("common.theme_switched", lang))
         return
 
     new = await toggle_theme(msg.from_user.id)
-    user = await get_user(msg.from_user.id)
+    user = current_user or await get_user(msg.from_user.id)
 
     if user is not None and hasattr(user, "role"):
         await msg.answer(
@@ -54,14 +59,16 @@ async def cmd_theme(msg: Message, lang: str) -> None:
 
 
 @router.callback_query(lambda c: c.data == "switch_theme")  # type: ignore[misc]
-async def cb_theme(call: CallbackQuery, lang: str) -> None:
+async def cb_theme(
+    call: CallbackQuery, lang: str, current_user: UserSnapshot | None = None
+) -> None:
     """Кнопка переключения темы"""
     if call.from_user is None:
         await call.answer(t("common.theme_switched", lang))
         return
 
     new = await toggle_theme(call.from_user.id)
-    user = await get_user(call.from_user.id)
+    user = current_user or await get_user(call.from_user.id)
 
     if (
         user is not None
@@ -14,6 +14,7 @@ from sqlalchemy import select
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
 from app.keyboards.main_menu import menu
+from app.services.cache_service import cache_service
 
 router = Router()
 
@@ -35,6 +36,7 @@ async def set_role(tg_id: int, role: str) -> None:
         if user is not None:
             user.role = role
             await s.commit()
+    await cache_service.invalidate_user(tg_id)
 
 
 def _tour_text(role: str) -> str:
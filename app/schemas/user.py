@@ -0,0 +1,65 @@
+"""
+Компактный снимок пользователя для передачи по цепочке middleware
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from sqlalchemy import select
+
+from app.db.user import User
+
+# Колонки, которые загружаются в снимок одним запросом
+SNAPSHOT_COLUMNS = (
+    User.id,
+    User.tg_id,
+    User.role,
+    User.theme,
+    User.login,
+    User.username,
+    User.first_name,
+    User.last_name,
+    User.is_active,
+    User.seen_intro,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Неизменяемый снимок пользователя на время обработки одного апдейта"""
+
+    id: int
+    tg_id: int | None
+    role: str
+    theme: str = "light"
+    login: str | None = None
+    username: str | None = None
+    first_name: str | None = None
+    last_name: str | None = None
+    is_active: bool = True
+    seen_intro: bool = False
+
+    @classmethod
+    def from_row(cls, row: Any) -> "UserSnapshot":
+        """Создать снимок из строки select(*SNAPSHOT_COLUMNS) или модели User"""
+        return cls(
+            id=row.id,
+            tg_id=row.tg_id,
+            role=str(row.role),
+            theme=row.theme or "light",
+            login=row.login,
+            username=row.username,
+            first_name=row.first_name,
+            last_name=row.last_name,
+            is_active=bool(row.is_active),
+            seen_intro=bool(row.seen_intro),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Сериализовать снимок в словарь"""
+        return asdict(self)
+
+
+def snapshot_query(tg_id: int) -> Any:
+    """Запрос, загружающий только поля снимка по Telegram ID"""
+    return select(*SNAPSHOT_COLUMNS).where(User.tg_id == tg_id)
@@ -0,0 +1,214 @@
+"""
+Реестр статических медиа (картинки онбординга и т.п.).
+
+Файл загружается в Telegram один раз, после чего отправляется по
+file_id. file_id хранится в Redis под хэшем содержимого файла
+и параметров подготовки, так что переживает перезапуски и общий для
+всех процессов; замена картинки на диске даёт новый ключ. Перед
+загрузкой картинка может быть уменьшена и пережата в JPEG (если
+установлен Pillow): Telegram всё равно ужимает фото до 1280 px.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.services.cache_service import redis_client
+from app.services.redis_pool import batch
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow не обязателен: файл уходит как есть
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_PREFIX = "file_id"
+
+
+async def get_file_id(key: str) -> str | None:
+    """file_id ранее загруженного файла"""
+    try:
+        return await redis_client.get(f"{FILE_ID_PREFIX}:{key}")
+    except RedisError as e:
+        logger.warning(f"Кэш file_id недоступен: {e}")
+        return None
+
+
+async def set_file_id(key: str, file_id: str, ttl: int | None = None) -> None:
+    """Запомнить file_id загруженного файла"""
+    try:
+        async with batch(redis_client) as pipe:
+            pipe.set(f"{FILE_ID_PREFIX}:{key}", file_id, ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить file_id: {e}")
+
+
+async def forget_file_id(key: str) -> None:
+    try:
+        await redis_client.delete(f"{FILE_ID_PREFIX}:{key}")
+    except RedisError as e:
+        logger.warning(f"Не удалось удалить file_id: {e}")
+
+
+@dataclass(frozen=True, slots=True)
+class Asset:
+    """Подготовленный к загрузке файл"""
+
+    path: str
+    key: str
+    data: bytes
+    filename: str
+
+
+def prepare_asset(path: str, max_side: int = 0, quality: int = 85) -> Asset:
+    """Прочитать файл, при необходимости уменьшить и пережать в JPEG"""
+    raw = Path(path).read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if not max_side or Image is None:
+        return Asset(path, f"asset:{digest}", raw, Path(path).name)
+
+    with Image.open(io.BytesIO(raw)) as image:
+        image.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        image.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+    return Asset(
+        path,
+        f"asset:{digest}:{max_side}:{quality}",
+        out.getvalue(),
+        f"{Path(path).stem}.jpg",
+    )
+
+
+Sender = Callable[..., Awaitable[Message]]
+
+
+class AssetRegistry:
+    """Отправка статических картинок по file_id с загрузкой один раз"""
+
+    def __init__(
+        self,
+        max_side: int = settings.ASSET_MAX_SIDE,
+        quality: int = settings.ASSET_JPEG_QUALITY,
+    ) -> None:
+        self.max_side = max_side
+        self.quality = quality
+        self._assets: Dict[str, Asset] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def asset(self, path: str) -> Asset:
+        """Подготовленный файл; чтение и пережатие — вне event loop"""
+        asset = self._assets.get(path)
+        if asset is None:
+            asset = await asyncio.to_thread(
+                prepare_asset, path, self.max_side, self.quality
+            )
+            self._assets[path] = asset
+        return asset
+
+    async def prepare_all(self, paths: Iterable[str]) -> int:
+        """Подготовить файлы заранее (при старте); возвращает число готовых"""
+        ready = 0
+        for path in paths:
+            try:
+                await self.asset(path)
+                ready += 1
+            except OSError as e:
+                logger.warning(f"Файл {path} недоступен: {e}")
+        return ready
+
+    async def file_id(self, path: str) -> str | None:
+        asset = await self.asset(path)
+        file_id = self._file_ids.get(asset.key)
+        if file_id is None:
+            file_id = await get_file_id(asset.key)
+            if file_id:
+                self._file_ids[asset.key] = file_id
+        return file_id
+
+    async def _remember(self, asset: Asset, message: Message) -> None:
+        if not message.photo:
+            return
+        file_id = message.photo[-1].file_id
+        self._file_ids[asset.key] = file_id
+        await set_file_id(asset.key, file_id)
+
+    async def _forget(self, asset: Asset) -> None:
+        self._file_ids.pop(asset.key, None)
+        await forget_file_id(asset.key)
+
+    async def send_photo(
+        self, send: Sender, path: str, **kwargs: Any
+    ) -> Message:
+        """
+        Отправить картинку через send (message.answer_photo,
+        partial(bot.send_photo, chat_id) и т.п.).
+        """
+        asset = await self.asset(path)
+        file_id = await self.file_id(path)
+        if file_id:
+            try:
+                return await send(photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                logger.info(f"file_id {path} устарел: {e}")
+                await self._forget(asset)
+
+        # Одна загрузка на файл, даже если его запросили одновременно
+        lock = self._locks.setdefault(asset.key, asyncio.Lock())
+        async with lock:
+            file_id = self._file_ids.get(asset.key)
+            if file_id:
+                return await send(photo=file_id, **kwargs)
+            message = await send(
+                photo=BufferedInputFile(asset.data, filename=asset.filename),
+                **kwargs,
+            )
+            await self._remember(asset, message)
+            logger.info(f"Загружен {path} ({len(asset.data)} байт)")
+            return message
+
+    async def answer_photo(
+        self, message: Message, path: str, **kwargs: Any
+    ) -> Message:
+        """Ответить картинкой на сообщение"""
+        return await self.send_photo(message.answer_photo, path, **kwargs)
+
+    async def preload(
+        self, bot: Bot, chat_id: int, paths: Iterable[str]
+    ) -> int:
+        """
+        Загрузить ещё не загруженные файлы в служебный чат, чтобы первый
+        пользователь уже получил картинку по file_id. Возвращает число
+        загруженных файлов.
+        """
+        uploaded = 0
+        for path in paths:
+            try:
+                if await self.file_id(path):
+                    continue
+                message = await self.send_photo(
+                    partial(bot.send_photo, chat_id),
+                    path,
+                    disable_notification=True,
+                )
+                uploaded += 1
+                await bot.delete_message(chat_id, message.message_id)
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить {path}: {e}")
+        return uploaded
+
+
+# Глобальный экземпляр реестра
+asset_registry = AssetRegistry()
@@ -2,92 +2,298 @@
 Сервис кеширования для оптимизации производительности
 """
 
+import asyncio
+import functools
+import hashlib
+import inspect
 import json
 import logging
-from collections.abc import Callable
-from datetime import datetime
+import random
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from enum import Enum
 from typing import Any
 
-import redis.asyncio as redis
 from aiocache import cached
+from prometheus_client import Counter
+from redis.exceptions import RedisError
 from sqlalchemy import select
 
-from app.config import settings
 from app.db.note import Note
 from app.db.session import AsyncSessionLocal
-from app.db.task import Task
-from app.db.ticket import Ticket
 from app.db.user import User
 from app.roles import UserRole
+from app.schemas.user import SNAPSHOT_COLUMNS, UserSnapshot, snapshot_query
+from app.services.redis_pool import (  # noqa: F401  redis_db_url — реэкспорт
+    RELEASE_LOCK_SCRIPT,
+    batch,
+    redis_db_url,
+    redis_registry,
+)
 
 logger = logging.getLogger(__name__)
 
-# Инициализация Redis клиента
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Данные кеша живут в отдельной логической БД (REDIS_CACHE_DB): их можно
+# терять и сбрасывать, не трогая FSM, счётчики лимитов и очереди
+redis_client = redis_registry.client("cache")
+# Основная БД (REDIS_DSN): очереди и прочее, что терять нельзя
+state_client = redis_registry.client("state")
 
 # Настройки кеша
 CACHE_TTL = 600  # 10 минут по умолчанию
 USER_CACHE_TTL = 300  # 5 минут для пользователей
 SCHEDULE_CACHE_TTL = 1800  # 30 минут для расписания
 STATS_CACHE_TTL = 900  # 15 минут для статистики
+NEGATIVE_CACHE_TTL = 60  # результат None кешируется ненадолго
+
+# Поколения пространств ключей
+GLOBAL_VERSION_KEY = "ns:global"
+NAMESPACE_VERSION_TTL = 30 * 24 * 3600  # дольше любой записи кеша
+
+# Мемоизация функций (cache_result)
+MEMO_PREFIX = "memo"
+MEMO_LOCK_TIMEOUT = 10.0  # секунды: сколько ждать пересчёта в другом процессе
+MEMO_LOCK_POLL = 0.05
+_inflight: dict[str, "asyncio.Task[Any]"] = {}
+
+MEMO_REQUESTS = Counter(
+    "cache_result_requests_total",
+    "cache_result lookups by function and outcome (hit/miss)",
+    ["function", "result"],
+)
+
+# Локальный (in-process) уровень кеша пользователей
+USER_LOCAL_TTL = 60  # верхняя граница устаревания при потере pub/sub
+USER_LOCAL_MAXSIZE = 10_000
+# Канал Redis pub/sub для межпроцессной инвалидации
+USER_INVALIDATION_CHANNEL = "cache:invalidate:user"
+INVALIDATE_ALL = "*"
+
+
+class Namespace:
+    """
+    Пространство ключей кеша с номерами поколений.
+
+    Ключ записи содержит поколение всего кеша и поколение области (scope,
+    например id пользователя). Инвалидация увеличивает номер одним INCR:
+    старые записи становятся недостижимы и истекают по своему TTL —
+    без KEYS/SCAN по всей базе.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def _version_key(self, scope: Any) -> str:
+        return f"ns:{self.name}:{scope}"
+
+    async def key(self, scope: Any, *parts: Any) -> str:
+        """Ключ записи в текущем поколении (один MGET)"""
+        generation, version = await redis_client.mget(
+            GLOBAL_VERSION_KEY, self._version_key(scope)
+        )
+        suffix = ":".join(str(part) for part in parts)
+        return (
+            f"{self.name}:{scope}:g{generation or 0}.v{version or 0}:{suffix}"
+        )
+
+    async def bump(self, *scopes: Any) -> None:
+        """Сделать недостижимыми все записи областей scopes"""
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.incr(self._version_key(scope))
+                pipe.expire(self._version_key(scope), NAMESPACE_VERSION_TTL)
+            await pipe.execute()
+
+
+async def bump_all_namespaces() -> None:
+    """Новое поколение всего кеша: все записи Namespace недостижимы"""
+    await redis_client.incr(GLOBAL_VERSION_KEY)
+
+
+USER_NOTES = Namespace("user_notes")
+FREQUENT_DATA = Namespace("frequent_data")
+MEMO = Namespace(MEMO_PREFIX)
+
+
+class LocalCache:
+    """Ограниченный LRU-кеш в памяти процесса с TTL записей"""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any | None:
+        """Получить значение или None, если его нет или оно устарело"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Any, value: Any) -> None:
+        """Сохранить значение, вытесняя самые старые записи"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        """Удалить запись, если она есть"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кеш"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
 
 
 class CacheService:
     """Сервис для работы с кешем"""
 
+    # Общий для процесса уровень L1; L2 — Redis
+    local_users = LocalCache(USER_LOCAL_MAXSIZE, USER_LOCAL_TTL)
+
     @staticmethod
-    async def get_user(tg_id: int) -> dict[str, Any] | None:
-        """Получить пользователя из кеша или БД"""
+    async def get_user_snapshot(tg_id: int) -> UserSnapshot | None:
+        """Получить снимок пользователя: память процесса → Redis → БД"""
+        local = CacheService.local_users.get(tg_id)
+        if local is not None:
+            return local  # type: ignore[no-any-return]
+
         cache_key = f"user:{tg_id}"
+        try:
+            cached_user = await redis_client.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Redis недоступен для {cache_key}: {e}")
+            cached_user = None
 
-        # Пробуем получить из кеша
-        cached_user = await redis_client.get(cache_key)
         if cached_user:
-            user_data = json.loads(cached_user)
-            return dict(user_data) if user_data else None
-
-        # Если нет в кеше, получаем из БД
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(User).where(User.tg_id == tg_id)
-            )
-            user = result.scalar_one_or_none()
-
-            if user:
-                user_data = {
-                    "id": user.id,
-                    "tg_id": user.tg_id,
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "role": user.role,
-                    "is_active": user.is_active,
-                    "created_at": (
-                        user.created_at.isoformat()
-                        if user.created_at
-                        else None
-                    ),
-                    "updated_at": (
-                        user.updated_at.isoformat()
-                        if user.updated_at
-                        else None
-                    ),
-                }
-
-                # Сохраняем в кеш
+            snapshot = UserSnapshot(**json.loads(cached_user))
+        else:
+            async with AsyncSessionLocal() as session:
+                row = (await session.execute(snapshot_query(tg_id))).first()
+            if row is None:
+                return None
+            snapshot = UserSnapshot.from_row(row)
+            try:
+                # Сразу, а не через batch(): отложенная запись легла бы
+                # после invalidate_user того же апдейта и вернула бы
+                # в кеш старый снимок
                 await redis_client.setex(
-                    cache_key, USER_CACHE_TTL, json.dumps(user_data)
+                    cache_key, USER_CACHE_TTL, json.dumps(snapshot.as_dict())
                 )
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить {cache_key}: {e}")
 
-                return user_data
+        CacheService.local_users.set(tg_id, snapshot)
+        return snapshot
 
-        return None
+    @staticmethod
+    async def preload_users(limit: int) -> int:
+        """
+        Загрузить снимки активных пользователей (новые первыми) в Redis
+        и память процесса одним запросом и одним pipeline
+        """
+        async with AsyncSessionLocal() as session:
+            rows = (
+                await session.execute(
+                    select(*SNAPSHOT_COLUMNS)
+                    .where(User.is_active.is_(True), User.tg_id.is_not(None))
+                    .order_by(User.id.desc())
+                    .limit(limit)
+                )
+            ).all()
+        snapshots = [UserSnapshot.from_row(row) for row in rows]
+        for snapshot in snapshots:
+            CacheService.local_users.set(snapshot.tg_id, snapshot)
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for snapshot in snapshots:
+                    pipe.setex(
+                        f"user:{snapshot.tg_id}",
+                        USER_CACHE_TTL,
+                        json.dumps(snapshot.as_dict()),
+                    )
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Не удалось сохранить снимки пользователей: {e}")
+        return len(snapshots)
+
+    @staticmethod
+    async def get_user(tg_id: int) -> dict[str, Any] | None:
+        """Получить пользователя из кеша или БД"""
+        snapshot = await CacheService.get_user_snapshot(tg_id)
+        return snapshot.as_dict() if snapshot else None
 
     @staticmethod
     async def invalidate_user(tg_id: int) -> None:
-        """Инвалидировать кеш пользователя"""
-        cache_key = f"user:{tg_id}"
-        await redis_client.delete(cache_key)
+        """Инвалидировать кеш пользователя во всех процессах"""
+        await CacheService.invalidate_users([tg_id])
+
+    @staticmethod
+    async def invalidate_users(tg_ids: Iterable[int]) -> None:
+        """Инвалидировать кеш нескольких пользователей одной пачкой"""
+        ids = [int(tg_id) for tg_id in tg_ids]
+        if not ids:
+            return
+        for tg_id in ids:
+            CacheService.local_users.pop(tg_id)
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(*(f"user:{tg_id}" for tg_id in ids))
+                for tg_id in ids:
+                    pipe.publish(USER_INVALIDATION_CHANNEL, str(tg_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Ошибка инвалидации кеша пользователей {ids}: {e}")
+
+    @staticmethod
+    def _evict_local(payload: str) -> None:
+        """Применить событие инвалидации из pub/sub"""
+        if payload == INVALIDATE_ALL:
+            CacheService.local_users.clear()
+        elif payload.isdigit():
+            CacheService.local_users.pop(int(payload))
+
+    @staticmethod
+    async def listen_invalidations(retry_delay: float = 1.0) -> None:
+        """
+        Слушать события инвалидации от других процессов.
+
+        После переподключения локальный уровень очищается целиком:
+        события, пришедшие во время разрыва, потеряны.
+        """
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+                CacheService.local_users.clear()
+                async for message in pubsub.listen():
+                    CacheService._evict_local(str(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Подписка на инвалидацию прервана: {e}")
+                await asyncio.sleep(retry_delay)
+            finally:
+                await pubsub.aclose()
 
     @staticmethod
     @cached(ttl=SCHEDULE_CACHE_TTL)  # type: ignore[misc]
@@ -118,40 +324,26 @@ class CacheService:
     @cached(ttl=STATS_CACHE_TTL)  # type: ignore[misc]
     async def get_system_stats() -> dict[str, Any]:
         """Получить статистику системы (кешируется)"""
-        async with AsyncSessionLocal() as session:
-            # Подсчет пользователей по ролям
-            users_by_role = {}
-            for role in UserRole:
-                result = await session.execute(
-                    select(User).where(User.role == role.value)
-                )
-                users_by_role[role.value] = len(result.scalars().all())
-
-            # Подсчет активных заявок
-            result = await session.execute(
-                select(Ticket).where(Ticket.status == "open")
-            )
-            open_tickets = len(result.scalars().all())
-
-            # Подсчет активных задач
-            result = await session.execute(
-                select(Task).where(Task.status == "pending")
-            )
-            pending_tasks = len(result.scalars().all())
+        # Локальный импорт: репозитории сами зависят от cache_service
+        from app.repositories.stats_repo import read_kpi_rollup
 
-            return {
-                "users_by_role": users_by_role,
-                "open_tickets": open_tickets,
-                "pending_tasks": pending_tasks,
-                "cached_at": datetime.now().isoformat(),
-            }
+        counters = await read_kpi_rollup()
+        return {
+            "users_by_role": {
+                role.value: counters[f"users_{role.value}"]
+                for role in UserRole
+            },
+            "open_tickets": counters["tickets_open"],
+            "pending_tasks": counters["tasks_pending"],
+            "cached_at": datetime.now().isoformat(),
+        }
 
     @staticmethod
     async def get_user_notes(
         tg_id: int, limit: int = 10
     ) -> list[dict[str, Any]]:
         """Получить заметки пользователя с кешированием"""
-        cache_key = f"user_notes:{tg_id}:{limit}"
+        cache_key = await USER_NOTES.key(tg_id, limit)
 
         # Пробуем получить из кеша
         cached_notes = await redis_client.get(cache_key)
@@ -183,23 +375,25 @@ class CacheService:
                 for note in notes
             ]
 
-            # Сохраняем в кеш на 5 минут
-            await redis_client.setex(cache_key, 300, json.dumps(notes_data))
+            # Сохраняем в кеш на 5 минут. Ключ версионирован: запись,
+            # отложенная после инвалидации, ляжет под старую версию
+            async with batch(redis_client) as pipe:
+                pipe.setex(cache_key, 300, json.dumps(notes_data))
 
             return notes_data
 
     @staticmethod
     async def invalidate_user_notes(tg_id: int) -> None:
-        """Инвалидировать кеш заметок пользователя"""
-        pattern = f"user_notes:{tg_id}:*"
-        keys = await redis_client.keys(pattern)
-        if keys:
-            await redis_client.delete(*keys)
+        """Инвалидировать кеш заметок пользователя (все значения limit)"""
+        try:
+            await USER_NOTES.bump(tg_id)
+        except RedisError as e:
+            logger.error(f"Ошибка инвалидации заметок {tg_id}: {e}")
 
     @staticmethod
     async def get_frequently_accessed_data() -> dict[str, Any]:
         """Получить часто запрашиваемые данные"""
-        cache_key = "frequent_data"
+        cache_key = await FREQUENT_DATA.key("all")
 
         # Пробуем получить из кеша
         cached_data = await redis_client.get(cache_key)
@@ -222,15 +416,23 @@ class CacheService:
                 "cached_at": datetime.now().isoformat(),
             }
 
-            # Сохраняем в кеш на 1 час
-            await redis_client.setex(cache_key, 3600, json.dumps(data))
+            # Сохраняем в кеш на 1 час (ключ версионирован, как у заметок)
+            async with batch(redis_client) as pipe:
+                pipe.setex(cache_key, 3600, json.dumps(data))
 
             return data
 
     @staticmethod
     async def clear_all_caches() -> None:
-        """Очистить все кеши"""
-        await redis_client.flushdb()
+        """
+        Очистить все кеши: новое поколение ключей вместо FLUSHDB.
+        Снимки пользователей (user:*) не версионируются — в других
+        процессах они сбрасываются через pub/sub, в Redis истекают
+        за USER_CACHE_TTL.
+        """
+        await bump_all_namespaces()
+        CacheService.local_users.clear()
+        await redis_client.publish(USER_INVALIDATION_CHANNEL, INVALIDATE_ALL)
         logger.info("Все кеши очищены")
 
     @staticmethod
@@ -239,8 +441,12 @@ class CacheService:
         info = await redis_client.info()
         keys = await redis_client.dbsize()
 
+        local = CacheService.local_users
         return {
             "total_keys": keys,
+            "local_user_entries": len(local),
+            "local_user_hits": local.hits,
+            "local_user_misses": local.misses,
             "memory_usage": info.get("used_memory_human", "N/A"),
             "hit_rate": info.get("keyspace_hits", 0),
             "miss_rate": info.get("keyspace_misses", 0),
@@ -251,33 +457,261 @@ class CacheService:
 cache_service = CacheService()
 
 
-# Декораторы для удобного кеширования
-def cache_result(ttl: int = CACHE_TTL):
-    """Декоратор для кеширования результатов функций"""
+# ────────────────── Мемоизация функций ──────────────────
+def _key_part(value: Any) -> Any:
+    """Аргумент в стабильном между процессами JSON-виде"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted((_key_part(v) for v in value), key=repr)
+    if isinstance(value, bytes):
+        return value.hex()
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    # repr произвольного объекта содержит адрес: такой ключ бесполезен
+    raise TypeError(f"{type(value).__name__} нельзя использовать в ключе кеша")
+
+
+def argument_digest(arguments: dict[str, Any]) -> str:
+    """sha256 от аргументов функции, одинаковый во всех процессах"""
+    payload = json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), default=_key_part
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _tag_key(tag: str) -> str:
+    return f"{MEMO_PREFIX}:tag:{tag}"
+
+
+async def _read_entry(key: str) -> tuple[Any, float] | None:
+    """(значение, время записи) или None при промахе"""
+    try:
+        raw = await redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Кеш недоступен для {key}: {e}")
+        return None
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    return entry["v"], entry["t"]
+
+
+async def _write_entry(
+    key: str, value: Any, ttl: int, tags: Iterable[str]
+) -> None:
+    try:
+        payload = json.dumps({"v": value, "t": time.time()})
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Результат для {key} не сериализуется: {e}")
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, payload, ex=ttl)
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), key)
+                # Набор живёт не меньше самой долгой записи в нём
+                pipe.expire(_tag_key(tag), ttl, nx=True)
+                pipe.expire(_tag_key(tag), ttl, gt=True)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить {key}: {e}")
+
+
+async def _try_lock(key: str, token: str, timeout: float) -> bool:
+    """Блокировка пересчёта между процессами; без Redis — считаем сами"""
+    try:
+        return bool(
+            await redis_client.set(
+                f"{key}:lock", token, nx=True, px=int(timeout * 1000)
+            )
+        )
+    except RedisError:
+        return True
+
+
+async def _unlock(key: str, token: str) -> None:
+    """Снять свою блокировку; истёкшую и взятую другим не трогаем"""
+    try:
+        await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+    except RedisError as e:
+        logger.warning(f"Не удалось снять блокировку {key}: {e}")
+
+
+async def _recompute(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int,
+    negative_ttl: int,
+    tags: Iterable[str],
+    lock_timeout: float,
+    wait: bool,
+) -> Any:
+    """
+    Пересчитать значение под блокировкой. Если блокировку держит другой
+    процесс, ждём его результат (wait) не дольше lock_timeout, потом
+    считаем сами; без wait (фоновое обновление) просто выходим.
+    """
+    token = secrets.token_hex(16)
+    locked = await _try_lock(key, token, lock_timeout)
+    if not locked:
+        if not wait:
+            return None
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(MEMO_LOCK_POLL)
+            entry = await _read_entry(key)
+            if entry is not None:
+                return entry[0]
+    try:
+        value = await compute()
+        entry_ttl = ttl if value is not None else negative_ttl
+        if entry_ttl:
+            await _write_entry(key, value, entry_ttl, tags)
+        return value
+    finally:
+        if locked:
+            await _unlock(key, token)
+
+
+def _single_flight(
+    key: str, factory: Callable[[], Awaitable[Any]]
+) -> "asyncio.Task[Any]":
+    """Одна задача пересчёта на ключ в процессе; остальные ждут её"""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(functools.partial(_forget_flight, key))
+    return task
+
+
+def _forget_flight(key: str, task: "asyncio.Task[Any]") -> None:
+    _inflight.pop(key, None)
+    # Ошибку получают и ожидающие вызовы; фоновое обновление
+    # без ожидающих иначе потеряло бы её
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Пересчёт {key} не удался: {task.exception()}")
+
+
+async def invalidate_tags(*tags: str) -> int:
+    """Удалить все записи cache_result с любым из тегов"""
+    keys: set[str] = set()
+    try:
+        for tag in tags:
+            keys.update(await redis_client.smembers(_tag_key(tag)))
+        await redis_client.delete(*keys, *(_tag_key(tag) for tag in tags))
+    except RedisError as e:
+        logger.error(f"Ошибка инвалидации тегов {tags}: {e}")
+        return 0
+    return len(keys)
+
+
+def cache_result(
+    ttl: int = CACHE_TTL,
+    *,
+    negative_ttl: int = NEGATIVE_CACHE_TTL,
+    tags: Iterable[str] | Callable[..., Iterable[str]] = (),
+    early_refresh: float = 0.0,
+    lock_timeout: float = MEMO_LOCK_TIMEOUT,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Кеширование результата асинхронной функции в Redis.
+
+    Ключ — имя функции и sha256 её аргументов (после привязки к сигнатуре,
+    self/cls не учитываются), одинаковый во всех процессах; ключи лежат
+    в пространстве MEMO с областью на функцию. Одновременные
+    промахи по ключу сводятся к одному пересчёту: в процессе — общей
+    задачей, между процессами — блокировкой в Redis. None кешируется на
+    negative_ttl секунд (0 — не кешируется).
+
+    tags — теги записи (или функция от аргументов, возвращающая теги)
+    для invalidate_tags. early_refresh — доля ttl в конце жизни записи,
+    в которой случайный вызов обновляет её в фоне, не дожидаясь истечения.
+
+    У обёртки есть invalidate(*args, **kwargs) — удалить одну запись —
+    и invalidate_all() — новое поколение всех записей функции.
+    """
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+        scope = f"{func.__module__}.{func.__qualname__}"
+        hits = MEMO_REQUESTS.labels(func.__qualname__, "hit")
+        misses = MEMO_REQUESTS.labels(func.__qualname__, "miss")
+
+        def digest_for(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: value
+                for name, value in bound.arguments.items()
+                if name not in ("self", "cls")
+            }
+            return argument_digest(arguments)
+
+        def recompute(
+            key: str,
+            args: tuple[Any, ...],
+            kwargs: dict[str, Any],
+            wait: bool = True,
+        ) -> Awaitable[Any]:
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return _recompute(
+                key,
+                lambda: func(*args, **kwargs),
+                ttl,
+                negative_ttl,
+                tuple(entry_tags),
+                lock_timeout,
+                wait,
+            )
+
+        @functools.wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            # Создаем ключ кеша на основе аргументов
-            cache_key = f"{func.__name__}:{hash(str(args) + str(kwargs))}"
-
-            # Пробуем получить из кеша
-            cached_result = await redis_client.get(cache_key)
-            if cached_result:
-                result_data = json.loads(cached_result)
-                return (
-                    dict(result_data)
-                    if isinstance(result_data, dict)
-                    else result_data
+            digest = digest_for(args, kwargs)
+            try:
+                key = await MEMO.key(scope, digest)
+            except RedisError as e:
+                logger.warning(f"Кеш недоступен для {scope}: {e}")
+                return await func(*args, **kwargs)
+            entry = await _read_entry(key)
+            if entry is None:
+                misses.inc()
+                # shield: отмена одного ожидающего не отменяет пересчёт
+                return await asyncio.shield(
+                    _single_flight(key, lambda: recompute(key, args, kwargs))
                 )
 
-            # Выполняем функцию
-            result = await func(*args, **kwargs)
-
-            # Сохраняем результат в кеш
-            await redis_client.setex(cache_key, ttl, json.dumps(result))
-
-            return result
-
+            hits.inc()
+            value, stored_at = entry
+            if early_refresh and value is not None:
+                remaining = stored_at + ttl - time.time()
+                if remaining < ttl * early_refresh * random.random():
+                    _single_flight(
+                        key, lambda: recompute(key, args, kwargs, wait=False)
+                    )
+            return value
+
+        async def invalidate(*args: Any, **kwargs: Any) -> None:
+            """Удалить запись для этих аргументов"""
+            try:
+                key = await MEMO.key(scope, digest_for(args, kwargs))
+                await redis_client.delete(key)
+            except RedisError as e:
+                logger.warning(f"Не удалось удалить запись кеша: {e}")
+
+        async def invalidate_all() -> None:
+            """Сбросить все записи функции"""
+            try:
+                await MEMO.bump(scope)
+            except RedisError as e:
+                logger.warning(f"Не удалось сбросить кеш {scope}: {e}")
+
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        wrapper.invalidate_all = invalidate_all  # type: ignore[attr-defined]
+        wrapper.cache_digest = digest_for  # type: ignore[attr-defined]
         return wrapper
 
     return decorator
@@ -0,0 +1,473 @@
+"""
+Движок массовой доставки сообщений с учётом лимитов Telegram
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Iterable, Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from prometheus_client import Counter, Gauge
+from sqlalchemy import func, select, update
+
+from app.db.broadcast import Broadcast
+from app.db.notification import Notification, NotificationStatus
+from app.db.session import AsyncSessionLocal
+from app.db.user import User
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram: ~30 сообщений/с на бота и ~1 сообщение/с в один чат.
+# Берём глобальный лимит с запасом, чтобы не упираться в 429.
+GLOBAL_RATE = 25.0
+PER_CHAT_INTERVAL = 1.0
+CONCURRENCY = 10
+MAX_ATTEMPTS = 3
+# 429 — просьба подождать, а не ошибка получателя: в попытки не входит
+MAX_RETRY_AFTER = 10
+RETRY_BACKOFF = 0.5
+PROGRESS_INTERVAL = 5.0
+STATUS_FLUSH_SIZE = 100
+
+BROADCAST_MESSAGES = Counter(
+    "bot_broadcast_messages_total",
+    "Сообщения массовых рассылок по статусу доставки",
+    ["status"],
+)
+BROADCAST_RETRY_AFTER = Counter(
+    "bot_broadcast_retry_after_total",
+    "Ответы 429 (retry_after) при рассылках",
+)
+BROADCAST_THROUGHPUT = Gauge(
+    "bot_broadcast_throughput", "Скорость последней рассылки, сообщений/с"
+)
+
+
+class TokenBucket:
+    """Асинхронное ведро токенов с возможностью глобальной паузы"""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Дождаться и забрать один токен"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + max(0.0, now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Остановить выдачу токенов (ответ 429 касается всего бота)"""
+        self._paused_until = max(
+            self._paused_until, time.monotonic() + seconds
+        )
+        # Токены копятся только после паузы, иначе после 429 ведро
+        # отдало бы полный запас разом и получило бы следующий 429
+        self._tokens = 0
+        self._updated = self._paused_until
+
+
+@dataclass(frozen=True, slots=True)
+class Recipient:
+    """Получатель рассылки"""
+
+    tg_id: int
+    user_id: int | None = None
+    notification_id: int | None = None
+
+
+@dataclass
+class DeliveryReport:
+    """Прогресс и итог доставки"""
+
+    total: int
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Сообщений в секунду"""
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+
+ProgressCallback = Callable[[DeliveryReport], Awaitable[None]]
+
+
+class DeliveryEngine:
+    """
+    Конкурентная доставка с ограничением скорости.
+
+    Пул воркеров (не более `concurrency` одновременных запросов) берёт
+    токен из глобального ведра, соблюдает интервал для каждого чата и
+    повторяет отправку после TelegramRetryAfter, приостанавливая всех.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: float = GLOBAL_RATE,
+        per_chat_interval: float = PER_CHAT_INTERVAL,
+        concurrency: int = CONCURRENCY,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        self.bot = bot
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._chat_next: dict[int, float] = {}
+
+    async def _wait_chat(self, chat_id: int) -> None:
+        """Соблюсти минимальный интервал между сообщениями в один чат"""
+        now = time.monotonic()
+        ready_at = self._chat_next.get(chat_id, 0.0)
+        self._chat_next[chat_id] = max(now, ready_at) + self.per_chat_interval
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+        if len(self._chat_next) > 10_000:
+            self._chat_next = {
+                k: v for k, v in self._chat_next.items() if v > now
+            }
+
+    async def send_one(
+        self,
+        chat_id: int,
+        text: str,
+        report: DeliveryReport | None = None,
+        **kwargs: Any,
+    ) -> str | None:
+        """Отправить одно сообщение. Возвращает текст ошибки или None"""
+        error = "превышено число попыток"
+        attempt = 1
+        flood_waits = 0
+        while attempt <= self.max_attempts:
+            await self.bucket.acquire()
+            await self._wait_chat(chat_id)
+            try:
+                await self.bot.send_message(chat_id, text, **kwargs)
+                return None
+            except TelegramRetryAfter as e:
+                BROADCAST_RETRY_AFTER.inc()
+                if report is not None:
+                    report.retries += 1
+                logger.warning(
+                    f"Telegram просит подождать {e.retry_after} с "
+                    f"(чат {chat_id})"
+                )
+                self.bucket.pause(e.retry_after)
+                error = str(e)
+                flood_waits += 1
+                if flood_waits >= MAX_RETRY_AFTER:
+                    return error
+                continue
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Бот заблокирован или чат недоступен — повтор не поможет
+                return str(e)
+            except Exception as e:
+                error = str(e)
+                if attempt < self.max_attempts:
+                    if report is not None:
+                        report.retries += 1
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+                attempt += 1
+        return error
+
+    async def deliver(
+        self,
+        recipients: Sequence[Recipient],
+        text: str,
+        *,
+        on_progress: ProgressCallback | None = None,
+        on_result: Callable[[Recipient, str | None], Awaitable[None]]
+        | None = None,
+        **kwargs: Any,
+    ) -> DeliveryReport:
+        """Доставить `text` всем получателям и вернуть отчёт"""
+        report = DeliveryReport(total=len(recipients))
+        queue: asyncio.Queue[Recipient] = asyncio.Queue()
+        for recipient in recipients:
+            queue.put_nowait(recipient)
+        last_progress = time.monotonic()
+
+        async def worker() -> None:
+            nonlocal last_progress
+            while True:
+                try:
+                    recipient = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                error = await self.send_one(
+                    recipient.tg_id, text, report, **kwargs
+                )
+                if error is None:
+                    report.sent += 1
+                    BROADCAST_MESSAGES.labels("sent").inc()
+                else:
+                    report.failed += 1
+                    BROADCAST_MESSAGES.labels("failed").inc()
+                    logger.warning(
+                        f"Не удалось доставить {recipient.tg_id}: {error}"
+                    )
+                if on_result is not None:
+                    await on_result(recipient, error)
+                now = time.monotonic()
+                if (
+                    on_progress is not None
+                    and now - last_progress >= PROGRESS_INTERVAL
+                ):
+                    last_progress = now
+                    try:
+                        await on_progress(report)
+                    except Exception as e:
+                        logger.error(f"Ошибка в обработчике прогресса: {e}")
+
+        workers = min(self.concurrency, len(recipients)) or 1
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        report.finished_at = time.monotonic()
+        BROADCAST_THROUGHPUT.set(report.throughput)
+        logger.info(
+            f"Рассылка завершена: {report.sent}/{report.total} за "
+            f"{report.elapsed:.1f} с ({report.throughput:.1f} сообщ./с)"
+        )
+        if on_progress is not None:
+            await on_progress(report)
+        return report
+
+    async def broadcast(
+        self,
+        author_id: int,
+        text: str,
+        target_role: str,
+        tg_ids: Iterable[int] | None = None,
+        *,
+        title: str = "Рассылка",
+        on_progress: ProgressCallback | None = None,
+        **kwargs: Any,
+    ) -> DeliveryReport:
+        """Создать рассылку и сразу доставить её"""
+        broadcast_id = await create_broadcast(
+            author_id, text, target_role, tg_ids, title=title
+        )
+        return await self.deliver_broadcast(
+            broadcast_id, on_progress=on_progress, **kwargs
+        )
+
+    async def deliver_broadcast(
+        self,
+        broadcast_id: int,
+        *,
+        on_progress: ProgressCallback | None = None,
+        **kwargs: Any,
+    ) -> DeliveryReport:
+        """
+        Доставить рассылку получателям в статусе pending.
+
+        Статусы сбрасываются в БД пачками, поэтому повторный запуск
+        после падения продолжает с неотправленных получателей.
+        """
+        text, recipients = await _pending_recipients(broadcast_id)
+        pending: list[dict[str, Any]] = []
+
+        async def on_result(recipient: Recipient, error: str | None) -> None:
+            pending.append(_status_row(recipient, error))
+            if len(pending) >= STATUS_FLUSH_SIZE:
+                batch = pending[:]
+                pending.clear()
+                await _flush_statuses(batch)
+
+        report = await self.deliver(
+            recipients,
+            text,
+            on_progress=on_progress,
+            on_result=on_result,
+            **kwargs,
+        )
+        await _flush_statuses(pending)
+        await _finish_broadcast(broadcast_id)
+        return report
+
+
+def _status_row(recipient: Recipient, error: str | None) -> dict[str, Any]:
+    if error is None:
+        return {
+            "id": recipient.notification_id,
+            "status": NotificationStatus.SENT.value,
+            "sent_at": datetime.utcnow(),
+        }
+    return {
+        "id": recipient.notification_id,
+        "status": NotificationStatus.FAILED.value,
+        "error": error[:255],
+    }
+
+
+async def create_broadcast(
+    author_id: int,
+    text: str,
+    target_role: str,
+    tg_ids: Iterable[int] | None = None,
+    *,
+    title: str = "Рассылка",
+) -> int:
+    """Создать Broadcast и ожидающие Notification для получателей"""
+    async with AsyncSessionLocal() as s:
+        query = select(User.id).where(User.tg_id.is_not(None))
+        if tg_ids is not None:
+            query = query.where(User.tg_id.in_(list(tg_ids)))
+        else:
+            query = query.where(
+                User.role == target_role, User.is_active.is_(True)
+            )
+        user_ids = list(await s.scalars(query))
+
+        broadcast = Broadcast(
+            author_id=author_id,
+            title=title,
+            message=text,
+            target_role=target_role,
+            status="sending",
+            total_count=len(user_ids),
+        )
+        s.add(broadcast)
+        await s.flush()
+        s.add_all(
+            Notification(
+                user_id=user_id,
+                broadcast_id=broadcast.id,
+                title=title,
+                message=text,
+                status=NotificationStatus.PENDING.value,
+            )
+            for user_id in user_ids
+        )
+        await s.commit()
+        return broadcast.id
+
+
+async def broadcast_sent_count(broadcast_ids: Sequence[int]) -> int:
+    """Сколько сообщений доставлено по рассылкам (за все запуски)"""
+    async with AsyncSessionLocal() as s:
+        total = await s.scalar(
+            select(func.coalesce(func.sum(Broadcast.sent_count), 0)).where(
+                Broadcast.id.in_(list(broadcast_ids))
+            )
+        )
+    return int(total or 0)
+
+
+async def _pending_recipients(
+    broadcast_id: int,
+) -> tuple[str, list[Recipient]]:
+    """Текст рассылки и получатели, которым она ещё не доставлена"""
+    async with AsyncSessionLocal() as s:
+        text = await s.scalar(
+            select(Broadcast.message).where(Broadcast.id == broadcast_id)
+        )
+        rows = await s.execute(
+            select(Notification.id, User.id, User.tg_id)
+            .join(User, User.id == Notification.user_id)
+            .where(
+                Notification.broadcast_id == broadcast_id,
+                Notification.status == NotificationStatus.PENDING.value,
+            )
+        )
+        recipients = [
+            Recipient(tg_id=tg_id, user_id=user_id, notification_id=nid)
+            for nid, user_id, tg_id in rows
+        ]
+    return text or "", recipients
+
+
+async def _flush_statuses(rows: list[dict[str, Any]]) -> None:
+    """Сохранить статусы доставки одним executemany"""
+    if not rows:
+        return
+    try:
+        async with AsyncSessionLocal() as s:
+            for status in {row["status"] for row in rows}:
+                batch = [row for row in rows if row["status"] == status]
+                await s.execute(update(Notification), batch)
+            await s.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении статусов рассылки: {e}")
+
+
+async def _finish_broadcast(broadcast_id: int) -> None:
+    """Пересчитать итоговые счётчики и статус рассылки"""
+    try:
+        async with AsyncSessionLocal() as s:
+            rows = await s.execute(
+                select(Notification.status, func.count())
+                .where(Notification.broadcast_id == broadcast_id)
+                .group_by(Notification.status)
+            )
+            counts = dict(rows.all())
+            sent = counts.get(NotificationStatus.SENT.value, 0)
+            failed = counts.get(NotificationStatus.FAILED.value, 0)
+            if failed == 0:
+                status = "delivered"
+            elif sent == 0:
+                status = "failed"
+            else:
+                status = "partial"
+            await s.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(
+                    status=status,
+                    sent_count=sent,
+                    failed_count=failed,
+                    finished_at=datetime.utcnow(),
+                )
+            )
+            await s.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при завершении рассылки {broadcast_id}: {e}")
+
+
+# Глобальный экземпляр, инициализируется ботом при старте
+delivery_engine: DeliveryEngine | None = None
+
+
+def init_delivery_engine(bot: Bot) -> DeliveryEngine:
+    """Инициализация движка доставки"""
+    global delivery_engine
+    delivery_engine = DeliveryEngine(bot)
+    return delivery_engine
@@ -0,0 +1,399 @@
+"""
+Надёжная очередь фоновых задач поверх Redis
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis
+from aiogram import Bot
+
+from app.config import settings
+from app.services.cache_service import state_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = "default"
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 600.0
+POLL_INTERVAL = 1.0
+DEAD_JOB_TTL = 7 * 24 * 3600  # Сколько хранить задачи в dead-letter
+UNIQUE_TTL_MIN = 3600  # Ключ уникальности живёт не меньше часа
+JOB_KEY_PREFIX = "jobs:job:"
+
+# Атомарная постановка; при заданном ключе уникальности задача не
+# дублируется, пока предыдущая не выполнена или не ушла в dead-letter.
+# Ключ уникальности хранит id задачи-владельца и снимается, если её
+# данных больше нет, а TTL страхует от ключей, которые никто не снимет
+ENQUEUE_SCRIPT = """
+if ARGV[7] ~= '' then
+  local holder = redis.call('GET', KEYS[4])
+  if holder and redis.call('EXISTS', ARGV[9] .. holder) == 1 then
+    return 0
+  end
+  redis.call('SET', KEYS[4], ARGV[1], 'PX', ARGV[8])
+end
+redis.call('HSET', KEYS[1], 'name', ARGV[2], 'kwargs', ARGV[3],
+           'attempts', 0, 'max_attempts', ARGV[4], 'enqueued_at', ARGV[5],
+           'unique', ARGV[7])
+if tonumber(ARGV[6]) > tonumber(ARGV[5]) then
+  redis.call('ZADD', KEYS[3], ARGV[6], ARGV[1])
+else
+  redis.call('LPUSH', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+# Резервирование: созревшие отложенные задачи и задачи с истёкшим
+# visibility timeout возвращаются в ready, затем одна забирается
+RESERVE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(due) do
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('LPUSH', KEYS[1], id)
+end
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(expired) do
+  redis.call('ZREM', KEYS[3], id)
+  redis.call('RPUSH', KEYS[1], id)
+end
+local id = redis.call('RPOP', KEYS[1])
+if id then
+  redis.call('ZADD', KEYS[3], ARGV[2], id)
+end
+return id
+"""
+
+
+@dataclass(slots=True)
+class Job:
+    """Задача из очереди"""
+
+    id: str
+    name: str
+    kwargs: dict[str, Any]
+    attempts: int = 0
+    max_attempts: int = MAX_ATTEMPTS
+    last_error: str | None = None
+    unique: str | None = None
+
+
+JobHandler = Callable[..., Awaitable[Any]]
+
+# Реестр обработчиков: имя задачи → корутина(bot, **kwargs)
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(name: str) -> Callable[[JobHandler], JobHandler]:
+    """Зарегистрировать обработчик задачи"""
+
+    def decorator(func: JobHandler) -> JobHandler:
+        JOB_HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+class JobQueue:
+    """
+    Очередь с at-least-once доставкой.
+
+    ready — список готовых задач, delayed — отложенные повторы
+    (ZSET по времени запуска), processing — взятые в работу (ZSET по
+    дедлайну видимости), dead — исчерпавшие попытки.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        name: str = QUEUE_NAME,
+        visibility_timeout: float = 300,
+    ) -> None:
+        self.redis = client
+        self.name = name
+        self.visibility_timeout = visibility_timeout
+        self.ready_key = f"jobs:{name}:ready"
+        self.delayed_key = f"jobs:{name}:delayed"
+        self.processing_key = f"jobs:{name}:processing"
+        self.dead_key = f"jobs:{name}:dead"
+        self._enqueue = client.register_script(ENQUEUE_SCRIPT)
+        self._reserve = client.register_script(RESERVE_SCRIPT)
+
+    @staticmethod
+    def job_key(job_id: str) -> str:
+        return f"{JOB_KEY_PREFIX}{job_id}"
+
+    def unique_key(self, unique: str) -> str:
+        return f"jobs:{self.name}:unique:{unique}"
+
+    def unique_ttl(self, max_attempts: int, delay: float = 0) -> float:
+        """Сколько может жить незавершённая задача: попытки и паузы"""
+        pauses = sum(
+            min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+            for attempt in range(1, max_attempts)
+        )
+        return max(
+            UNIQUE_TTL_MIN,
+            delay + max_attempts * self.visibility_timeout + pauses,
+        )
+
+    async def enqueue(
+        self,
+        name: str,
+        *,
+        unique: str | None = None,
+        max_attempts: int = MAX_ATTEMPTS,
+        delay: float = 0,
+        **kwargs: Any,
+    ) -> str | None:
+        """
+        Поставить задачу в очередь.
+
+        Возвращает id задачи или None, если задача с тем же `unique`
+        ещё не завершена.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        created = await self._enqueue(
+            keys=[
+                self.job_key(job_id),
+                self.ready_key,
+                self.delayed_key,
+                self.unique_key(unique or ""),
+            ],
+            args=[
+                job_id,
+                name,
+                json.dumps(kwargs, ensure_ascii=False),
+                max_attempts,
+                now,
+                now + delay,
+                unique or "",
+                int(self.unique_ttl(max_attempts, delay) * 1000),
+                JOB_KEY_PREFIX,
+            ],
+        )
+        if not created:
+            logger.debug(f"Задача {name} ({unique}) уже в очереди")
+            return None
+        logger.info(f"Задача {name} ({job_id}) поставлена в очередь")
+        return job_id
+
+    async def reserve(self) -> Job | None:
+        """Взять следующую задачу с дедлайном видимости"""
+        now = time.time()
+        job_id = await self._reserve(
+            keys=[self.ready_key, self.delayed_key, self.processing_key],
+            args=[now, now + self.visibility_timeout],
+        )
+        if job_id is None:
+            return None
+        if isinstance(job_id, bytes):
+            job_id = job_id.decode()
+
+        key = self.job_key(job_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(key, "attempts", 1)
+            pipe.hgetall(key)
+            attempts, data = await pipe.execute()
+        if "name" not in data:
+            # Данные задачи пропали (HINCRBY создал пустую запись) —
+            # снимаем её; ключ уникальности освободит следующий enqueue
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(self.processing_key, job_id)
+                pipe.delete(key)
+                await pipe.execute()
+            return None
+        return Job(
+            id=job_id,
+            name=data["name"],
+            kwargs=json.loads(data["kwargs"]),
+            attempts=int(attempts),
+            max_attempts=int(data["max_attempts"]),
+            last_error=data.get("last_error"),
+            unique=data.get("unique") or None,
+        )
+
+    async def extend(self, job: Job) -> None:
+        """Продлить видимость долгой задачи и её ключ уникальности"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(
+                self.processing_key,
+                {job.id: time.time() + self.visibility_timeout},
+                xx=True,
+            )
+            if job.unique:
+                pipe.pexpire(
+                    self.unique_key(job.unique),
+                    int(self.unique_ttl(job.max_attempts) * 1000),
+                    gt=True,
+                )
+            await pipe.execute()
+
+    async def ack(self, job: Job) -> None:
+        """Задача выполнена"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, job.id)
+            pipe.delete(self.job_key(job.id))
+            if job.unique:
+                pipe.delete(self.unique_key(job.unique))
+            await pipe.execute()
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Отметить неудачу: повтор с экспоненциальной задержкой или
+        dead-letter. Возвращает True, если задача будет повторена.
+        """
+        key = self.job_key(job.id)
+        retry = job.attempts < job.max_attempts
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.processing_key, job.id)
+            pipe.hset(key, "last_error", error[:1000])
+            if retry:
+                pipe.zadd(
+                    self.delayed_key,
+                    {job.id: time.time() + backoff(job.attempts)},
+                )
+            else:
+                pipe.lpush(self.dead_key, job.id)
+                pipe.expire(key, DEAD_JOB_TTL)
+                if job.unique:
+                    pipe.delete(self.unique_key(job.unique))
+            await pipe.execute()
+        return retry
+
+    async def requeue_dead(self, limit: int = 100) -> int:
+        """Вернуть задачи из dead-letter в очередь со сбросом попыток"""
+        moved = 0
+        for _ in range(limit):
+            job_id = await self.redis.rpop(self.dead_key)
+            if job_id is None:
+                break
+            key = self.job_key(job_id)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, "attempts", 0)
+                pipe.persist(key)
+                pipe.lpush(self.ready_key, job_id)
+                await pipe.execute()
+            moved += 1
+        return moved
+
+    async def stats(self) -> dict[str, int]:
+        """Размеры очередей"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self.ready_key)
+            pipe.zcard(self.delayed_key)
+            pipe.zcard(self.processing_key)
+            pipe.llen(self.dead_key)
+            ready, delayed, processing, dead = await pipe.execute()
+        return {
+            "ready": ready,
+            "delayed": delayed,
+            "processing": processing,
+            "dead": dead,
+        }
+
+
+def backoff(attempt: int) -> float:
+    """Экспоненциальная задержка с джиттером"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobWorker:
+    """Пул воркеров, разбирающих очередь"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        bot: Bot,
+        concurrency: int = 4,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.queue = queue
+        self.bot = bot
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Запустить воркеры и работать до stop()"""
+        logger.info(
+            f"Воркер очереди {self.queue.name}: {self.concurrency} задач "
+            f"одновременно"
+        )
+        await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+
+    async def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.reserve()
+            except Exception as e:
+                logger.error(f"Ошибка чтения очереди: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.process(job)
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            try:
+                await self.queue.extend(job)
+            except Exception as e:
+                logger.warning(f"Не удалось продлить задачу {job.id}: {e}")
+
+    async def process(self, job: Job) -> None:
+        """Выполнить одну задачу и подтвердить или отложить её"""
+        handler = JOB_HANDLERS.get(job.name)
+        if handler is None:
+            job.attempts = job.max_attempts
+            await self.queue.fail(job, f"Неизвестная задача {job.name}")
+            logger.error(f"Нет обработчика для задачи {job.name}")
+            return
+        if job.attempts > job.max_attempts:
+            # Задача повторно роняла воркер и вернулась по таймауту
+            await self.queue.fail(job, job.last_error or "visibility timeout")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.monotonic()
+        try:
+            await handler(self.bot, **job.kwargs)
+        except Exception as e:
+            retry = await self.queue.fail(job, f"{type(e).__name__}: {e}")
+            logger.error(
+                f"Задача {job.name} ({job.id}) упала на попытке "
+                f"{job.attempts}/{job.max_attempts}: {e}"
+                + ("" if retry else " — перемещена в dead-letter")
+            )
+        else:
+            await self.queue.ack(job)
+            logger.info(
+                f"Задача {job.name} ({job.id}) выполнена за "
+                f"{time.monotonic() - started:.2f} с"
+            )
+        finally:
+            heartbeat.cancel()
+
+
+# Глобальный экземпляр очереди
+job_queue = JobQueue(
+    state_client, visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT
+)
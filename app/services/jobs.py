@@ -0,0 +1,111 @@
+"""
+Обработчики фоновых задач, выполняемых воркером очереди
+"""
+
+import logging
+
+from aiogram import Bot
+
+from app.keyboards.main_menu import menu
+from app.services import delivery
+from app.services.delivery import DeliveryReport, init_delivery_engine
+from app.services.job_queue import job_handler
+from app.services.news_parser import news_parser
+from app.services.notification_service import InteractionService
+from app.services.pdf_renderer import send_certificate
+
+logger = logging.getLogger(__name__)
+
+
+def _engine(bot: Bot) -> delivery.DeliveryEngine:
+    """Движок доставки процесса (один на бота ради общих лимитов)"""
+    if delivery.delivery_engine is None:
+        return init_delivery_engine(bot)
+    return delivery.delivery_engine
+
+
+def format_broadcast_report(report: DeliveryReport) -> str:
+    """Текст сообщения о ходе рассылки"""
+    if report.finished_at is None:
+        return (
+            f"📤 Рассылка: {report.done}/{report.total} "
+            f"({report.throughput:.1f} сообщ./с)"
+        )
+    return (
+        f"✅ Рассылка отправлена!\n\n"
+        f"📊 Статистика:\n"
+        f"• Всего получателей: {report.total}\n"
+        f"• Успешно отправлено: {report.sent}\n"
+        f"• Ошибок: {report.failed}\n"
+        f"• Время: {report.elapsed:.1f} с"
+    )
+
+
+@job_handler("broadcast")
+async def broadcast_job(
+    bot: Bot,
+    broadcast_id: int,
+    status_chat_id: int | None = None,
+    status_message_id: int | None = None,
+) -> None:
+    """Доставить сохранённую рассылку, обновляя сообщение о прогрессе"""
+
+    async def on_progress(report: DeliveryReport) -> None:
+        if status_chat_id is None or status_message_id is None:
+            return
+        finished = report.finished_at is not None
+        await bot.edit_message_text(
+            format_broadcast_report(report),
+            chat_id=status_chat_id,
+            message_id=status_message_id,
+            reply_markup=menu("admin", "ru") if finished else None,
+        )
+
+    await _engine(bot).deliver_broadcast(
+        broadcast_id, on_progress=on_progress, parse_mode="HTML"
+    )
+
+
+@job_handler("admin_broadcast")
+async def admin_broadcast_job(
+    bot: Bot,
+    admin_id: int,
+    broadcast_ids: list[int],
+) -> None:
+    """Рассылка по ролям из /broadcast; повтор продолжает доставку"""
+    await InteractionService(bot, _engine(bot)).admin_broadcast(
+        admin_id, broadcast_ids
+    )
+
+
+@job_handler("certificate")
+async def certificate_job(
+    bot: Bot,
+    chat_id: int,
+    cert_type: str,
+    child_name: str,
+    caption: str,
+) -> None:
+    """Сгенерировать справку и отправить её родителю"""
+    await send_certificate(bot, chat_id, cert_type, [child_name], caption)
+
+
+@job_handler("certificate_batch")
+async def certificate_batch_job(
+    bot: Bot,
+    chat_id: int,
+    cert_type: str,
+    child_names: list[str],
+    caption: str | None = None,
+    filename: str = "certificates.pdf",
+) -> None:
+    """Справки на весь класс одним PDF (страница на ученика)"""
+    await send_certificate(
+        bot, chat_id, cert_type, child_names, caption, filename
+    )
+
+
+@job_handler("news_refresh")
+async def news_refresh_job(bot: Bot) -> None:
+    """Обновить канонический список новостей"""
+    await news_parser.refresh()
@@ -1,23 +1,177 @@
-import redis.asyncio as aioredis
+"""
+Атомарный rate limiter на Lua-скриптах Redis.
+
+Каждая проверка — один EVALSHA. Доступны два алгоритма:
+fixed window (INCR + PEXPIRE в одном скрипте) и GCRA — скользящее окно
+без хранения списка событий, одно число (theoretical arrival time) на ключ.
+"""
+
+import logging
+import math
+import time
+
 from pydantic import BaseModel
+from redis.exceptions import RedisError
 
 from app.config import settings
+from app.services.redis_pool import redis_registry
+
+logger = logging.getLogger(__name__)
 
 
 class LimitResult(BaseModel):
     allowed: bool
     retry_after: int | None = None
+    remaining: int | None = None
+
+
+redis_client = redis_registry.client("state")
+
+# ARGV: лимит, окно (мс), запрошенная пачка токенов.
+# Ключ без TTL (например, после сбоя старой версии) получает TTL заново.
+FIXED_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local count = redis.call('INCRBY', KEYS[1], cost)
+if count > limit and cost > 1 then
+  count = redis.call('DECRBY', KEYS[1], cost - 1)
+  cost = 1
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+  redis.call('PEXPIRE', KEYS[1], window)
+  ttl = window
+end
+if count > limit then
+  return {0, ttl, 0}
+end
+return {cost, ttl, limit - count}
+"""
+
+# GCRA: limit запросов за window мс, всплеск до limit.
+# Время берётся с сервера Redis, чтобы узлы не зависели от своих часов.
+GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local emission = period / limit
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+  tat = now
+end
+local new_tat = tat + emission * cost
+if new_tat - now > period and cost > 1 then
+  cost = 1
+  new_tat = tat + emission
+end
+local diff = new_tat - now
+if diff > period then
+  return {0, math.ceil(diff - period), 0}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(diff))
+return {cost, 0, math.floor((period - diff) / emission)}
+"""
+
+ALGORITHMS = {
+    "fixed": redis_client.register_script(FIXED_WINDOW_SCRIPT),
+    "gcra": redis_client.register_script(GCRA_SCRIPT),
+}
+
+# Локальная «аренда» токенов: пользователю, который пишет чаще раза
+# в LEASE_TTL, скрипт выдаёт сразу пачку, и следующие сообщения
+# проверяются без Redis. Размер пачки — сколько сообщений ожидается
+# за LEASE_TTL при наблюдаемом темпе: неизрасходованные токены
+# сгорают, поэтому редкие сообщения всегда стоят один токен.
+# Благодаря партиционированию апдейтов по чату пользователь обычно
+# обслуживается одним процессом, так что аренда почти не теряется.
+LEASE_MAX = 5
+LEASE_TTL = 2.0  # секунды
+LEASE_CACHE_SIZE = 10_000
+
+_leases: dict[str, tuple[int, float]] = {}
+_last_seen: dict[str, float] = {}
+
+
+def _lease_size(key: str, limit: int, now: float) -> int:
+    """Размер пачки по интервалу с прошлого сообщения ключа"""
+    last = _last_seen.get(key)
+    if last is None or now - last >= LEASE_TTL:
+        return 1
+    expected = 1 + int(LEASE_TTL / max(now - last, 0.001))
+    return max(1, min(LEASE_MAX, limit // 10, expected))
+
+
+def _remember(key: str, now: float) -> None:
+    if len(_last_seen) >= LEASE_CACHE_SIZE:
+        for stale in [
+            k for k, t in _last_seen.items() if now - t >= LEASE_TTL
+        ]:
+            del _last_seen[stale]
+        if len(_last_seen) >= LEASE_CACHE_SIZE:
+            _last_seen.clear()
+    _last_seen[key] = now
+
+
+def _take_lease(key: str, now: float) -> bool:
+    lease = _leases.get(key)
+    if lease is None:
+        return False
+    tokens, expires_at = lease
+    if expires_at <= now:
+        del _leases[key]
+        return False
+    if tokens <= 1:
+        del _leases[key]
+    else:
+        _leases[key] = (tokens - 1, expires_at)
+    return True
+
+
+def _store_lease(key: str, tokens: int, window: int, now: float) -> None:
+    if tokens <= 0:
+        return
+    if len(_leases) >= LEASE_CACHE_SIZE:
+        for stale in [k for k, (_, exp) in _leases.items() if exp <= now]:
+            del _leases[stale]
+        if len(_leases) >= LEASE_CACHE_SIZE:
+            _leases.clear()
+    _leases[key] = (tokens, now + min(LEASE_TTL, window))
 
 
-redis_client = aioredis.from_url(settings.REDIS_DSN, decode_responses=True)
+async def hit(
+    key: str,
+    limit: int,
+    window: int,
+    algorithm: str = settings.RATE_LIMIT_ALGORITHM,
+) -> LimitResult:
+    """Проверяет rate limit для ключа за один запрос к Redis"""
+    if limit <= 0:
+        return LimitResult(allowed=False, retry_after=max(window, 0))
+    if window <= 0:
+        return LimitResult(allowed=True)
+    now = time.monotonic()
+    lease = _lease_size(key, limit, now)
+    _remember(key, now)
+    if _take_lease(key, now):
+        return LimitResult(allowed=True)
 
+    try:
+        granted, retry_ms, remaining = await ALGORITHMS[algorithm](
+            keys=[key], args=[limit, window * 1000, lease]
+        )
+    except RedisError as e:
+        # Недоступный Redis не должен останавливать бота
+        logger.warning(f"Rate limiter недоступен, пропускаем {key}: {e}")
+        return LimitResult(allowed=True)
 
-async def hit(key: str, limit: int, window: int) -> LimitResult:
-    """Проверяет rate limit для ключа"""
-    ttl = await redis_client.ttl(key)
-    val = await redis_client.incr(key)
-    if val == 1:
-        await redis_client.expire(key, window)
-    if val > limit:
-        return LimitResult(allowed=False, retry_after=max(ttl, 0))
-    return LimitResult(allowed=True)
+    if not granted:
+        return LimitResult(
+            allowed=False,
+            retry_after=math.ceil(int(retry_ms) / 1000),
+            remaining=0,
+        )
+    _store_lease(key, int(granted) - 1, window, now)
+    return LimitResult(allowed=True, remaining=int(remaining))
@@ -2,17 +2,22 @@
 Парсер новостей с mos.ru с улучшениями согласно Context7
 """
 
+import asyncio
+import json
 import logging
+import secrets
 import time
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin, urlparse
 
-import requests
+import aiohttp
 from bs4 import BeautifulSoup, SoupStrainer
 
 from app.schemas.news import CacheInfo, NewsCard, NewsResponse, RateLimitInfo
+from app.services.cache_service import redis_client
+from app.services.redis_pool import RELEASE_LOCK_SCRIPT
 
 logger = logging.getLogger(__name__)
 
@@ -60,29 +65,45 @@ class RateLimiter:
         )
 
 
-class NewsParser:
-    """Парсер новостей с официальных сайтов с улучшениями Context7"""
+# Параметры HTTP-клиента
+NEWS_URL = "https://www.mos.ru/news/rubric/obrazovanie/"
+REQUEST_TIMEOUT = 10  # секунд на весь запрос
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.1
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+POOL_LIMIT = 10  # соединений на процесс
 
-    def __init__(self) -> None:
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-        )
+# Канонический список новостей в Redis; любой limit — срез этого списка
+NEWS_CACHE_KEY = "news_cache:all"
+NEWS_LOCK_KEY = "news_cache:refresh_lock"
+NEWS_MAX_ITEMS = 20  # совпадает с верхней границей NewsRequest.limit
+NEWS_FRESH_SECONDS = 300  # после этого данные отдаются, но обновляются
+NEWS_CACHE_TTL = 24 * 3600  # жёсткий срок хранения в Redis
+NEWS_REFRESH_INTERVAL = 240  # период фонового обновления
+NEWS_LOCK_TTL = 60
 
-        # Добавляем retry-логику согласно Context7
-        from requests.adapters import HTTPAdapter
-        from urllib3.util import Retry
 
-        retries = Retry(
-            total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504]
-        )
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+class NewsParser:
+    """Парсер новостей с официальных сайтов с улучшениями Context7"""
 
-        # Кэширование согласно Context7
-        self._cache: Dict[str, Any] = {}
-        self._cache_ttl = timedelta(minutes=15)
+    def __init__(self) -> None:
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        # Сессия aiohttp создаётся лениво внутри работающего event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Валидаторы для условных запросов (ETag / Last-Modified)
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._last_html: Optional[str] = None
+
+        # Последний канонический список новостей в памяти процесса
+        self._news: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at: float = 0.0
+        self._cache_ttl = timedelta(seconds=NEWS_FRESH_SECONDS)
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task[bool]] = None
 
         # Rate limiting согласно Context7
         self.rate_limiter = RateLimiter()
@@ -94,80 +115,202 @@ class NewsParser:
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Общий пул соединений для всех запросов парсера"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                connector=aiohttp.TCPConnector(
+                    limit=POOL_LIMIT, ttl_dns_cache=300
+                ),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Закрыть пул соединений"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _fetch(self, url: str) -> str:
+        """
+        Загрузить страницу с повторами и условными запросами.
+
+        Повторяет запрос при сетевых ошибках и статусах 5xx с
+        экспоненциальной задержкой. Ответ 304 возвращает ранее
+        загруженную страницу.
+        """
+        headers = {}
+        if self._last_html is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        session = self._get_session()
+        for attempt in range(RETRY_TOTAL + 1):
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and self._last_html is not None:
+                        self.logger.info("Страница новостей не изменилась")
+                        return self._last_html
+                    if (
+                        response.status in RETRY_STATUSES
+                        and attempt < RETRY_TOTAL
+                    ):
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                        )
+                    response.raise_for_status()
+                    html = await response.text()
+                    self._etag = response.headers.get("ETag")
+                    self._last_modified = response.headers.get("Last-Modified")
+                    self._last_html = html
+                    return html
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= RETRY_TOTAL:
+                    raise
+                delay = RETRY_BACKOFF_FACTOR * (2**attempt)
+                self.logger.warning(
+                    f"Ошибка запроса {url} ({e}), повтор через {delay:.1f}с"
+                )
+                await asyncio.sleep(delay)
+        raise aiohttp.ClientError(f"Не удалось загрузить {url}")
+
+    def _parse_html(self, html: str, limit: int) -> List[Dict[str, Any]]:
+        """Разобрать HTML страницы новостей (выполняется в потоке)"""
+        # Оптимизированный парсинг с SoupStrainer согласно Context7
+        strainer = SoupStrainer(
+            "div", class_=lambda x: x and "news" in x.lower()
+        )
+        soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+        return self._parse_news_cards(soup, limit)
+
     async def get_news_cards(self, limit: int = 5) -> List[Dict[str, Any]]:
-        """Получить карточки новостей с mos.ru с улучшенным кэшированием"""
+        """
+        Получить карточки новостей без ожидания mos.ru.
+
+        Отдаёт срез канонического списка из памяти или Redis. Устаревшие
+        данные возвращаются сразу, а обновление запускается в фоне. Если
+        кэш пуст, возвращаются заглушки и также запускается обновление.
+        """
         self.logger.info(f"Запрос новостей, лимит: {limit}")
 
-        # Проверяем rate limiting
-        if not self.rate_limiter.can_request("news_parser"):
-            self.logger.warning("Превышен лимит запросов к парсеру новостей")
-            return self._get_fallback_news()
+        news, fetched_at = await self._load_cached()
+        if news is None:
+            self._schedule_refresh()
+            return self._get_fallback_news()[:limit]
+
+        if time.time() - fetched_at >= NEWS_FRESH_SECONDS:
+            self._schedule_refresh()
+        return news[:limit]
+
+    async def _load_cached(
+        self,
+    ) -> tuple[Optional[List[Dict[str, Any]]], float]:
+        """Канонический список: память процесса, затем Redis"""
+        if (
+            self._news is not None
+            and time.time() - self._fetched_at < NEWS_FRESH_SECONDS
+        ):
+            return self._news, self._fetched_at
 
-        # Проверяем Redis кэш (если доступен)
-        cache_key = f"news_cache:{limit}"
         try:
-            from app.services.cache_service import redis_client
-            import json
-
-            cached_data = await redis_client.get(cache_key)
+            cached_data = await redis_client.get(NEWS_CACHE_KEY)
             if cached_data:
-                self.logger.info(
-                    f"Возвращаем новости из Redis кэша: {len(json.loads(cached_data))}"
-                )
-                return json.loads(cached_data)
+                payload = json.loads(cached_data)
+                if payload["fetched_at"] > self._fetched_at:
+                    self._news = payload["news"]
+                    self._fetched_at = payload["fetched_at"]
         except Exception as e:
             self.logger.warning(f"Redis кэш недоступен: {e}")
 
-        # Проверяем локальный кэш согласно Context7
-        cache_key_local = f"news_{limit}"
-        now = datetime.now()
+        return self._news, self._fetched_at
+
+    async def warm_up(self) -> int:
+        """
+        Прогрев при старте: список из Redis, а если его там нет —
+        загрузка с mos.ru сразу, а не при первом запросе пользователя
+        """
+        news, _ = await self._load_cached()
+        if news is None:
+            await self.refresh()
+        return len(self._news or [])
+
+    def _schedule_refresh(self) -> None:
+        """Запустить фоновое обновление, если оно ещё не идёт"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self) -> bool:
+        """
+        Загрузить и разобрать новости, сохранить канонический список.
+
+        Внутри процесса обновление выполняется одно за раз, между
+        процессами — под коротким Redis-локом.
+        """
+        if self._refresh_lock.locked():
+            return False
+        async with self._refresh_lock:
+            if not self.rate_limiter.can_request("news_parser"):
+                self.logger.warning("Превышен лимит запросов к mos.ru")
+                return False
+            token: Optional[str] = secrets.token_hex(16)
+            try:
+                if not await redis_client.set(
+                    NEWS_LOCK_KEY, token, nx=True, ex=NEWS_LOCK_TTL
+                ):
+                    return False
+            except Exception as e:
+                # Без Redis обновляем без лока, и снимать нечего
+                token = None
+                self.logger.warning(f"Redis лок недоступен: {e}")
 
-        if cache_key_local in self._cache:
-            cached_data, cached_time = self._cache[cache_key_local]
-            if now - cached_time < self._cache_ttl:
-                self.logger.info(
-                    f"Возвращаем кэшированные новости из локального кэша: {len(cached_data)}"
-                )
-                return cached_data
+            try:
+                html = await self._fetch(NEWS_URL)
 
-        try:
-            url = "https://www.mos.ru/news/rubric/obrazovanie/"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()  # Проверка HTTP статуса согласно Context7
+                # BeautifulSoup разбирает страницу вне event loop
+                news_cards = await asyncio.to_thread(
+                    self._parse_html, html, NEWS_MAX_ITEMS
+                )
+                fetched_at = time.time()
+                self._news, self._fetched_at = news_cards, fetched_at
 
-            # Оптимизированный парсинг с SoupStrainer согласно Context7
-            strainer = SoupStrainer(
-                "div", class_=lambda x: x and "news" in x.lower()
-            )
-            soup = BeautifulSoup(
-                response.text, "html.parser", parse_only=strainer
-            )
+                try:
+                    await redis_client.setex(
+                        NEWS_CACHE_KEY,
+                        NEWS_CACHE_TTL,
+                        json.dumps(
+                            {"fetched_at": fetched_at, "news": news_cards}
+                        ),
+                    )
+                except Exception as e:
+                    self.logger.warning(
+                        f"Не удалось сохранить в Redis кэш: {e}"
+                    )
 
-            news_cards = self._parse_news_cards(soup, limit)
+                self.logger.info(f"Получено {len(news_cards)} новостей")
+                return True
 
-            # Сохраняем в Redis кэш (если доступен)
-            try:
-                await redis_client.setex(
-                    cache_key, 300, json.dumps(news_cards)
-                )  # 5 минут TTL
-                self.logger.info(f"Новости сохранены в Redis кэш")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.error(f"Ошибка HTTP запроса: {e}")
             except Exception as e:
-                self.logger.warning(f"Не удалось сохранить в Redis кэш: {e}")
-
-            # Сохраняем в локальный кэш
-            self._cache[cache_key_local] = (news_cards, now)
-            self.logger.info(f"Получено {len(news_cards)} новостей")
-            return news_cards
-
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Ошибка HTTP запроса: {e}")
-            return self._get_fallback_news()
-        except Exception as e:
-            self.logger.error(
-                f"Неожиданная ошибка при получении новостей: {e}",
-                exc_info=True,
-            )
-            return self._get_fallback_news()
+                self.logger.error(
+                    f"Неожиданная ошибка при получении новостей: {e}",
+                    exc_info=True,
+                )
+            finally:
+                if token is not None:
+                    try:
+                        await redis_client.eval(
+                            RELEASE_LOCK_SCRIPT, 1, NEWS_LOCK_KEY, token
+                        )
+                    except Exception:
+                        pass
+            return False
 
     async def get_news_response(self, limit: int = 5) -> NewsResponse:
         """Получить новости в виде валидированного ответа"""
@@ -201,23 +344,20 @@ class NewsParser:
     def get_cache_info(self) -> CacheInfo:
         """Получить информацию о кэше"""
         now = datetime.now()
-        cache_size = len(self._cache)
-
-        # Находим самый старый кэш для определения TTL
-        oldest_cache = None
-        if self._cache:
-            oldest_cache = min(self._cache.values(), key=lambda x: x[1])
+        cached_at = (
+            datetime.fromtimestamp(self._fetched_at)
+            if self._news is not None
+            else now
+        )
 
         return CacheInfo(
-            cache_key="news_cache",
-            cached_at=oldest_cache[1] if oldest_cache else now,
+            cache_key=NEWS_CACHE_KEY,
+            cached_at=cached_at,
             ttl_seconds=int(self._cache_ttl.total_seconds()),
             is_expired=(
-                oldest_cache and (now - oldest_cache[1]) > self._cache_ttl
-                if oldest_cache
-                else False
+                self._news is not None and now - cached_at > self._cache_ttl
             ),
-            cache_size=cache_size,
+            cache_size=len(self._news or []),
         )
 
     def get_rate_limit_info(self) -> RateLimitInfo:
@@ -2,44 +2,64 @@
 Универсальный сервис для уведомлений между ролями
 """
 
-import asyncio
+import logging
 from typing import List
 
 from aiogram import Bot
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from app.i18n import t
+from app.i18n import t, t_format
 from app.repositories.ticket_repo import create_ticket
-from app.repositories.user_repo import get_user, get_users_by_role
+from app.repositories.user_repo import get_user
 from app.roles import UserRole
+from app.services.delivery import (
+    DeliveryEngine,
+    broadcast_sent_count,
+    create_broadcast,
+    init_delivery_engine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Получатели /broadcast по умолчанию
+ADMIN_BROADCAST_ROLES = [UserRole.STUDENT, UserRole.TEACHER, UserRole.PARENT]
 
 
 class NotificationService:
     """Сервис для отправки уведомлений между ролями"""
 
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, engine: DeliveryEngine | None = None):
         self.bot = bot
-
-    async def notify_role(self, role: UserRole, message: str, **kwargs) -> int:
-        """Отправляет уведомление всем пользователям с указанной ролью"""
-        users = await get_users_by_role(role)
-        sent_count = 0
-
-        for user in users:
-            try:
-                await self.bot.send_message(
-                    user.telegram_id,
-                    message.format(**kwargs),
-                    parse_mode="HTML",
-                )
-                sent_count += 1
-                await asyncio.sleep(0.1)  # Задержка между отправками
-            except Exception as e:
-                print(
-                    f"Ошибка отправки уведомления пользователю {user.telegram_id}: {e}"
-                )
-
-        return sent_count
+        self.engine = engine or DeliveryEngine(bot)
+
+    async def notify_role(
+        self,
+        role: UserRole,
+        message: str,
+        *,
+        author_id: int,
+        title: str = "Уведомление",
+        **kwargs,
+    ) -> int:
+        """
+        Отправляет уведомление всем пользователям с указанной ролью.
+
+        Уведомление сохраняется как Broadcast (author_id — users.id
+        инициатора) со статусом доставки каждому получателю.
+        """
+        reply_markup = kwargs.pop("reply_markup", None)
+        report = await self.engine.broadcast(
+            author_id,
+            message.format(**kwargs),
+            role.value,
+            title=title,
+            parse_mode="HTML",
+            reply_markup=reply_markup,
+        )
+        logger.info(
+            f"Уведомление роли {role.value}: {report.sent}/{report.total}"
+        )
+        return report.sent
 
     async def notify_admins(self, message: str, **kwargs) -> int:
         """Отправляет уведомление администраторам"""
@@ -69,9 +89,9 @@ class NotificationService:
 class InteractionService:
     """Сервис для взаимодействий между ролями"""
 
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, engine: DeliveryEngine | None = None):
         self.bot = bot
-        self.notification_service = NotificationService(bot)
+        self.notification_service = NotificationService(bot, engine)
 
     async def student_to_psychologist(
         self, student_id: int, theme: str, classroom: str = "не указан"
@@ -94,13 +114,17 @@ class InteractionService:
         ticket = await create_ticket(**ticket_data)
 
         # Уведомляем психологов
-        alert_message = t("psychologist.student_alert", "ru").format(
+        alert_message = t_format(
+            "psychologist.student_alert",
+            "ru",
             student=f"{student.first_name} {student.last_name or ''}",
             classroom=classroom,
             theme=theme,
         )
 
-        await self.notification_service.notify_psychologists(alert_message)
+        await self.notification_service.notify_psychologists(
+            alert_message, author_id=student.id
+        )
 
         # Подтверждение ученику
         confirm_message = t("student.psy_request_confirm", "ru")
@@ -127,17 +151,21 @@ class InteractionService:
         ticket = await create_ticket(**ticket_data)
 
         # Уведомляем техподдержку (админов)
-        support_message = t("support.request_received", "ru").format(
+        support_message = t_format(
+            "support.request_received",
+            "ru",
             description=description,
             room=room,
             teacher=f"{teacher.first_name} {teacher.last_name or ''}",
         )
 
-        await self.notification_service.notify_admins(support_message)
+        await self.notification_service.notify_admins(
+            support_message, author_id=teacher.id
+        )
 
         # Подтверждение учителю
-        confirm_message = t("teacher.support_request_confirm", "ru").format(
-            time="16:00"
+        confirm_message = t_format(
+            "teacher.support_request_confirm", "ru", time="16:00"
         )
         await self.bot.send_message(teacher_id, confirm_message)
 
@@ -152,8 +180,8 @@ class InteractionService:
         # Создаём тикет
         ticket_data = {
             "title": f"Инцидент в {classroom}",
-            "description": t("teacher.incident_report", "ru").format(
-                classroom=classroom
+            "description": t_format(
+                "teacher.incident_report", "ru", classroom=classroom
             ),
             "author_id": teacher.id,
             "status": "open",
@@ -164,11 +192,16 @@ class InteractionService:
         ticket = await create_ticket(**ticket_data)
 
         # Уведомляем директора
-        director_message = t("director.incident_notify", "ru").format(
-            classroom=classroom, measures=measures
+        director_message = t_format(
+            "director.incident_notify",
+            "ru",
+            classroom=classroom,
+            measures=measures,
         )
 
-        await self.notification_service.notify_director(director_message)
+        await self.notification_service.notify_director(
+            director_message, author_id=teacher.id
+        )
 
         # Подтверждение учителю
         thank_message = t("teacher.incident_teacher_thank", "ru")
@@ -198,25 +231,38 @@ class InteractionService:
         message = t("psychologist.parent_consent_request", "ru")
         await self.bot.send_message(parent_id, message, reply_markup=keyboard)
 
-    async def admin_broadcast(
-        self, admin_id: int, message: str, target_roles: List[UserRole] = None
-    ) -> int:
-        """Администратор делает массовую рассылку"""
+    @staticmethod
+    async def create_admin_broadcast(
+        author_id: int,
+        message: str,
+        target_roles: List[UserRole] | None = None,
+    ) -> List[int]:
+        """
+        Сохранить рассылку администратора: по Broadcast на роль,
+        получатели фиксируются сразу. Доставляет admin_broadcast
+        """
         if target_roles is None:
-            target_roles = [
-                UserRole.STUDENT,
-                UserRole.TEACHER,
-                UserRole.PARENT,
-            ]
+            target_roles = ADMIN_BROADCAST_ROLES
+        return [
+            await create_broadcast(author_id, message, role.value)
+            for role in target_roles
+        ]
 
-        total_sent = 0
-        for role in target_roles:
-            sent = await self.notification_service.notify_role(role, message)
-            total_sent += sent
+    async def admin_broadcast(
+        self, admin_id: int, broadcast_ids: List[int]
+    ) -> int:
+        """
+        Доставить рассылку администратора. Повторный запуск продолжает
+        с получателей, которым сообщение ещё не доставлено
+        """
+        engine = self.notification_service.engine
+        for broadcast_id in broadcast_ids:
+            await engine.deliver_broadcast(broadcast_id, parse_mode="HTML")
+        total_sent = await broadcast_sent_count(broadcast_ids)
 
         # Подтверждение администратору
-        confirm_message = t("admin.broadcast_sent", "ru").format(
-            count=total_sent
+        confirm_message = t_format(
+            "admin.broadcast_sent", "ru", count=total_sent
         )
         await self.bot.send_message(admin_id, confirm_message)
 
@@ -226,7 +272,7 @@ class InteractionService:
         self, admin_id: int, date: str, time: str
     ) -> None:
         """Администратор объявляет событие"""
-        message = t("admin.event_announce", "ru").format(date=date, time=time)
+        message = t_format("admin.event_announce", "ru", date=date, time=time)
 
         keyboard = InlineKeyboardMarkup(
             inline_keyboard=[
@@ -239,14 +285,18 @@ class InteractionService:
             ]
         )
 
+        admin = await get_user(admin_id)
+        if not admin:
+            return
+
         # Отправляем всем родителям
         await self.notification_service.notify_parents(
-            message, reply_markup=keyboard
+            message, author_id=admin.id, reply_markup=keyboard
         )
 
         # Подтверждение администратору
-        confirm_message = t("admin.broadcast_sent", "ru").format(
-            count="все родители"
+        confirm_message = t_format(
+            "admin.broadcast_sent", "ru", count="все родители"
         )
         await self.bot.send_message(admin_id, confirm_message)
 
@@ -254,8 +304,11 @@ class InteractionService:
         self, teacher_id: int, ticket_id: int, description: str
     ) -> None:
         """Техподдержка отвечает учителю"""
-        message = t("support.request_processed", "ru").format(
-            ticket_id=ticket_id, description=description
+        message = t_format(
+            "support.request_processed",
+            "ru",
+            ticket_id=ticket_id,
+            description=description,
         )
 
         await self.bot.send_message(teacher_id, message)
@@ -264,8 +317,12 @@ class InteractionService:
         self, student_id: int, date: str, time: str, location: str
     ) -> None:
         """Психолог назначает консультацию ученику"""
-        message = t("psychologist.consultation_scheduled", "ru").format(
-            date=date, time=time, location=location
+        message = t_format(
+            "psychologist.consultation_scheduled",
+            "ru",
+            date=date,
+            time=time,
+            location=location,
         )
 
         await self.bot.send_message(student_id, message)
@@ -279,5 +336,7 @@ interaction_service: InteractionService = None
 def init_notification_services(bot: Bot) -> None:
     """Инициализирует глобальные сервисы уведомлений"""
     global notification_service, interaction_service
-    notification_service = NotificationService(bot)
-    interaction_service = InteractionService(bot)
+    # Один движок на процесс: лимиты Telegram общие для всего бота
+    engine = init_delivery_engine(bot)
+    notification_service = NotificationService(bot, engine)
+    interaction_service = InteractionService(bot, engine)
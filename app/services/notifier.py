@@ -4,6 +4,8 @@ from typing import Iterable
 from aiogram import Bot
 
 from app.config import TELEGRAM_TOKEN
+from app.services import delivery
+from app.services.delivery import DeliveryEngine, Recipient
 
 log = logging.getLogger(__name__)
 
@@ -13,15 +15,18 @@ async def broadcast(user_ids: Iterable[int], text: str) -> int:
     Отправляет `text` всем Telegram-ID из списка.
     Возвращает количество успешно доставленных сообщений.
     """
-    sent = 0
+    recipients = [Recipient(tg_id=uid) for uid in user_ids]
+    if delivery.delivery_engine is not None:
+        report = await delivery.delivery_engine.deliver(
+            recipients, text, parse_mode="HTML"
+        )
+        return report.sent
+
+    # Вне процесса бота (скрипты) — временный бот с теми же лимитами
     try:
         async with Bot(TELEGRAM_TOKEN, parse_mode="HTML") as tmp:
-            for uid in user_ids:
-                try:
-                    await tmp.send_message(uid, text)
-                    sent += 1
-                except Exception as e:
-                    log.warning("Не удалось отправить %s: %s", uid, e)
+            report = await DeliveryEngine(tmp).deliver(recipients, text)
+            return report.sent
     except Exception as e:
         log.error(f"Ошибка при создании бота для рассылки: {e}")
-    return sent
+    return 0
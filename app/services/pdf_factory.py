@@ -1,9 +1,106 @@
+"""
+Справки в PDF (reportlab).
+
+Постоянная часть страницы (заголовок, подпись директора) рисуется
+в документе один раз как form XObject и переиспользуется на каждой
+странице; на страницу выводятся только ФИО, текст и дата. Шрифты
+регистрируются один раз на процесс. Документ строится с invariant=1:
+одинаковые данные дают побайтно одинаковый PDF.
+
+Функции модуля синхронные и работают с CPU — из асинхронного кода их
+вызывают через app.services.pdf_renderer (пул процессов).
+"""
+
+import hashlib
+import json
 from datetime import date
+from functools import lru_cache
 from io import BytesIO
+from typing import Iterable, Tuple
 
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from app.config import settings
+
+# Меняется вместе с макетом: старые file_id в кэше перестают совпадать
+TEMPLATE_VERSION = 2
+
+TITLES = {
+    "school": "СПРАВКА об обучении",
+    "family": "СПРАВКА о составе семьи",
+}
+TEXTS = {
+    "school": "Настоящим подтверждается, что {child_name}\n"
+    "является учеником МОУ «Школа №777» и обучается\n"
+    "в 8-Б классе на 2025/26 учебный год.",
+    "family": "Настоящим подтверждается, что {child_name}\n"
+    "проживает в семье совместно с родителями\n"
+    "Ивановым А.А. и Ивановой Б.Б.",
+}
+
+
+@lru_cache(maxsize=1)
+def fonts() -> Tuple[str, str]:
+    """Обычный и жирный шрифт; TTF из настроек регистрируется один раз"""
+    if not settings.PDF_FONT_FILE:
+        return "Helvetica", "Helvetica-Bold"
+    pdfmetrics.registerFont(TTFont("CertFont", settings.PDF_FONT_FILE))
+    bold = settings.PDF_FONT_BOLD_FILE or settings.PDF_FONT_FILE
+    pdfmetrics.registerFont(TTFont("CertFont-Bold", bold))
+    return "CertFont", "CertFont-Bold"
+
+
+def warm_up() -> None:
+    """Инициализатор процесса пула: шрифты загружаются до первой задачи"""
+    fonts()
+
+
+def _draw_static(c: canvas.Canvas, cert_type: str) -> None:
+    regular, bold = fonts()
+    w, h = A4
+    c.setFont(bold, 18)
+    c.drawCentredString(w / 2, h - 100, TITLES[cert_type])
+    c.setFont(regular, 12)
+    c.drawString(w - 200, 120, "Директор _________ /Сидорова Н.Н./")
+
+
+def _draw_fields(
+    c: canvas.Canvas, cert_type: str, child_name: str, issued: date
+) -> None:
+    regular, _ = fonts()
+    _, h = A4
+    c.setFont(regular, 12)
+    text = TEXTS[cert_type].format(child_name=child_name)
+    for i, line in enumerate(text.split("\n"), start=1):
+        c.drawString(80, h - 120 - i * 20, line)
+    c.drawString(80, 120, f"Дата выдачи: {issued.strftime('%d.%m.%Y')}")
+
+
+def render_pdf(
+    cert_type: str, child_names: Iterable[str], issued: date | None = None
+) -> bytes:
+    """Одна страница-справка на каждого ребёнка в одном PDF"""
+    if cert_type not in TITLES:
+        raise ValueError(f"Неизвестный тип справки: {cert_type}")
+    issued = issued or date.today()
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+
+    form = f"static_{cert_type}"
+    c.beginForm(form)
+    _draw_static(c, cert_type)
+    c.endForm()
+
+    for child_name in child_names:
+        c.doForm(form)
+        _draw_fields(c, cert_type, child_name, issued)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
 
 def make_certificate(
     cert_type: str, child_name: str = "Иванов Иван"
@@ -12,34 +109,20 @@ def make_certificate(
     cert_type: 'school' | 'family'.
     Возвращает BytesIO с PDF-файлом.
     """
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    w, h = A4
+    return BytesIO(render_pdf(cert_type, [child_name]))
 
-    title_map = {
-        "school": "СПРАВКА об обучении",
-        "family": "СПРАВКА о составе семьи",
-    }
-    text_map = {
-        "school": f"Настоящим подтверждается, что {child_name}\n"
-        f"является учеником МОУ «Школа №777» и обучается\n"
-        f"в 8-Б классе на 2025/26 учебный год.",
-        "family": f"Настоящим подтверждается, что {child_name}\n"
-        f"проживает в семье совместно с родителями\n"
-        f"Ивановым А.А. и Ивановой Б.Б.",
-    }
-
-    c.setFont("Helvetica-Bold", 18)
-    c.drawCentredString(w / 2, h - 100, title_map[cert_type])
-
-    c.setFont("Helvetica", 12)
-    for i, line in enumerate(text_map[cert_type].split("\n"), start=1):
-        c.drawString(80, h - 120 - i * 20, line)
 
-    c.drawString(80, 120, f"Дата выдачи: {date.today().strftime('%d.%m.%Y')}")
-    c.drawString(w - 200, 120, "Директор _________ /Сидорова Н.Н./")
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
+def certificate_key(
+    cert_type: str, child_names: Iterable[str], issued: date | None = None
+) -> str:
+    """Хэш содержимого справки: одинаковые данные → один и тот же PDF"""
+    payload = json.dumps(
+        [
+            TEMPLATE_VERSION,
+            cert_type,
+            list(child_names),
+            (issued or date.today()).isoformat(),
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,113 @@
+"""
+Рендер справок в пуле процессов и кэш отправленных файлов.
+
+reportlab занимает CPU и держит GIL, поэтому документы строятся
+в отдельных процессах (settings.PDF_WORKERS). Отправленный документ
+запоминается по хэшу содержимого: повторный запрос той же справки
+уходит по Telegram file_id без рендера и повторной загрузки.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Sequence
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from app.config import settings
+from app.services import pdf_factory
+from app.services.assets import get_file_id, set_file_id
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """
+    forkserver: процессы пула порождаются чистым однопоточным сервером,
+    а не форком бота с его потоками, соединениями и захваченными
+    блокировками. Сервер один раз импортирует pdf_factory (reportlab),
+    так что процесс пула не тянет aiogram, как при spawn
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([pdf_factory.__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PDF_WORKERS,
+            mp_context=_mp_context(),
+            initializer=pdf_factory.warm_up,
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    """Остановить пул (при завершении воркера)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def render(
+    cert_type: str, child_names: Sequence[str], issued: date | None = None
+) -> bytes:
+    """PDF со справками на всех детей, построенный в пуле процессов"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _pool(), pdf_factory.render_pdf, cert_type, list(child_names), issued
+    )
+
+
+async def cached_file_id(key: str) -> str | None:
+    return await get_file_id(f"pdf:{key}")
+
+
+async def remember_file_id(key: str, file_id: str) -> None:
+    await set_file_id(f"pdf:{key}", file_id, settings.PDF_FILE_ID_TTL)
+
+
+async def send_certificate(
+    bot: Bot,
+    chat_id: int,
+    cert_type: str,
+    child_names: Sequence[str],
+    caption: str | None = None,
+    filename: str = "certificate.pdf",
+) -> None:
+    """
+    Отправить справку (или пачку справок одним файлом).
+
+    Сначала пробуем file_id ранее отправленного такого же документа;
+    если Telegram его не принял — строим PDF заново.
+    """
+    issued = date.today()
+    key = pdf_factory.certificate_key(cert_type, child_names, issued)
+
+    file_id = await cached_file_id(key)
+    if file_id:
+        try:
+            await bot.send_document(chat_id, document=file_id, caption=caption)
+            return
+        except TelegramBadRequest as e:
+            logger.info(f"file_id справки устарел, загружаем заново: {e}")
+
+    pdf = await render(cert_type, child_names, issued)
+    message = await bot.send_document(
+        chat_id,
+        document=BufferedInputFile(pdf, filename=filename),
+        caption=caption,
+    )
+    if message.document is not None:
+        await remember_file_id(key, message.document.file_id)
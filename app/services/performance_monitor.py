@@ -1,18 +1,42 @@
 """
 Сервис мониторинга производительности и профилирования
+
+Замер вызова стоит пару микросекунд: время берётся по монотонным
+часам (perf_counter), вызовы пишутся в кольцевой буфер фиксированного
+размера, квантили считаются по потоковым лог-гистограммам. Ресурсы
+процесса (память, CPU) замеряет отдельный фоновый сборщик, а не
+каждый вызов. Запросы к БД профилируются через события движка
+SQLAlchemy, с подсчётом запросов на апдейт и поиском N+1.
 """
 
 import asyncio
 import functools
+import hashlib
 import logging
+import math
+import re
 import time
+from collections import deque
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Deque,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 
 import psutil
 from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -25,132 +49,202 @@ MEMORY_USAGE = Gauge("memory_usage_bytes", "Memory usage in bytes")
 CPU_USAGE = Gauge("cpu_usage_percent", "CPU usage percentage")
 SLOW_QUERIES = Counter("slow_queries_total", "Number of slow queries (>1s)")
 ERROR_RATE = Counter("error_rate_total", "Error rate per minute")
+FUNCTION_DURATION = Histogram(
+    "function_duration_seconds",
+    "Duration of monitored functions",
+    ["function"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+FUNCTION_ERRORS = Counter(
+    "function_errors_total", "Errors in monitored functions", ["function"]
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Database query duration by statement fingerprint",
+    ["statement"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_STATEMENT_ROWS = Counter(
+    "db_statement_rows_total",
+    "Rows affected or returned by statement fingerprint",
+    ["statement"],
+)
+DB_QUERIES_PER_UPDATE = Histogram(
+    "db_queries_per_update",
+    "Database queries issued while handling one update",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_N_PLUS_ONE = Counter(
+    "db_n_plus_one_total",
+    "Updates that repeated one statement fingerprint N+ times",
+    ["statement"],
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
 
 
-@dataclass
-class PerformanceMetrics:
-    """Структура для хранения метрик производительности"""
+class LatencyHistogram:
+    """
+    Потоковая гистограмма с логарифмическими корзинами от 1 мкс
+    до ~20 минут: память постоянна. Квантиль — геометрическая середина
+    корзины, поэтому погрешность не больше sqrt(GROWTH) - 1 ≈ 4.9%.
+    """
 
+    MIN = 1e-6
+    GROWTH = 1.1
+    BUCKETS = 220
+
+    __slots__ = ("counts", "count")
+
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+
+    def record(self, value: float) -> None:
+        if value <= self.MIN:
+            index = 0
+        else:
+            index = min(
+                int(math.log(value / self.MIN) / self._LOG_GROWTH) + 1,
+                self.BUCKETS - 1,
+            )
+        self.counts[index] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Геометрическая середина корзины, в которую попадает квантиль q"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                if index == 0:
+                    return self.MIN
+                # Корзина index — (MIN·G^(index-1), MIN·G^index]
+                return self.MIN * self.GROWTH ** (index - 0.5)
+        return self.MIN * self.GROWTH ** (self.BUCKETS - 1)
+
+
+@dataclass(slots=True)
+class FunctionStats:
+    """Накопленная статистика функции"""
+
+    calls: int = 0
+    errors: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "average": self.total / self.calls if self.calls else 0.0,
+            "maximum": self.max,
+            **{
+                f"p{int(q * 100)}": self.histogram.quantile(q)
+                for q in QUANTILES
+            },
+        }
+
+
+class CallRecord(NamedTuple):
+    """Один замер в кольцевом буфере"""
+
+    timestamp: float  # time.monotonic()
     function_name: str
     execution_time: float
-    memory_before: float
-    memory_after: float
-    cpu_usage: float
-    timestamp: datetime
     success: bool
-    error_message: Optional[str] = None
 
 
 class PerformanceMonitor:
     """Монитор производительности"""
 
-    def __init__(self) -> None:
-        self.metrics_history: List[PerformanceMetrics] = []
+    def __init__(self, max_history_size: int = 1000) -> None:
         self.slow_threshold = 1.0  # секунды
-        self.max_history_size = 1000
+        self.max_history_size = max_history_size
+        # deque с maxlen — кольцевой буфер: старые замеры вытесняются
+        self.metrics_history: Deque[CallRecord] = deque(
+            maxlen=max_history_size
+        )
+        self.functions: Dict[str, FunctionStats] = {}
 
     @asynccontextmanager
     async def monitor_function(
         self, function_name: str
     ) -> AsyncGenerator[None, None]:
         """Контекстный менеджер для мониторинга функции"""
-        start_time = time.time()
-        memory_before = psutil.Process().memory_info().rss
-        cpu_before = psutil.cpu_percent()
-
+        start = time.perf_counter()
+        success = False
         try:
             yield
             success = True
-            error_message = None
-        except Exception as e:
-            success = False
-            error_message = str(e)
-            raise
         finally:
-            execution_time = time.time() - start_time
-            memory_after = psutil.Process().memory_info().rss
-            cpu_after = psutil.cpu_percent()
-
-            # Записываем метрики
-            metrics = PerformanceMetrics(
-                function_name=function_name,
-                execution_time=execution_time,
-                memory_before=memory_before,
-                memory_after=memory_after,
-                cpu_usage=(cpu_before + cpu_after) / 2,
-                timestamp=datetime.now(),
-                success=success,
-                error_message=error_message,
+            self.record(function_name, time.perf_counter() - start, success)
+
+    def record(
+        self, function_name: str, execution_time: float, success: bool = True
+    ) -> None:
+        """Записать замер"""
+        self.metrics_history.append(
+            CallRecord(
+                time.monotonic(), function_name, execution_time, success
             )
-
-            self._record_metrics(metrics)
-
-    def _record_metrics(self, metrics: PerformanceMetrics) -> None:
-        """Записать метрики"""
-        # Добавляем в историю
-        self.metrics_history.append(metrics)
-
-        # Ограничиваем размер истории
-        if len(self.metrics_history) > self.max_history_size:
-            self.metrics_history = self.metrics_history[
-                -self.max_history_size :
-            ]
-
-        # Обновляем Prometheus метрики
-        MEMORY_USAGE.set(metrics.memory_after)
-        CPU_USAGE.set(metrics.cpu_usage)
+        )
+        stats = self.functions.get(function_name)
+        if stats is None:
+            stats = self.functions[function_name] = FunctionStats()
+        stats.calls += 1
+        stats.total += execution_time
+        if execution_time > stats.max:
+            stats.max = execution_time
+        stats.histogram.record(execution_time)
+        FUNCTION_DURATION.labels(function_name).observe(execution_time)
 
         # Проверяем медленные запросы
-        if metrics.execution_time > self.slow_threshold:
+        if execution_time > self.slow_threshold:
             SLOW_QUERIES.inc()
             logger.warning(
-                f"Медленная функция {metrics.function_name}: "
-                f"{metrics.execution_time:.2f}s"
+                f"Медленная функция {function_name}: {execution_time:.2f}s"
             )
 
         # Проверяем ошибки
-        if not metrics.success:
+        if not success:
+            stats.errors += 1
             ERROR_RATE.inc()
-            logger.error(
-                f"Ошибка в функции {metrics.function_name}: "
-                f"{metrics.error_message}"
-            )
+            FUNCTION_ERRORS.labels(function_name).inc()
+
+    def get_function_stats(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99 и счётчики по каждой функции за всё время"""
+        return {
+            name: stats.as_dict() for name, stats in self.functions.items()
+        }
 
     def get_performance_report(self, hours: int = 24) -> Dict[str, Any]:
         """Получить отчет о производительности за указанный период"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff = time.monotonic() - hours * 3600
         recent_metrics = [
-            m for m in self.metrics_history if m.timestamp > cutoff_time
+            m for m in self.metrics_history if m.timestamp > cutoff
         ]
 
         if not recent_metrics:
             return {"error": "Нет данных за указанный период"}
 
         # Статистика по времени выполнения
-        execution_times = [m.execution_time for m in recent_metrics]
-        avg_execution_time = sum(execution_times) / len(execution_times)
-        max_execution_time = max(execution_times)
-        min_execution_time = min(execution_times)
-
-        # Статистика по памяти
-        memory_usage = [m.memory_after for m in recent_metrics]
-        avg_memory_usage = sum(memory_usage) / len(memory_usage)
-        max_memory_usage = max(memory_usage)
-
-        # Статистика по CPU
-        cpu_usage = [m.cpu_usage for m in recent_metrics]
-        avg_cpu_usage = sum(cpu_usage) / len(cpu_usage)
-        max_cpu_usage = max(cpu_usage)
-
-        # Статистика по ошибкам
-        total_calls = len(recent_metrics)
-        successful_calls = len([m for m in recent_metrics if m.success])
+        execution_times = sorted(m.execution_time for m in recent_metrics)
+        total_calls = len(execution_times)
+        successful_calls = sum(1 for m in recent_metrics if m.success)
         error_rate = (total_calls - successful_calls) / total_calls * 100
 
         # Медленные функции
         slow_functions = [
             m for m in recent_metrics if m.execution_time > self.slow_threshold
         ]
+        now_wall, now_mono = time.time(), time.monotonic()
 
         return {
             "period_hours": hours,
@@ -158,52 +252,84 @@ class PerformanceMonitor:
             "successful_calls": successful_calls,
             "error_rate_percent": error_rate,
             "execution_time": {
-                "average": avg_execution_time,
-                "maximum": max_execution_time,
-                "minimum": min_execution_time,
-            },
-            "memory_usage": {
-                "average_mb": avg_memory_usage / 1024 / 1024,
-                "maximum_mb": max_memory_usage / 1024 / 1024,
-            },
-            "cpu_usage": {
-                "average_percent": avg_cpu_usage,
-                "maximum_percent": max_cpu_usage,
+                "average": sum(execution_times) / total_calls,
+                "maximum": execution_times[-1],
+                "minimum": execution_times[0],
+                **{
+                    f"p{int(q * 100)}": execution_times[
+                        min(int(q * total_calls), total_calls - 1)
+                    ]
+                    for q in QUANTILES
+                },
             },
             "slow_functions_count": len(slow_functions),
             "slow_functions": [
                 {
                     "name": m.function_name,
                     "execution_time": m.execution_time,
-                    "timestamp": m.timestamp.isoformat(),
+                    "timestamp": datetime.fromtimestamp(
+                        now_wall - (now_mono - m.timestamp)
+                    ).isoformat(),
                 }
-                for m in slow_functions
+                for m in slow_functions[-10:]
             ],
         }
 
     def get_system_resources(self) -> Dict[str, Any]:
-        """Получить информацию о системных ресурсах"""
-        process = psutil.Process()
-
-        return {
-            "memory": {
-                "rss_mb": process.memory_info().rss / 1024 / 1024,
-                "vms_mb": process.memory_info().vms / 1024 / 1024,
-                "percent": process.memory_percent(),
-            },
-            "cpu": {
-                "percent": process.cpu_percent(),
-                "count": psutil.cpu_count(),
-            },
-            "disk": {
-                "usage_percent": psutil.disk_usage("/").percent,
-                "free_gb": psutil.disk_usage("/").free / 1024 / 1024 / 1024,
-            },
-            "network": {"connections": len(process.connections())},
+        """Последний снимок ресурсов процесса от фонового сборщика"""
+        return resource_collector.latest or resource_collector.sample()
+
+
+class ResourceCollector:
+    """Фоновый сборщик ресурсов процесса для Prometheus и отчётов"""
+
+    def __init__(
+        self, interval: float = settings.RESOURCE_SAMPLE_INTERVAL
+    ) -> None:
+        self.interval = interval
+        self.latest: Dict[str, Any] = {}
+        self._process = psutil.Process()
+
+    def sample(self) -> Dict[str, Any]:
+        """Снять показатели (синхронно, несколько системных вызовов)"""
+        process = self._process
+        with process.oneshot():
+            memory = process.memory_info()
+            snapshot = {
+                "memory": {
+                    "rss_mb": memory.rss / 1024 / 1024,
+                    "vms_mb": memory.vms / 1024 / 1024,
+                    "percent": process.memory_percent(),
+                },
+                "cpu": {
+                    # Загрузка с предыдущего замера, без блокирующего ожидания
+                    "percent": process.cpu_percent(),
+                    "count": psutil.cpu_count(),
+                },
+                "threads": process.num_threads(),
+            }
+        disk = psutil.disk_usage("/")
+        snapshot["disk"] = {
+            "usage_percent": disk.percent,
+            "free_gb": disk.free / 1024 / 1024 / 1024,
         }
+        MEMORY_USAGE.set(memory.rss)
+        CPU_USAGE.set(snapshot["cpu"]["percent"])
+        self.latest = snapshot
+        return snapshot
+
+    async def run(self) -> None:
+        """Цикл сбора; запускается задачей при старте процесса"""
+        while True:
+            try:
+                self.sample()
+            except psutil.Error as e:
+                logger.warning(f"Не удалось снять ресурсы процесса: {e}")
+            await asyncio.sleep(self.interval)
 
 
-# Глобальный экземпляр монитора
+# Глобальные экземпляры монитора и сборщика ресурсов
+resource_collector = ResourceCollector()
 performance_monitor = PerformanceMonitor()
 
 
@@ -211,44 +337,31 @@ def monitor_performance(func_name: Optional[str] = None):
     """Декоратор для мониторинга производительности функции"""
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        name = func_name or f"{func.__module__}.{func.__name__}"
+        record = performance_monitor.record
+        clock = time.perf_counter
+
         @functools.wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
-            name = func_name or f"{func.__module__}.{func.__name__}"
-            async with performance_monitor.monitor_function(name):
-                return await func(*args, **kwargs)
+            start = clock()
+            success = False
+            try:
+                result = await func(*args, **kwargs)
+                success = True
+                return result
+            finally:
+                record(name, clock() - start, success)
 
         @functools.wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
-            name = func_name or f"{func.__module__}.{func.__name__}"
-            start_time = time.time()
-            memory_before = psutil.Process().memory_info().rss
-
+            start = clock()
+            success = False
             try:
                 result = func(*args, **kwargs)
                 success = True
-                error_message = None
-            except Exception as e:
-                success = False
-                error_message = str(e)
-                raise
+                return result
             finally:
-                execution_time = time.time() - start_time
-                memory_after = psutil.Process().memory_info().rss
-
-                metrics = PerformanceMetrics(
-                    function_name=name,
-                    execution_time=execution_time,
-                    memory_before=memory_before,
-                    memory_after=memory_after,
-                    cpu_usage=psutil.cpu_percent(),
-                    timestamp=datetime.now(),
-                    success=success,
-                    error_message=error_message,
-                )
-
-                performance_monitor._record_metrics(metrics)
-
-            return result
+                record(name, clock() - start, success)
 
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
@@ -258,58 +371,268 @@ def monitor_performance(func_name: Optional[str] = None):
     return decorator
 
 
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+# Строковые и числовые литералы, параметры asyncpg/psycopg/sqlite/named
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+|%\(\w+\)s|%s|\?|(?<!:):\w+"
+)
+# asyncpg добавляет к параметрам приведение типа: ($2::VARCHAR, ...)
+_CAST = r"(?:::\w+(?:\s+\w+)*(?:\[\])?)?"
+_PLACEHOLDER_TUPLE = re.compile(rf"\(\s*(\?{_CAST})(?:\s*,\s*\?{_CAST})*\s*\)")
+_REPEATED_TUPLES = re.compile(r"(\(\?[^()]*\))(?:\s*,\s*\1)+")
+_SPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """
+    Нормализованный текст запроса: литералы и параметры заменены на ?,
+    списки IN (...) и многострочные VALUES свёрнуты в один элемент.
+    """
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _LITERALS.sub("?", sql)
+    sql = _PLACEHOLDER_TUPLE.sub(r"(\1)", sql)
+    sql = _REPEATED_TUPLES.sub(r"\1", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint_id(fp: str) -> str:
+    """Короткий стабильный идентификатор отпечатка (метка Prometheus)"""
+    return hashlib.blake2b(fp.encode(), digest_size=6).hexdigest()
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Накопленная статистика одного отпечатка запроса"""
+
+    fingerprint: str
+    id: str
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    rows: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "total_time": self.total,
+            "average": self.total / self.calls if self.calls else 0.0,
+            "maximum": self.max,
+            "rows": self.rows,
+            **{
+                f"p{int(q * 100)}": self.histogram.quantile(q)
+                for q in QUANTILES
+            },
+        }
+
+
+@dataclass(slots=True)
+class UpdateQueries:
+    """Запросы, выполненные при обработке одного апдейта"""
+
+    count: int = 0
+    total: float = 0.0
+    by_fingerprint: Dict[str, int] = field(default_factory=dict)
+
+
+_current_update: ContextVar[Optional[UpdateQueries]] = ContextVar(
+    "db_update_queries", default=None
+)
+
+
 class DatabaseProfiler:
-    """Профилировщик для запросов к базе данных"""
+    """
+    Профилировщик запросов к базе данных.
+
+    Подписывается на события before/after_cursor_execute движка, поэтому
+    видит все запросы всех репозиториев без ручной разметки. Статистика
+    ведётся по отпечаткам (fingerprint) запросов; в пределах апдейта
+    считается число запросов и повторы одного отпечатка (N+1).
+    """
+
+    OTHER = "(other)"
+
+    def __init__(
+        self,
+        slow_threshold: float = 1.0,
+        n_plus_one_threshold: int = settings.N_PLUS_ONE_THRESHOLD,
+        max_statements: int = 500,
+    ) -> None:
+        self.slow_threshold = slow_threshold  # секунды
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_statements = max_statements
+        self.statements: Dict[str, QueryStats] = {}
+        self.total_queries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self.n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+    # ── Инструментирование движка ──
+    def install(self, engine: Any) -> None:
+        """Подписаться на события движка (Engine или AsyncEngine)"""
+        target = getattr(engine, "sync_engine", engine)
+        if not event.contains(
+            target, "before_cursor_execute", self._before_execute
+        ):
+            event.listen(target, "before_cursor_execute", self._before_execute)
+            event.listen(target, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        started = conn.info.get("query_start")
+        if not started:
+            return
+        duration = time.perf_counter() - started.pop()
+        rows = getattr(cursor, "rowcount", -1)
+        self.record(statement, duration, rows if rows and rows > 0 else 0)
+
+    # ── Учёт ──
+    def _stats(self, fp: str) -> QueryStats:
+        stats = self.statements.get(fp)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                # Ограничиваем число отпечатков (и меток Prometheus)
+                fp = self.OTHER
+                stats = self.statements.get(fp)
+            if stats is None:
+                stats = QueryStats(fp, fingerprint_id(fp))
+                self.statements[fp] = stats
+        return stats
+
+    def record(self, statement: str, duration: float, rows: int = 0) -> None:
+        """Записать выполненный запрос"""
+        self._record(fingerprint(statement), duration, rows)
+
+    def _record(self, key: str, duration: float, rows: int = 0) -> None:
+        """Учесть замер под готовым ключом (отпечатком или именем)"""
+        stats = self._stats(key)
+        stats.calls += 1
+        stats.total += duration
+        stats.rows += rows
+        if duration > stats.max:
+            stats.max = duration
+        stats.histogram.record(duration)
+
+        self.total_queries += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+        DB_QUERY_DURATION.observe(duration)
+        DB_STATEMENT_DURATION.labels(stats.id).observe(duration)
+        if rows:
+            DB_STATEMENT_ROWS.labels(stats.id).inc(rows)
+
+        update = _current_update.get()
+        if update is not None:
+            update.count += 1
+            update.total += duration
+            fp = stats.fingerprint
+            update.by_fingerprint[fp] = update.by_fingerprint.get(fp, 0) + 1
 
-    def __init__(self) -> None:
-        self.query_times: List[float] = []
-        self.slow_queries: List[Dict[str, Any]] = []
+        # Проверяем медленные запросы
+        if duration > self.slow_threshold:
+            self.slow_queries.append(
+                {
+                    "id": stats.id,
+                    "sql": stats.fingerprint,
+                    "execution_time": duration,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+            logger.warning(
+                f"Медленный запрос {stats.id} ({duration:.2f}s): "
+                f"{stats.fingerprint[:200]}"
+            )
 
     @asynccontextmanager
     async def profile_query(
-        self, query_name: str, sql: str
+        self, query_name: str, sql: str = ""
     ) -> AsyncGenerator[None, None]:
-        """Профилировать выполнение SQL запроса"""
-        start_time = time.time()
-
+        """
+        Замерить блок кода как один запрос с именем query_name.
+
+        Запросы через SQLAlchemy учитываются автоматически (install);
+        блок нужен только для обращений к БД в обход движка. Замер
+        учитывается под самим именем: sql оставлен для совместимости.
+        """
+        start = time.perf_counter()
         try:
             yield
         finally:
-            execution_time = time.time() - start_time
-            self.query_times.append(execution_time)
-
-            # Записываем метрики
-            DB_QUERY_DURATION.observe(execution_time)
-
-            # Проверяем медленные запросы
-            if execution_time > 1.0:  # больше 1 секунды
-                self.slow_queries.append(
-                    {
-                        "name": query_name,
-                        "sql": sql,
-                        "execution_time": execution_time,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                )
-
-                logger.warning(
-                    f"Медленный запрос {query_name}: {execution_time:.2f}s"
-                )
-
-    def get_query_stats(self) -> Dict[str, Any]:
+            self._record(query_name, time.perf_counter() - start)
+
+    # ── Апдейты и N+1 ──
+    def begin_update(self) -> Tuple[Token, UpdateQueries]:
+        """Начать счёт запросов апдейта в текущем контексте"""
+        queries = UpdateQueries()
+        return _current_update.set(queries), queries
+
+    def end_update(
+        self, token: Token, queries: UpdateQueries, label: str = ""
+    ) -> None:
+        """Закончить счёт: метрики и предупреждения о N+1"""
+        _current_update.reset(token)
+        DB_QUERIES_PER_UPDATE.observe(queries.count)
+        for fp, count in queries.by_fingerprint.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            stats = self.statements.get(fp) or self._stats(fp)
+            DB_N_PLUS_ONE.labels(stats.id).inc()
+            self.n_plus_one.append(
+                {
+                    "update": label,
+                    "id": stats.id,
+                    "sql": fp,
+                    "count": count,
+                    "queries_in_update": queries.count,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+            logger.warning(
+                f"Возможный N+1 в {label or 'апдейте'}: запрос {stats.id} "
+                f"выполнен {count} раз: {fp[:200]}"
+            )
+
+    def get_query_stats(self, top: int = 20) -> Dict[str, Any]:
         """Получить статистику запросов"""
-        if not self.query_times:
+        if not self.total_queries:
             return {"error": "Нет данных о запросах"}
 
+        statements = sorted(
+            self.statements.values(), key=lambda s: s.total, reverse=True
+        )
         return {
-            "total_queries": len(self.query_times),
-            "average_time": sum(self.query_times) / len(self.query_times),
-            "max_time": max(self.query_times),
-            "min_time": min(self.query_times),
+            "total_queries": self.total_queries,
+            "average_time": self.total_time / self.total_queries,
+            "max_time": self.max_time,
+            "statements_count": len(self.statements),
+            "statements": [s.as_dict() for s in statements[:top]],
             "slow_queries_count": len(self.slow_queries),
-            "slow_queries": self.slow_queries[
-                -10:
-            ],  # последние 10 медленных запросов
+            "slow_queries": list(self.slow_queries)[-10:],
+            "n_plus_one": list(self.n_plus_one)[-10:],
         }
 
 
@@ -367,6 +690,7 @@ async def get_performance_summary() -> Dict[str, Any]:
         "performance_report": performance_monitor.get_performance_report(
             hours=1
         ),
+        "functions": performance_monitor.get_function_stats(),
         "database_stats": db_profiler.get_query_stats(),
         "cache_stats": cache_profiler.get_stats(),
     }
@@ -0,0 +1,239 @@
+"""
+Общий реестр подключений к Redis.
+
+Каждая логическая БД Redis получает имя и один пул соединений на процесс:
+
+- state — БД из REDIS_DSN: FSM, лимиты, очереди апдейтов и задач;
+- cache — REDIS_CACHE_DB: данные кеша, которые можно терять.
+
+Клиенты создаются лениво и переиспользуются всеми модулями. Пул без
+верхней границы, как у отдельных клиентов до него: на FSM, лимитах,
+блокирующих чтениях очередей и консьюмерах стримов исчерпанный пул
+превратился бы в ошибки хэндлеров. Команды, задержки и заполненность
+пула (занятые и свободные соединения) пишутся в Prometheus с меткой
+client — именем БД.
+
+batch() собирает команды, результат которых не нужен (запись кеша),
+в pipeline. Внутри апдейта (RedisBatchMiddleware) все такие блоки
+одного клиента уходят одним pipeline в конце обработки, то есть после
+команд, выполненных сразу. Поэтому через batch() пишутся только ключи,
+которые не удаляются немедленной инвалидацией в том же апдейте
+(версионированные пространства, file_id).
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from typing import Any, AsyncIterator, Dict, Mapping
+from urllib.parse import urlsplit, urlunsplit
+
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge, Histogram
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_COMMANDS = Counter(
+    "redis_commands_total",
+    "Redis commands sent, pipelined ones included",
+    ["client", "command"],
+)
+REDIS_COMMAND_ERRORS = Counter(
+    "redis_command_errors_total", "Failed Redis round trips", ["client"]
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency (a pipeline is one round trip)",
+    ["client", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+REDIS_POOL_IN_USE = Gauge(
+    "redis_pool_in_use", "Redis connections checked out", ["client"]
+)
+REDIS_POOL_IDLE = Gauge(
+    "redis_pool_idle", "Open Redis connections waiting in the pool", ["client"]
+)
+
+# Снятие блокировки только владельцем (ARGV[1] — его токен): процесс,
+# переживший TTL блокировки, не удалит блокировку, взятую другим
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def redis_db_url(url: str, db: int) -> str:
+    """URL Redis с другой логической БД"""
+    return urlunsplit(urlsplit(url)._replace(path=f"/{db}"))
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline, который учитывает каждую команду и один round trip"""
+
+    client = "default"
+
+    async def execute(self, raise_on_error: bool = True) -> Any:
+        for args, _ in self.command_stack:
+            REDIS_COMMANDS.labels(self.client, str(args[0]).upper()).inc()
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except RedisError:
+            REDIS_COMMAND_ERRORS.labels(self.client).inc()
+            raise
+        finally:
+            REDIS_LATENCY.labels(self.client, "PIPELINE").observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedRedis(redis.Redis):
+    """Клиент Redis с метриками команд и задержек"""
+
+    def __init__(self, *args: Any, client: str = "default", **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        command = str(args[0]).upper()
+        REDIS_COMMANDS.labels(self.client, command).inc()
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except RedisError:
+            REDIS_COMMAND_ERRORS.labels(self.client).inc()
+            raise
+        finally:
+            REDIS_LATENCY.labels(self.client, command).observe(
+                time.perf_counter() - start
+            )
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> InstrumentedPipeline:
+        pipe = InstrumentedPipeline(
+            self.connection_pool,
+            self.response_callbacks,
+            transaction,
+            shard_hint,
+        )
+        pipe.client = self.client
+        return pipe
+
+
+class RedisRegistry:
+    """Именованные логические БД Redis: один пул и один клиент на имя"""
+
+    def __init__(self, databases: Mapping[str, str]) -> None:
+        self.databases = dict(databases)
+        self._clients: Dict[str, InstrumentedRedis] = {}
+
+    def client(self, name: str) -> InstrumentedRedis:
+        """Общий клиент логической БД name"""
+        client = self._clients.get(name)
+        if client is None:
+            if name not in self.databases:
+                raise KeyError(f"Неизвестная БД Redis: {name}")
+            pool = redis.ConnectionPool.from_url(
+                self.databases[name], decode_responses=True
+            )
+            # Заполненность пула считается при сборе метрик
+            REDIS_POOL_IN_USE.labels(name).set_function(
+                lambda: len(pool._in_use_connections)
+            )
+            REDIS_POOL_IDLE.labels(name).set_function(
+                lambda: len(pool._available_connections)
+            )
+            client = InstrumentedRedis(connection_pool=pool, client=name)
+            self._clients[name] = client
+        return client
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Заполненность пулов созданных клиентов"""
+        return {
+            name: {
+                "in_use": len(client.connection_pool._in_use_connections),
+                "idle": len(client.connection_pool._available_connections),
+            }
+            for name, client in self._clients.items()
+        }
+
+    async def close(self) -> None:
+        """Закрыть соединения всех пулов (при остановке процесса)"""
+        for name, client in self._clients.items():
+            try:
+                await client.connection_pool.aclose()
+            except RedisError as e:
+                logger.warning(f"Ошибка закрытия пула Redis {name}: {e}")
+
+
+# Глобальный реестр процесса
+redis_registry = RedisRegistry(
+    {
+        "state": settings.REDIS_DSN,
+        "cache": redis_db_url(settings.REDIS_DSN, settings.REDIS_CACHE_DB),
+    }
+)
+
+
+class UpdateBatch:
+    """Отложенные pipeline апдейта: по одному на клиента"""
+
+    def __init__(self) -> None:
+        self.pipelines: Dict[int, Any] = {}
+        self.open = True
+
+
+_current_batch: ContextVar[UpdateBatch | None] = ContextVar(
+    "redis_update_batch", default=None
+)
+
+
+@asynccontextmanager
+async def batch(client: Any) -> AsyncIterator[Any]:
+    """
+    Pipeline для команд без нужды в результате. Вне апдейта выполняется
+    при выходе из блока; внутри апдейта — одним pipeline в конце
+    обработки вместе с остальными блоками того же клиента. Ошибки
+    отложенного выполнения только логируются.
+    """
+    scope = _current_batch.get()
+    if scope is None or not scope.open:
+        async with client.pipeline(transaction=False) as pipe:
+            yield pipe
+            await pipe.execute()
+        return
+
+    pipe = scope.pipelines.get(id(client))
+    if pipe is None:
+        pipe = client.pipeline(transaction=False)
+        scope.pipelines[id(client)] = pipe
+    yield pipe
+
+
+def begin_batch() -> Token[UpdateBatch | None]:
+    """Начать сбор отложенных команд апдейта"""
+    return _current_batch.set(UpdateBatch())
+
+
+async def end_batch(token: Token[UpdateBatch | None]) -> None:
+    """Выполнить отложенные pipeline апдейта"""
+    scope = _current_batch.get()
+    _current_batch.reset(token)
+    if scope is None:
+        return
+    # Задачи, запущенные из апдейта, после этого пишут сразу
+    scope.open = False
+    for pipe in scope.pipelines.values():
+        try:
+            await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Отложенные команды Redis не выполнены: {e}")
+        finally:
+            await pipe.reset()
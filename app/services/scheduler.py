@@ -1,45 +1,32 @@
 import asyncio
 import logging
-from datetime import date
 
-from sqlalchemy import func, select
-
-from app.db.session import AsyncSessionLocal
-from app.db.task import Task, TaskStatus
-from app.middlewares.metrics import TASKS_COMPLETED, TASKS_OVERDUE, TASKS_TOTAL
+from app.middlewares.metrics import (
+    TASKS_COMPLETED,
+    TASKS_OVERDUE,
+    TASKS_TOTAL,
+    TICKETS_OPEN,
+)
+from app.repositories.stats_repo import refresh_kpi_rollup
+from app.services.job_queue import job_queue
+from app.services.news_parser import NEWS_REFRESH_INTERVAL
 
 logger = logging.getLogger(__name__)
 
 
 async def kpi_loop() -> None:
-    """Фоновая корутина для обновления KPI метрик каждые 60 секунд"""
+    """Фоновая корутина: пересчёт KPI rollup и метрик каждые 60 секунд"""
     while True:
         try:
-            async with AsyncSessionLocal() as s:
-                # Всего поручений
-                total = await s.scalar(select(func.count()).select_from(Task))
-
-                # Выполнено поручений
-                done = await s.scalar(
-                    select(func.count())
-                    .select_from(Task)
-                    .where(Task.status == TaskStatus.COMPLETED)
-                )
-
-                # Просрочено поручений
-                overdue = await s.scalar(
-                    select(func.count())
-                    .select_from(Task)
-                    .where(
-                        Task.status == TaskStatus.PENDING,
-                        Task.deadline < date.today(),
-                    )
-                )
+            # Один агрегирующий запрос; результат сохраняется в rollup,
+            # откуда его читают /kpi и кеш статистики
+            counters = await refresh_kpi_rollup()
 
             # Обновляем метрики Prometheus
-            TASKS_TOTAL.set(total or 0)
-            TASKS_COMPLETED.set(done or 0)
-            TASKS_OVERDUE.set(overdue or 0)
+            TASKS_TOTAL.set(counters["tasks_total"])
+            TASKS_COMPLETED.set(counters["tasks_done"])
+            TASKS_OVERDUE.set(counters["overdue"])
+            TICKETS_OPEN.set(counters["tickets_open"])
 
         except Exception as e:
             # Логируем ошибку, но продолжаем работу
@@ -47,3 +34,17 @@ async def kpi_loop() -> None:
 
         # Ждем 60 секунд до следующего обновления
         await asyncio.sleep(60)
+
+
+async def news_refresh_loop() -> None:
+    """Периодически ставит обновление новостей в очередь задач"""
+    while True:
+        try:
+            # Ключ уникальности: не больше одной задачи в очереди
+            await job_queue.enqueue(
+                "news_refresh", unique="news_refresh", max_attempts=1
+            )
+        except Exception as e:
+            logger.error(f"Ошибка постановки обновления новостей: {e}")
+
+        await asyncio.sleep(NEWS_REFRESH_INTERVAL)
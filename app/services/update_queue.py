@@ -0,0 +1,292 @@
+"""
+Очередь входящих апдейтов для webhook-режима.
+
+Апдейты раскладываются по партициям (Redis Streams) по chat_id, поэтому
+сообщения одного чата обрабатываются строго по порядку, а разные чаты —
+параллельно в нескольких процессах и на нескольких узлах.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge
+from redis.exceptions import ResponseError
+
+from app.config import settings
+from app.services.cache_service import state_client
+from app.services.redis_pool import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "bot"
+STREAM_MAXLEN = 100_000
+READ_BATCH = 50
+READ_BLOCK_MS = 5000
+RETRY_DELAY = 0.5  # секунды, удваивается до RETRY_DELAY_MAX
+RETRY_DELAY_MAX = 30.0
+# Номер воркера занимается в Redis и продлевается, пока процесс жив
+WORKER_SLOT_TTL_MS = 30_000
+# Консьюмер, не читавший партицию дольше, считается мёртвым
+ORPHAN_IDLE_MS = 60_000
+WATCH_INTERVAL = 30  # секунды
+
+RENEW_SLOT_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+UPDATES_INGESTED = Counter(
+    "bot_webhook_updates_total", "Апдейты, принятые через webhook"
+)
+UPDATES_PROCESSED = Counter(
+    "bot_update_worker_processed_total",
+    "Апдейты, обработанные воркерами",
+    ["status"],
+)
+
+UPDATE_PARTITIONS_ORPHANED = Gauge(
+    "bot_update_partitions_orphaned",
+    "Партиции с необработанными апдейтами без живого консьюмера",
+)
+
+UpdateHandler = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+def extract_chat_id(payload: dict[str, Any]) -> int | None:
+    """Чат (или пользователь), к которому относится апдейт"""
+    for key, event in payload.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return int(chat["id"])
+        sender = event.get("from") or event.get("user")
+        if sender and "id" in sender:
+            return int(sender["id"])
+    return None
+
+
+class UpdateQueue:
+    """Партиционированная очередь апдейтов на Redis Streams"""
+
+    def __init__(self, client: redis.Redis, partitions: int = 16) -> None:
+        self.redis = client
+        self.partitions = partitions
+
+    @staticmethod
+    def stream_key(partition: int) -> str:
+        return f"updates:{partition}"
+
+    def partition_for(self, payload: dict[str, Any]) -> int:
+        """Стабильная партиция: один чат всегда попадает в одну"""
+        chat_id = extract_chat_id(payload)
+        if chat_id is None:
+            chat_id = int(payload.get("update_id", 0))
+        return chat_id % self.partitions
+
+    async def publish(self, payload: dict[str, Any]) -> None:
+        """Положить апдейт в партицию его чата"""
+        await self.redis.xadd(
+            self.stream_key(self.partition_for(payload)),
+            {"update": json.dumps(payload, ensure_ascii=False)},
+            maxlen=STREAM_MAXLEN,
+            approximate=True,
+        )
+        UPDATES_INGESTED.inc()
+
+    def owned_partitions(self, index: int, workers: int) -> list[int]:
+        """Партиции, закреплённые за воркером index из workers"""
+        return [p for p in range(self.partitions) if p % workers == index]
+
+    @staticmethod
+    def slot_key(index: int) -> str:
+        return f"updates:worker:{index}"
+
+    async def claim_slot(self, workers: int, token: str) -> int | None:
+        """Занять свободный номер воркера 0..workers-1"""
+        for index in range(workers):
+            if await self.redis.set(
+                self.slot_key(index), token, nx=True, px=WORKER_SLOT_TTL_MS
+            ):
+                return index
+        return None
+
+    async def renew_slot(self, index: int, token: str) -> bool:
+        """Продлить номер; False — его уже занял другой процесс"""
+        renewed = await self.redis.eval(
+            RENEW_SLOT_SCRIPT,
+            1,
+            self.slot_key(index),
+            token,
+            WORKER_SLOT_TTL_MS,
+        )
+        return bool(renewed)
+
+    async def release_slot(self, index: int, token: str) -> None:
+        """Освободить номер, если он всё ещё наш"""
+        await self.redis.eval(
+            RELEASE_LOCK_SCRIPT, 1, self.slot_key(index), token
+        )
+
+    async def orphaned_partitions(
+        self, idle_ms: int = ORPHAN_IDLE_MS
+    ) -> list[int]:
+        """
+        Партиции с непрочитанными или неподтверждёнными апдейтами,
+        которые никто не читал дольше idle_ms
+        """
+        orphaned = []
+        for partition in range(self.partitions):
+            key = self.stream_key(partition)
+            try:
+                groups = await self.redis.xinfo_groups(key)
+            except ResponseError:
+                continue  # стрима ещё нет — апдейтов не было
+            group = next(
+                (g for g in groups if g["name"] == CONSUMER_GROUP), None
+            )
+            if group is None:
+                if await self.redis.xlen(key):
+                    orphaned.append(partition)
+                continue
+            lag = group.get("lag")
+            if lag is None:
+                # Redis не знает lag после удалений — сравниваем id
+                info = await self.redis.xinfo_stream(key)
+                lag = int(
+                    info["last-generated-id"] != group["last-delivered-id"]
+                )
+            if not group["pending"] and not lag:
+                continue
+            consumers = await self.redis.xinfo_consumers(key, CONSUMER_GROUP)
+            idle = [
+                c["idle"]
+                for c in consumers
+                if c["name"] == f"partition-{partition}"
+            ]
+            if not idle or idle[0] > idle_ms:
+                orphaned.append(partition)
+        return orphaned
+
+    async def watch(self, stop: asyncio.Event) -> None:
+        """
+        Периодически сообщать о партициях без живого консьюмера:
+        например, если воркеров запущено меньше UPDATE_WORKERS
+        """
+        while not stop.is_set():
+            try:
+                orphaned = await self.orphaned_partitions()
+            except Exception as e:
+                logger.error(f"Ошибка проверки партиций апдейтов: {e}")
+            else:
+                UPDATE_PARTITIONS_ORPHANED.set(len(orphaned))
+                if orphaned:
+                    logger.warning(
+                        f"Партиции {orphaned} не обрабатываются: нет "
+                        f"живого воркера (UPDATE_WORKERS="
+                        f"{settings.UPDATE_WORKERS})"
+                    )
+            try:
+                await asyncio.wait_for(stop.wait(), WATCH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ensure_group(self, partition: int) -> None:
+        try:
+            await self.redis.xgroup_create(
+                self.stream_key(partition),
+                CONSUMER_GROUP,
+                id="0",
+                mkstream=True,
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def consume(
+        self,
+        partition: int,
+        handler: UpdateHandler,
+        stop: asyncio.Event,
+    ) -> None:
+        """
+        Последовательно обработать апдейты партиции.
+
+        Сначала дочитываются записи, не подтверждённые до рестарта
+        (id "0"), затем новые (">"). Запись подтверждается после
+        обработки; ни ошибки хэндлеров, ни сбои Redis не останавливают
+        партицию.
+        """
+        key = self.stream_key(partition)
+        consumer = f"partition-{partition}"
+        last_id = "0"
+        group_ready = False
+        delay = RETRY_DELAY
+
+        while not stop.is_set():
+            try:
+                if not group_ready:
+                    await self.ensure_group(partition)
+                    group_ready = True
+                response = await self.redis.xreadgroup(
+                    CONSUMER_GROUP,
+                    consumer,
+                    {key: last_id},
+                    count=READ_BATCH,
+                    block=READ_BLOCK_MS,
+                )
+            except Exception as e:
+                logger.error(f"Ошибка чтения партиции {partition}: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_DELAY_MAX)
+                continue
+            delay = RETRY_DELAY
+
+            entries = response[0][1] if response else []
+            if not entries:
+                # Хвост после рестарта дочитан — переходим к новым
+                last_id = ">"
+                continue
+
+            for entry_id, fields in entries:
+                try:
+                    await handler(json.loads(fields["update"]))
+                    UPDATES_PROCESSED.labels("ok").inc()
+                except Exception as e:
+                    UPDATES_PROCESSED.labels("error").inc()
+                    logger.error(
+                        f"Ошибка обработки апдейта {entry_id} "
+                        f"(партиция {partition}): {e}"
+                    )
+                await self._ack(partition, entry_id)
+
+    async def _ack(self, partition: int, entry_id: str) -> None:
+        """
+        Подтвердить запись. Сбой Redis не должен завершать консьюмер
+        партиции, поэтому подтверждение повторяется с растущей паузой;
+        при остановке воркера запись остаётся в pending и будет
+        дочитана после рестарта.
+        """
+        delay = RETRY_DELAY
+        while True:
+            try:
+                await self.redis.xack(
+                    self.stream_key(partition), CONSUMER_GROUP, entry_id
+                )
+                return
+            except Exception as e:
+                logger.error(
+                    f"Ошибка подтверждения {entry_id} "
+                    f"(партиция {partition}): {e}"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_DELAY_MAX)
+
+
+# Глобальный экземпляр очереди апдейтов
+update_queue = UpdateQueue(state_client, settings.UPDATE_PARTITIONS)
@@ -0,0 +1,189 @@
+"""
+Прогрев кешей при старте бота.
+
+После деплоя или перезапуска Redis все кеши пусты, и первая волна
+пользователей разом идёт в Postgres и к mos.ru. Перед приёмом апдейтов
+бот заполняет справочник активных пользователей, выборки по ролям,
+справочные данные, каталоги переводов, шаблоны клавиатур и новости.
+Шаги выполняются параллельно, не больше settings.WARMUP_CONCURRENCY
+одновременно; весь прогрев ограничен settings.WARMUP_TIMEOUT. Пока он
+не закончился, /ready отвечает 503.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict
+
+from prometheus_client import Gauge
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DURATION = Gauge(
+    "cache_warmup_duration_seconds",
+    "Duration of the startup cache warm-up by step",
+    ["step"],
+)
+WARMUP_READY = Gauge("cache_warmup_ready", "1 after the startup warm-up")
+
+Step = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class WarmupReport:
+    """Итог прогрева: длительность и результат каждого шага"""
+
+    durations: Dict[str, float] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    total: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(self.total, 3),
+            "steps": {
+                name: round(duration, 3)
+                for name, duration in self.durations.items()
+            },
+            "results": self.results,
+            "errors": self.errors,
+        }
+
+
+class CacheWarmer:
+    """Набор шагов прогрева и состояние готовности процесса"""
+
+    def __init__(
+        self,
+        concurrency: int = settings.WARMUP_CONCURRENCY,
+        timeout: float = settings.WARMUP_TIMEOUT,
+    ) -> None:
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.steps: Dict[str, Step] = {}
+        self.ready = False
+        self.report: WarmupReport | None = None
+
+    def step(self, name: str) -> Callable[[Step], Step]:
+        """Декоратор: зарегистрировать шаг прогрева"""
+
+        def register(func: Step) -> Step:
+            self.steps[name] = func
+            return func
+
+        return register
+
+    async def _run_step(
+        self,
+        name: str,
+        step: Step,
+        semaphore: asyncio.Semaphore,
+        report: WarmupReport,
+    ) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                report.results[name] = await step()
+            except Exception as e:
+                # Неудачный шаг не мешает остальным и не держит старт
+                report.errors[name] = str(e)
+                logger.warning(f"Прогрев {name} не удался: {e}")
+            finally:
+                duration = time.perf_counter() - start
+                report.durations[name] = duration
+                WARMUP_DURATION.labels(name).set(duration)
+
+    async def run(self) -> WarmupReport:
+        """Выполнить все шаги; готовность включается в любом случае"""
+        report = WarmupReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(
+                        self._run_step(name, step, semaphore, report)
+                        for name, step in self.steps.items()
+                    )
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            for name in self.steps:
+                if name not in report.results and name not in report.errors:
+                    report.errors[name] = "timeout"
+            logger.warning(f"Прогрев не уложился в {self.timeout}s")
+        finally:
+            report.total = time.perf_counter() - start
+            WARMUP_DURATION.labels("total").set(report.total)
+            self.report = report
+            self.ready = True
+            WARMUP_READY.set(1)
+
+        logger.info(
+            f"Прогрев кешей за {report.total:.2f}s: "
+            + ", ".join(
+                f"{name} {duration:.2f}s"
+                for name, duration in report.durations.items()
+            )
+        )
+        return report
+
+
+# Глобальный экземпляр прогрева
+cache_warmer = CacheWarmer()
+
+
+# ────────────────── Шаги ──────────────────
+# Импорты внутри шагов: модуль подключается health-сервером, а тяжёлые
+# зависимости (репозитории, парсер новостей) нужны только при прогреве
+
+
+@cache_warmer.step("users")
+async def warm_users() -> int:
+    """Снимки активных пользователей: Redis и память процесса"""
+    from app.services.cache_service import cache_service
+
+    return await cache_service.preload_users(settings.WARMUP_USERS)
+
+
+@cache_warmer.step("roles")
+async def warm_roles() -> Dict[str, int]:
+    """Численность и списки пользователей по ролям"""
+    from app.repositories.optimized_user_repo import optimized_user_repo
+    from app.roles import UserRole
+
+    counts = await optimized_user_repo.get_active_users_count()
+    for role in UserRole:
+        await optimized_user_repo.get_users_by_role(role)
+    return counts
+
+
+@cache_warmer.step("reference")
+async def warm_reference() -> int:
+    """Справочники и константы"""
+    from app.services.cache_service import cache_service
+
+    return len(await cache_service.get_frequently_accessed_data())
+
+
+@cache_warmer.step("i18n_keyboards")
+async def warm_i18n_keyboards() -> int:
+    """Каталоги переводов, затем шаблоны меню (им нужны переводы)"""
+    from app.i18n import catalog
+    from app.keyboards.main_menu import precompile_menus
+
+    for lang in ("ru", "en"):
+        catalog(lang)
+    return precompile_menus()
+
+
+@cache_warmer.step("news")
+async def warm_news() -> int:
+    """Канонический список новостей"""
+    from app.services.news_parser import news_parser
+
+    return await news_parser.warm_up()
@@ -0,0 +1,155 @@
+"""
+Воркер апдейтов для webhook-режима.
+
+Номер воркера (какие партиции он читает) задаётся UPDATE_WORKER_INDEX
+или, если он не задан, занимается в Redis: одинаковые реплики
+(docker compose --scale updates=N) сами делят номера 0..UPDATE_WORKERS-1,
+а лишние ждут, пока номер освободится.
+"""
+
+import asyncio
+import functools
+import logging
+import secrets
+import signal
+from typing import Any
+
+from app.config import settings
+from app.services.update_queue import (
+    READ_BLOCK_MS,
+    WORKER_SLOT_TTL_MS,
+    update_queue,
+)
+
+logger = logging.getLogger(__name__)
+
+SLOT_RENEW_INTERVAL = WORKER_SLOT_TTL_MS / 3000  # секунды
+
+
+def _report_stopped(
+    partition: int, stop: asyncio.Event, task: asyncio.Task[None]
+) -> None:
+    """Консьюмер не должен завершаться сам: его чаты перестанут отвечать"""
+    if task.cancelled() or stop.is_set():
+        return
+    logger.critical(
+        f"Консьюмер партиции {partition} остановился: {task.exception()}"
+    )
+
+
+async def _wait(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _claim_index(token: str, stop: asyncio.Event) -> int | None:
+    """Занять свободный номер воркера; None — остановлены, не дождавшись"""
+    waiting = False
+    while not stop.is_set():
+        try:
+            index = await update_queue.claim_slot(
+                settings.UPDATE_WORKERS, token
+            )
+        except Exception as e:
+            logger.error(f"Ошибка получения номера воркера: {e}")
+            index = None
+        if index is not None:
+            return index
+        if not waiting:
+            logger.warning(
+                f"Все номера 0..{settings.UPDATE_WORKERS - 1} заняты, "
+                "ждём освобождения"
+            )
+            waiting = True
+        await _wait(stop, SLOT_RENEW_INTERVAL)
+    return None
+
+
+async def _keep_index(index: int, token: str, stop: asyncio.Event) -> None:
+    """Продлевать номер; если его занял другой процесс — остановиться"""
+    while not stop.is_set():
+        await _wait(stop, SLOT_RENEW_INTERVAL)
+        try:
+            if not await update_queue.renew_slot(index, token):
+                logger.critical(
+                    f"Номер воркера {index} занят другим процессом, "
+                    "останавливаемся"
+                )
+                stop.set()
+        except Exception as e:
+            logger.error(f"Ошибка продления номера воркера {index}: {e}")
+
+
+async def main() -> None:
+    """Обрабатывать партиции, закреплённые за этим процессом"""
+    from app.bot import configure_logging, create_app, init_sentry
+    from app.db.session import engine
+    from app.services.cache_service import cache_service
+    from app.services.redis_pool import redis_registry
+
+    configure_logging()
+    init_sentry()
+    bot, dp = create_app()
+
+    index = settings.UPDATE_WORKER_INDEX
+    if index is not None and not 0 <= index < settings.UPDATE_WORKERS:
+        raise RuntimeError(
+            f"UPDATE_WORKER_INDEX={index} вне 0..{settings.UPDATE_WORKERS - 1}"
+        )
+
+    async def handle(payload: dict[str, Any]) -> None:
+        await dp.feed_raw_update(bot, payload)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    token = secrets.token_hex(16)
+    claimed = index is None
+    tasks: list[asyncio.Task[None]] = []
+    consumers: list[asyncio.Task[None]] = []
+    try:
+        if index is None:
+            index = await _claim_index(token, stop)
+            if index is None:
+                return
+            tasks.append(asyncio.create_task(_keep_index(index, token, stop)))
+
+        partitions = update_queue.owned_partitions(
+            index, settings.UPDATE_WORKERS
+        )
+        logger.info(
+            f"Воркер апдейтов {index}/{settings.UPDATE_WORKERS}: "
+            f"партиции {partitions}"
+        )
+
+        tasks.append(asyncio.create_task(cache_service.listen_invalidations()))
+        consumers = [
+            asyncio.create_task(update_queue.consume(p, handle, stop))
+            for p in partitions
+        ]
+        for partition, task in zip(partitions, consumers):
+            task.add_done_callback(
+                functools.partial(_report_stopped, partition, stop)
+            )
+
+        await stop.wait()
+        # Даём дочитать текущие пачки; недообработанное останется
+        # в pending и будет дочитано после рестарта
+        if consumers:
+            await asyncio.wait(consumers, timeout=READ_BLOCK_MS / 1000 + 5)
+    finally:
+        for task in consumers + tasks:
+            task.cancel()
+        if claimed and index is not None:
+            try:
+                await update_queue.release_slot(index, token)
+            except Exception as e:
+                logger.warning(f"Номер воркера {index} не освобождён: {e}")
+        await bot.session.close()
+        await engine.dispose()
+        await redis_registry.close()
+        logger.info("Воркер апдейтов остановлен")
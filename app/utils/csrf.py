@@ -1,11 +1,26 @@
+import base64
+import hashlib
+import hmac
 import html
 import secrets
+import time
 from typing import Any
 
 from aiogram.fsm.storage.base import StorageKey
 
+from app.config import settings
+
 CSRF_KEY = "csrf"
 
+# Подписанный токен: срок действия (base36, 7 символов) + 12 символов
+# HMAC-SHA256. Вместе с ":" занимает 20 из 64 байт callback_data.
+EXPIRY_LENGTH = 7
+MAC_BYTES = 9
+TOKEN_LENGTH = EXPIRY_LENGTH + MAC_BYTES * 4 // 3
+
+_SECRET = (settings.CSRF_SECRET or f"csrf:{settings.TELEGRAM_TOKEN}").encode()
+_KEY = hashlib.sha256(_SECRET).digest()
+
 
 async def issue_nonce(storage: Any, chat_id: int, user_id: int) -> str:
     nonce = secrets.token_hex(6)
@@ -25,6 +40,59 @@ async def check_nonce(
     return bool(nonce and data.get(CSRF_KEY) == nonce)
 
 
+def _b36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while value:
+        value, rem = divmod(value, 36)
+        out = digits[rem] + out
+    return out.rjust(EXPIRY_LENGTH, "0")
+
+
+def _mac(chat_id: int, user_id: int, expiry: str, action: str) -> str:
+    msg = f"{chat_id}|{user_id}|{expiry}|{action}".encode()
+    digest = hmac.new(_KEY, msg, hashlib.sha256).digest()[:MAC_BYTES]
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def issue_token(
+    chat_id: int,
+    user_id: int,
+    action: str = "",
+    ttl: int = settings.CSRF_TOKEN_TTL,
+) -> str:
+    """
+    Подписанный токен для callback_data, проверяется без Redis.
+
+    Пустой action — токен на всё меню; непустой привязывает токен к
+    конкретному действию.
+    """
+    expiry = _b36(int(time.time()) + ttl)
+    return expiry + _mac(chat_id, user_id, expiry, action)
+
+
+def verify_token(
+    token: str | None, chat_id: int, user_id: int, action: str = ""
+) -> bool:
+    """Проверка подписи и срока действия токена"""
+    if not token or len(token) != TOKEN_LENGTH:
+        return False
+    expiry, mac = token[:EXPIRY_LENGTH], token[EXPIRY_LENGTH:]
+    try:
+        if int(expiry, 36) < time.time():
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(mac, _mac(chat_id, user_id, expiry, action))
+
+
+async def new_nonce(storage: Any, chat_id: int, user_id: int) -> str:
+    """Nonce для меню в режиме settings.CSRF_MODE"""
+    if settings.CSRF_MODE == "signed":
+        return issue_token(chat_id, user_id)
+    return await issue_nonce(storage, chat_id, user_id)
+
+
 def escape_html(text: str) -> str:
     """Экранирует HTML-символы для безопасного отображения"""
     return html.escape(text, quote=True).replace("&", "&amp;")
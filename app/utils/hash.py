@@ -1,5 +1,14 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+# bcrypt отпускает GIL, поэтому потоки дают реальный параллелизм;
+# пул ограничен, чтобы волна логинов не съела все ядра
+MAX_WORKERS = 4
+
+_executor: ThreadPoolExecutor | None = None
+
 
 def hash_pwd(pwd: str) -> str:
     hashed = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt())
@@ -9,3 +18,29 @@ def hash_pwd(pwd: str) -> str:
 def check_pwd(pwd: str, hashed: str) -> bool:
     result = bcrypt.checkpw(pwd.encode(), hashed.encode())
     return bool(result)
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="bcrypt"
+        )
+    return _executor
+
+
+async def hash_pwd_async(pwd: str) -> str:
+    """hash_pwd в пуле потоков, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), hash_pwd, pwd)
+
+
+async def check_pwd_async(pwd: str, hashed: str) -> bool:
+    """check_pwd в пуле потоков, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool(), check_pwd, pwd, hashed)
+
+
+def is_hashed(value: str | None) -> bool:
+    """Похоже ли значение на bcrypt-хэш"""
+    return value is not None and value.startswith(("$2a$", "$2b$", "$2y$"))
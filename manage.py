@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import asyncio
 import subprocess
+import sys
 
 import typer
 
@@ -34,6 +35,32 @@ def seed():
     # asyncio.run(_seed())
 
 
+@cli.command()
+def importtime(module: str = "app.bot", top: int = 25):
+    """Отчёт о времени импорта (python -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), int(self_us), name.strip()))
+    if result.returncode != 0 or not rows:
+        print(f"❌ Не удалось импортировать {module}:")
+        print(result.stderr.splitlines()[-1] if result.stderr else "")
+        raise typer.Exit(1)
+
+    total = next((c for c, _, name in rows if name == module), rows[-1][0])
+    print(f"⏱ import {module}: {total / 1e6:.3f} с")
+    print(f"{'суммарно, мс':>14} {'свой, мс':>10}  модуль")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1e3:14.1f} {self_us / 1e3:10.1f}  {name}")
+
+
 @cli.command()
 def backup():
     """Ручной бэкап (использует scripts/backup.sh)"""
@@ -0,0 +1,72 @@
+"""add per-recipient delivery status for broadcasts
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-09-01 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Счётчики доставки рассылки
+    op.add_column(
+        "broadcasts",
+        sa.Column("total_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "broadcasts",
+        sa.Column("sent_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "broadcasts",
+        sa.Column("failed_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "broadcasts", sa.Column("finished_at", sa.DateTime(), nullable=True)
+    )
+
+    # Статус доставки каждому получателю
+    op.add_column(
+        "notifications",
+        sa.Column(
+            "broadcast_id",
+            sa.Integer(),
+            sa.ForeignKey("broadcasts.id"),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "notifications",
+        sa.Column(
+            "status", sa.String(20), nullable=False, server_default="pending"
+        ),
+    )
+    op.add_column(
+        "notifications", sa.Column("error", sa.String(255), nullable=True)
+    )
+    op.create_index(
+        "ix_notifications_broadcast_status",
+        "notifications",
+        ["broadcast_id", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_broadcast_status")
+    op.drop_column("notifications", "error")
+    op.drop_column("notifications", "status")
+    op.drop_column("notifications", "broadcast_id")
+    op.drop_column("broadcasts", "finished_at")
+    op.drop_column("broadcasts", "failed_count")
+    op.drop_column("broadcasts", "sent_count")
+    op.drop_column("broadcasts", "total_count")
@@ -0,0 +1,37 @@
+"""add kpi_rollup table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-09-01 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Предрасчитанные KPI: /kpi, Prometheus и кеш читают их вместо
+    # полного сканирования tasks/tickets/notes/users
+    op.create_table(
+        "kpi_rollup",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("kpi_rollup")
@@ -0,0 +1,39 @@
+"""add (created_at, id) indexes for keyset pagination
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-09-02 10:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+# Индекс повторяет ORDER BY страницы, фильтр по равенству — первым:
+# страница читается одним range scan без сортировки
+INDEXES = (
+    ("ix_notes_teacher_keyset", "notes", ["teacher_id", "created_at", "id"]),
+    ("ix_tickets_keyset", "tickets", ["created_at", "id"]),
+    ("ix_media_requests_keyset", "media_requests", ["created_at", "id"]),
+    (
+        "ix_psych_requests_status_keyset",
+        "psych_requests",
+        ["status", "created_at", "id"],
+    ),
+    ("ix_tasks_status_keyset", "tasks", ["status", "created_at", "id"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import sys
+
+from app.update_worker import main
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout), logging.FileHandler("updates.log")],
+)
+
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    logger.info("Starting School Bot update worker...")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Update worker stopped by user")
+    except Exception as e:
+        logger.error(f"Update worker crashed: {e}")
+        raise
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import signal
+import sys
+
+from aiogram import Bot
+
+from app.config import settings
+from app.services import jobs  # noqa: F401  регистрирует обработчики
+from app.services import pdf_renderer
+from app.services.delivery import init_delivery_engine
+from app.services.job_queue import JobWorker, job_queue
+from app.services.redis_pool import redis_registry
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout), logging.FileHandler("worker.log")],
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    bot = Bot(settings.TELEGRAM_TOKEN)
+    init_delivery_engine(bot)
+    worker = JobWorker(job_queue, bot, concurrency=settings.JOB_WORKERS)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        pdf_renderer.shutdown()
+        await bot.session.close()
+        await redis_registry.close()
+
+
+if __name__ == "__main__":
+    logger.info("Starting School Bot worker...")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Worker stopped by user")
+    except Exception as e:
+        logger.error(f"Worker crashed: {e}")
+        raise
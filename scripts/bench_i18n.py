@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк локализации: обход вложенного TOML против плоского каталога
+
+Запуск: python scripts/bench_i18n.py
+"""
+
+import sys
+import timeit
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import i18n  # noqa: E402
+from app.i18n import t, t_format  # noqa: E402
+
+KEY = "teacher.ticket_created"
+NUMBER = 200_000
+
+
+def nested_t(key: str, lang: str = "ru") -> str:
+    """Прежняя реализация t(): разбор ключа и обход словарей"""
+    node: Any = i18n.load_lang(lang)
+    for part in key.split("."):
+        if isinstance(node, dict):
+            node = node.get(part, {})
+        else:
+            return key
+    return str(node) if isinstance(node, str) else key
+
+
+def bench(name: str, stmt: Any) -> None:
+    seconds = min(timeit.repeat(stmt, number=NUMBER, repeat=5))
+    print(f"{name:<32} {seconds / NUMBER * 1e9:8.0f} нс/вызов")
+
+
+def main() -> None:
+    t(KEY)  # компиляция каталога не входит в замер
+    print(f"=== i18n, {NUMBER} вызовов, ключ {KEY} ===")
+    bench("вложенный обход", lambda: nested_t(KEY))
+    bench("плоский каталог t()", lambda: t(KEY))
+    bench(
+        "вложенный обход + format",
+        lambda: nested_t(KEY).format(ticket_id=42),
+    )
+    bench("t() + format", lambda: t(KEY).format(ticket_id=42))
+    bench("t_format()", lambda: t_format(KEY, ticket_id=42))
+
+
+if __name__ == "__main__":
+    main()
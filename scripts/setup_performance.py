@@ -14,6 +14,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from app.config import settings
+from app.services.cache_service import redis_db_url
 
 
 async def check_redis_connection():
@@ -64,14 +65,18 @@ async def apply_database_migrations():
 async def setup_cache():
     """Настроить кеш"""
     try:
-        redis_client = redis.from_url(settings.REDIS_URL)
+        # Только БД кеша: FSM, лимиты и очереди живут в основной БД
+        redis_client = redis.from_url(
+            redis_db_url(settings.REDIS_URL, settings.REDIS_CACHE_DB)
+        )
         
         # Очистить старые данные
         await redis_client.flushdb()
         
-        # Настроить параметры Redis
+        # Настроить параметры Redis. Политика сервера общая для всех БД:
+        # volatile-lru вытесняет только ключи с TTL (кеш), но не FSM и очереди
         await redis_client.config_set("maxmemory", "512mb")
-        await redis_client.config_set("maxmemory-policy", "allkeys-lru")
+        await redis_client.config_set("maxmemory-policy", "volatile-lru")
         
         # Проверить настройки
         maxmemory = await redis_client.config_get("maxmemory")
@@ -0,0 +1,88 @@
+"""
+Тесты реестра статических картинок: загрузка один раз, затем file_id
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from app.services import assets
+from app.services.assets import AssetRegistry, prepare_asset
+
+IMAGE = "onboard_cards_v3/onboard_teacher.png"
+
+
+def _sent(file_id):
+    return MagicMock(
+        photo=[MagicMock(file_id="thumb"), MagicMock(file_id=file_id)]
+    )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Redis-кэш file_id в памяти"""
+    data = {}
+
+    async def get(key):
+        return data.get(key)
+
+    async def set_(key, file_id, ttl=None):
+        data[key] = file_id
+
+    async def forget(key):
+        data.pop(key, None)
+
+    monkeypatch.setattr(assets, "get_file_id", get)
+    monkeypatch.setattr(assets, "set_file_id", set_)
+    monkeypatch.setattr(assets, "forget_file_id", forget)
+    return data
+
+
+def test_prepare_recompresses():
+    """Картинка уменьшается и пережимается; ключ зависит от параметров"""
+    original = prepare_asset(IMAGE)
+    small = prepare_asset(IMAGE, max_side=640, quality=80)
+
+    assert small.filename == "onboard_teacher.jpg"
+    assert len(small.data) < len(original.data)
+    assert small.key != original.key
+
+
+@pytest.mark.asyncio
+async def test_uploads_once_then_sends_file_id(store):
+    """Первая отправка загружает файл, следующие идут по file_id"""
+    registry = AssetRegistry(max_side=640)
+    send = AsyncMock(return_value=_sent("FILE"))
+
+    await registry.send_photo(send, IMAGE, caption="1")
+    await registry.send_photo(send, IMAGE, caption="2")
+
+    first, second = send.call_args_list
+    assert isinstance(first.kwargs["photo"], BufferedInputFile)
+    assert second.kwargs["photo"] == "FILE"
+    assert list(store.values()) == ["FILE"]
+
+    # Другой процесс берёт file_id из общего кэша
+    other = AsyncMock(return_value=_sent("FILE"))
+    await AssetRegistry(max_side=640).send_photo(other, IMAGE)
+    assert other.call_args.kwargs["photo"] == "FILE"
+
+
+@pytest.mark.asyncio
+async def test_stale_file_id_is_reuploaded(store):
+    """file_id, который Telegram не принял, заменяется новой загрузкой"""
+    registry = AssetRegistry(max_side=640)
+    store[(await registry.asset(IMAGE)).key] = "STALE"
+    send = AsyncMock(
+        side_effect=[
+            TelegramBadRequest(method=MagicMock(), message="wrong file"),
+            _sent("NEW"),
+        ]
+    )
+
+    await registry.send_photo(send, IMAGE)
+
+    assert isinstance(send.call_args.kwargs["photo"], BufferedInputFile)
+    assert list(store.values()) == ["NEW"]
@@ -0,0 +1,101 @@
+"""
+Тесты быстрого старта: импорт app.bot без побочных эффектов
+и проверка ревизии схемы вместо create_all
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Bot
+
+import app.bot as bot_module
+from app.routes import ROUTERS
+
+# Бюджет на `import app.bot` поверх уже импортированного aiogram:
+# сам aiogram.types грузится несколько секунд и в бюджет не входит
+IMPORT_BUDGET = 3.0  # секунды
+
+PROBE = """
+import sys, time
+import aiogram.types
+started = time.perf_counter()
+import app.bot
+elapsed = time.perf_counter() - started
+routes = [m for m in sys.modules if m.startswith("app.routes.")]
+print(elapsed, len(routes))
+"""
+
+
+def test_import_is_cheap_and_lazy():
+    """Импорт не создаёт Bot и не подключает роутеры"""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    elapsed, routes = result.stdout.split()
+    assert float(elapsed) < IMPORT_BUDGET
+    assert routes == "0"
+
+
+def test_create_dispatcher_includes_all_routers():
+    """Фабрика подключает все роутеры в заданном порядке"""
+    bot = Bot(token="123456:" + "A" * 35)
+
+    dp = bot_module.create_dispatcher(bot)
+
+    names = [router.name for router in dp.sub_routers]
+    assert len(names) == len(ROUTERS)
+    assert dp["dp"] is dp
+    assert len(dp.message.handlers) == 1
+    assert len(dp.callback_query.handlers) == 3
+
+
+def _mock_engine(monkeypatch, revisions):
+    rows = [(revision,) for revision in revisions]
+    conn = MagicMock()
+    conn.execute = AsyncMock(return_value=rows)
+    engine = MagicMock()
+    engine.connect.return_value.__aenter__ = AsyncMock(return_value=conn)
+    engine.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(bot_module, "engine", engine)
+
+
+def _heads():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(bot_module.ROOT / "alembic.ini"))
+    config.set_main_option(
+        "script_location", str(bot_module.ROOT / "migrations")
+    )
+    return ScriptDirectory.from_config(config).get_heads()
+
+
+@pytest.mark.asyncio
+async def test_check_schema_accepts_head(monkeypatch):
+    """Схема на head: старт продолжается"""
+    _mock_engine(monkeypatch, _heads())
+    monkeypatch.setattr(bot_module.settings, "ENV", "prod")
+
+    await bot_module.check_schema()
+
+
+@pytest.mark.asyncio
+async def test_check_schema_mismatch(monkeypatch):
+    """Отставшая схема: в prod старт прерывается, иначе предупреждение"""
+    _mock_engine(monkeypatch, ["outdated"])
+
+    monkeypatch.setattr(bot_module.settings, "ENV", "dev")
+    await bot_module.check_schema()
+
+    monkeypatch.setattr(bot_module.settings, "ENV", "prod")
+    with pytest.raises(RuntimeError, match="manage.py migrate"):
+        await bot_module.check_schema()
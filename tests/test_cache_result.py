@@ -0,0 +1,332 @@
+"""
+Тесты мемоизации cache_result и пространств ключей: ключи, single-flight,
+None, теги, поколения
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.roles import UserRole
+from app.services import cache_service as cs
+from app.services.cache_service import (
+    USER_NOTES,
+    CacheService,
+    cache_result,
+    cache_service,
+    invalidate_tags,
+    redis_db_url,
+)
+from app.services.redis_pool import (
+    RELEASE_LOCK_SCRIPT,
+    begin_batch,
+    end_batch,
+)
+
+
+class MemoryRedis:
+    """Минимальный Redis в памяти для команд, которыми пользуется кеш"""
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def flushdb(self):
+        raise AssertionError("FLUSHDB стирает FSM и лимиты")
+
+    async def publish(self, channel, message):
+        pass
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.sets.pop(key, None)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    async def eval(self, script, numkeys, key, token):
+        assert script == RELEASE_LOCK_SCRIPT
+        if self.data.get(key) != token:
+            return 0
+        del self.data[key]
+        return 1
+
+    def pipeline(self, transaction=True):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.redis.set(key, value, ex=ex))
+
+    def setex(self, key, ttl, value):
+        self.commands.append(lambda: self.redis.setex(key, ttl, value))
+
+    def delete(self, *keys):
+        self.commands.append(lambda: self.redis.delete(*keys))
+
+    def publish(self, channel, message):
+        self.commands.append(lambda: self.redis.publish(channel, message))
+
+    def incr(self, key):
+        self.commands.append(lambda: self.redis.incr(key))
+
+    def sadd(self, key, member):
+        self.redis.sets.setdefault(key, set()).add(member)
+
+    def expire(self, key, ttl, nx=False, gt=False):
+        pass
+
+    async def execute(self):
+        for command in self.commands:
+            await command()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = MemoryRedis()
+    monkeypatch.setattr(cs, "redis_client", fake)
+    return fake
+
+
+def test_key_is_stable_across_processes():
+    code = (
+        "from app.services.cache_service import argument_digest;"
+        "from app.roles import UserRole;"
+        "print(argument_digest({'role': UserRole.TEACHER, 'limit': 5}))"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for _ in range(2)
+    }
+    assert len(keys) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_ignores_argument_style(redis):
+    @cache_result(ttl=60)
+    async def users(role: UserRole, limit: int = 10):
+        return [role.value, limit]
+
+    assert users.cache_digest((UserRole.TEACHER,), {}) == users.cache_digest(
+        (), {"role": UserRole.TEACHER, "limit": 10}
+    )
+    with pytest.raises(TypeError):
+        users.cache_digest((object(),), {})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(redis):
+    calls = 0
+
+    @cache_result(ttl=60)
+    async def slow(x):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"x": x}
+
+    results = await asyncio.gather(*(slow(1) for _ in range(10)))
+
+    assert calls == 1
+    assert results == [{"x": 1}] * 10
+    assert await slow(1) == {"x": 1}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_none_is_cached_negatively(redis):
+    calls = 0
+
+    @cache_result(ttl=60, negative_ttl=30)
+    async def missing(x):
+        nonlocal calls
+        calls += 1
+        return None
+
+    @cache_result(ttl=60, negative_ttl=0)
+    async def uncached(x):
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await missing(1) is None
+    assert await missing(1) is None
+    assert calls == 1
+
+    await uncached(1)
+    await uncached(1)
+    assert calls == 3
+
+
+@pytest.mark.asyncio
+async def test_lock_is_released_only_by_owner(redis):
+    """Пересчёт дольше lock_timeout не снимает чужую блокировку"""
+    assert await cs._try_lock("k", "a", 1)
+    assert not await cs._try_lock("k", "b", 1)
+
+    # Блокировка истекла, её взял другой процесс
+    redis.data["k:lock"] = "b"
+    await cs._unlock("k", "a")
+    assert redis.data["k:lock"] == "b"
+
+    await cs._unlock("k", "b")
+    assert "k:lock" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_tag_invalidation(redis):
+    calls = 0
+
+    @cache_result(ttl=60, tags=lambda school: ("users", f"school:{school}"))
+    async def count(school):
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await count(1) == 1
+    assert await count(2) == 2
+    assert await count(1) == 1
+
+    assert await invalidate_tags("school:1") == 1
+    assert await count(1) == 3
+    assert await count(2) == 2
+
+    assert await invalidate_tags("users") == 2
+    assert await count(2) == 4
+
+
+@pytest.mark.asyncio
+async def test_early_refresh_serves_stale_value(redis, monkeypatch):
+    calls = 0
+
+    @cache_result(ttl=100, early_refresh=1.0)
+    async def value():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    assert await value() == 1
+    # Запись почти истекла: вызов отдаёт старое значение и обновляет в фоне
+    monkeypatch.setattr(cs.random, "random", lambda: 1.0)
+    monkeypatch.setattr(cs.time, "time", lambda: time.time_ns() / 1e9 + 99)
+    assert await value() == 1
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_namespace_bump_and_clear_all(redis):
+    calls = 0
+
+    @cache_result(ttl=60)
+    async def value(x):
+        nonlocal calls
+        calls += 1
+        return calls
+
+    notes_key = await USER_NOTES.key(5, 10)
+    other_key = await USER_NOTES.key(6, 10)
+    assert await value(1) == 1
+
+    await cache_service.invalidate_user_notes(5)
+    assert await USER_NOTES.key(5, 10) != notes_key
+    assert await USER_NOTES.key(6, 10) == other_key
+
+    await value.invalidate_all()
+    assert await value(1) == 2
+
+    await cache_service.clear_all_caches()
+    assert await USER_NOTES.key(6, 10) != other_key
+    assert await value(1) == 3
+
+
+def test_cache_uses_separate_redis_db():
+    assert redis_db_url("redis://redis:6379/0", 1) == "redis://redis:6379/1"
+    assert (
+        redis_db_url("redis://:pw@host:6380", 2) == "redis://:pw@host:6380/2"
+    )
+
+
+@pytest.mark.asyncio
+async def test_snapshot_miss_is_not_written_after_invalidation(
+    redis, monkeypatch
+):
+    row = SimpleNamespace(
+        id=1,
+        tg_id=42,
+        role="student",
+        theme="light",
+        login=None,
+        username=None,
+        first_name=None,
+        last_name=None,
+        is_active=True,
+        seen_intro=False,
+    )
+
+    class Result:
+        def first(self):
+            return row
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, query):
+            return Result()
+
+    monkeypatch.setattr(cs, "AsyncSessionLocal", Session)
+    CacheService.local_users.clear()
+
+    # Промах и инвалидация в одном апдейте: снимок не должен вернуться
+    token = begin_batch()
+    assert (await CacheService.get_user_snapshot(42)).theme == "light"
+    await CacheService.invalidate_user(42)
+    await end_batch(token)
+
+    assert "user:42" not in redis.data
@@ -0,0 +1,95 @@
+"""
+Тесты загрузки пользователя один раз на апдейт
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.middlewares.audit import AuditMiddleware
+from app.middlewares.current_user import CurrentUserMiddleware
+from app.routes import teacher
+from app.schemas.user import UserSnapshot
+
+SNAPSHOT = UserSnapshot(id=7, tg_id=123, role="teacher", theme="dark")
+
+
+@pytest.mark.asyncio
+async def test_snapshot_loaded_once_per_update():
+    """Снимок загружается один раз и кладётся в data"""
+    middleware = CurrentUserMiddleware()
+    handler = AsyncMock(return_value="ok")
+    data = {"event_from_user": SimpleNamespace(id=123)}
+
+    with patch(
+        "app.middlewares.current_user.load_user_snapshot",
+        AsyncMock(return_value=SNAPSHOT),
+    ) as load:
+        assert await middleware(handler, object(), data) == "ok"
+        # Повторный проход по цепочке не делает нового запроса
+        await middleware(handler, object(), data)
+
+    load.assert_awaited_once_with(123)
+    assert data["current_user"] is SNAPSHOT
+
+
+@pytest.mark.asyncio
+async def test_snapshot_none_without_user():
+    """Апдейты без отправителя не обращаются к БД"""
+    middleware = CurrentUserMiddleware()
+    data: dict = {}
+
+    with patch(
+        "app.middlewares.current_user.load_user_snapshot", AsyncMock()
+    ) as load:
+        await middleware(AsyncMock(), object(), data)
+
+    load.assert_not_awaited()
+    assert data["current_user"] is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_db_error_is_not_fatal():
+    """Ошибка БД не прерывает обработку апдейта"""
+    middleware = CurrentUserMiddleware()
+    handler = AsyncMock(return_value="ok")
+    data = {"event_from_user": SimpleNamespace(id=123)}
+
+    with patch(
+        "app.middlewares.current_user.load_user_snapshot",
+        AsyncMock(side_effect=RuntimeError("db down")),
+    ):
+        assert await middleware(handler, object(), data) == "ok"
+
+    assert data["current_user"] is None
+
+
+def test_snapshot_is_immutable():
+    """Снимок нельзя изменить в хэндлере"""
+    with pytest.raises(AttributeError):
+        SNAPSHOT.role = "admin"  # type: ignore[misc]
+
+
+def test_audit_reads_snapshot():
+    """AuditMiddleware берёт данные из снимка без запроса в БД"""
+    info = AuditMiddleware()._get_user_info({"current_user": SNAPSHOT})
+    assert info["user_id"] == 7
+    assert info["role"] == "teacher"
+
+
+@pytest.mark.asyncio
+async def test_unregistered_user_is_not_queried_again():
+    """None от middleware — «не найден», хэндлер не повторяет запрос"""
+    call = MagicMock(from_user=SimpleNamespace(id=123))
+    call.answer = AsyncMock()
+
+    with patch.object(teacher, "me", AsyncMock(return_value=None)) as me:
+        await teacher.teacher_notes(call, "ru", current_user=None)
+        me.assert_not_awaited()
+
+        # Без middleware хэндлер загружает пользователя сам
+        await teacher.teacher_notes(call, "ru")
+        me.assert_awaited_once_with(123)
+
+    assert call.answer.await_count == 2
@@ -0,0 +1,65 @@
+"""
+Тесты сборки движка БД и метрик пула
+"""
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.config import settings
+from app.db.session import (
+    InstrumentedQueuePool,
+    TimedCheckout,
+    build_engine,
+    engine_options,
+    instrument_pool,
+)
+
+
+def _metric(name):
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def test_pool_settings_are_applied():
+    engine = build_engine()
+    pool = engine.sync_engine.pool
+
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert pool.size() == settings.CONNECTION_POOL_SIZE
+    assert pool._max_overflow == settings.MAX_OVERFLOW
+    assert pool._timeout == settings.POOL_TIMEOUT
+    assert pool._recycle == settings.POOL_RECYCLE
+    assert pool._pre_ping is settings.DB_POOL_PRE_PING
+
+
+def test_pgbouncer_mode_disables_pool_and_statement_cache():
+    options = engine_options(pgbouncer=True)
+
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    name = options["connect_args"]["prepared_statement_name_func"]
+    assert name() != name()
+
+    engine = build_engine(pgbouncer=True, pre_ping=True)
+    assert isinstance(engine.sync_engine.pool, NullPool)
+    assert engine.sync_engine.pool._pre_ping is True
+
+
+def test_pool_metrics():
+    class TimedPool(TimedCheckout, QueuePool):
+        pass
+
+    engine = create_engine("sqlite://", poolclass=TimedPool, pool_size=2)
+    instrument_pool(engine)
+    checkouts = _metric("db_pool_checkouts_total")
+    waits = _metric("db_pool_checkout_wait_seconds_count")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert _metric("db_pool_checked_out") == 1
+
+    assert _metric("db_pool_checked_out") == 0
+    assert _metric("db_pool_checkouts_total") == checkouts + 1
+    assert _metric("db_pool_checkout_wait_seconds_count") == waits + 1
+    assert _metric("db_pool_size") == 2
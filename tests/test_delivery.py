@@ -0,0 +1,172 @@
+"""
+Тесты движка массовой доставки
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from app.services import delivery as delivery_module
+from app.services.delivery import DeliveryEngine, Recipient, TokenBucket
+
+
+def _recipients(n: int) -> list[Recipient]:
+    return [Recipient(tg_id=i) for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(delivery_module, "RETRY_BACKOFF", 0)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Ведро не выдаёт больше rate токенов в секунду сверх запаса"""
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(15):
+        await bucket.acquire()
+    # 5 токенов из запаса, ещё 10 — со скоростью 50/с
+    assert time.monotonic() - started >= 0.18
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_only_after_pause():
+    """После паузы ведро не отдаёт запас, накопленный за время паузы"""
+    bucket = TokenBucket(rate=50, capacity=5)
+    bucket.pause(0.1)
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+    # 0,1 с паузы и 5 токенов со скоростью 50/с, а не всплеск из запаса
+    assert time.monotonic() - started >= 0.18
+
+
+@pytest.mark.asyncio
+async def test_deliver_counts_and_bounds_concurrency():
+    """Отправка идёт параллельно, но не больше concurrency за раз"""
+    active = 0
+    peak = 0
+
+    async def send_message(chat_id, text, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=send_message)
+    engine = DeliveryEngine(bot, rate=1000, concurrency=4)
+
+    report = await engine.deliver(_recipients(20), "Привет")
+
+    assert report.sent == 20
+    assert report.failed == 0
+    assert 1 < peak <= 4
+    assert report.throughput > 0
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_and_retries():
+    """429 приостанавливает отправку и повторяет сообщение"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock(
+        side_effect=[
+            TelegramRetryAfter(MagicMock(), "Too Many Requests", 0),
+            None,
+        ]
+    )
+    engine = DeliveryEngine(bot, rate=1000)
+
+    report = await engine.deliver(_recipients(1), "Привет")
+
+    assert report.sent == 1
+    assert report.retries == 1
+    assert bot.send_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_not_an_attempt():
+    """Несколько 429 подряд не исчерпывают попытки получателя"""
+    retry = TelegramRetryAfter(MagicMock(), "Too Many Requests", 0)
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=[retry, retry, retry, None])
+    engine = DeliveryEngine(
+        bot, rate=1000, per_chat_interval=0, max_attempts=3
+    )
+
+    report = await engine.deliver(_recipients(1), "Привет")
+
+    assert report.sent == 1
+    assert report.failed == 0
+    assert bot.send_message.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_blocked_user_is_not_retried(no_backoff):
+    """Заблокировавший бота пользователь сразу помечается как ошибка"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock(
+        side_effect=TelegramForbiddenError(MagicMock(), "bot was blocked")
+    )
+    engine = DeliveryEngine(bot, rate=1000)
+
+    report = await engine.deliver(_recipients(1), "Привет")
+
+    assert report.failed == 1
+    bot.send_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_network_errors_retried_up_to_limit(no_backoff):
+    """Временные ошибки повторяются max_attempts раз"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock(side_effect=RuntimeError("timeout"))
+    engine = DeliveryEngine(bot, rate=1000, max_attempts=3)
+
+    report = await engine.deliver(_recipients(1), "Привет")
+
+    assert report.failed == 1
+    assert bot.send_message.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_per_chat_interval():
+    """Сообщения в один чат разносятся по времени"""
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    engine = DeliveryEngine(bot, rate=1000, per_chat_interval=0.1)
+
+    started = time.monotonic()
+    await engine.deliver([Recipient(tg_id=1)] * 3, "Привет")
+
+    assert time.monotonic() - started >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_role_notifications_are_tracked_broadcasts(monkeypatch):
+    """Рассылки по ролям идут через Broadcast и продолжаются при повторе"""
+    from app.roles import UserRole
+    from app.services import notification_service as ns
+
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+    engine = DeliveryEngine(bot, rate=1000)
+    engine.broadcast = AsyncMock(return_value=MagicMock(sent=2, total=2))
+    engine.deliver_broadcast = AsyncMock()
+    monkeypatch.setattr(ns, "broadcast_sent_count", AsyncMock(return_value=5))
+
+    service = ns.NotificationService(bot, engine)
+    assert await service.notify_admins("Заявка {n}", author_id=7, n=1) == 2
+    author, text, role = engine.broadcast.await_args.args
+    assert (author, text, role) == (7, "Заявка 1", UserRole.ADMIN.value)
+
+    interactions = ns.InteractionService(bot, engine)
+    assert await interactions.admin_broadcast(100, [3, 4]) == 5
+    delivered = [c.args[0] for c in engine.deliver_broadcast.await_args_list]
+    assert delivered == [3, 4]
+    bot.send_message.assert_awaited_once()
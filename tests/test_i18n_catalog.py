@@ -0,0 +1,60 @@
+"""
+Тесты скомпилированного каталога локализации
+"""
+
+import pytest
+
+from app import i18n
+from app.i18n import catalog, compile_catalog, t, t_format
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog():
+    i18n.clear_cache()
+    yield
+    i18n.clear_cache()
+
+
+def test_flat_lookup_matches_toml():
+    """Плоский каталог отдаёт те же строки, что и вложенный TOML"""
+    ru = i18n.load_lang("ru")
+
+    assert t("common.rate_limited", "ru") == ru["common"]["rate_limited"]
+    assert t("common", "ru") == "common"
+    assert t("missing.key", "en") == "missing.key"
+    assert catalog("xx") is catalog("ru")
+
+
+def test_fallback_chain_resolved_at_compile(monkeypatch):
+    """Недостающий перевод берётся из языка по умолчанию"""
+    files = {
+        "ru": {"menu": {"open": "Открыть", "close": "Закрыть"}},
+        "en": {"menu": {"open": "Open"}},
+    }
+    monkeypatch.setattr(i18n, "_sources", lambda: files)
+    monkeypatch.setattr(i18n, "load_lang", files.__getitem__)
+
+    en = compile_catalog()["en"]
+
+    assert en == {"menu.open": "Open", "menu.close": "Закрыть"}
+
+
+def test_t_format_caches_template_and_keeps_missing():
+    """t_format подставляет параметры и не падает без них"""
+    assert t_format("teacher.ticket_created", "en", ticket_id=7).endswith(
+        "Number: 7"
+    )
+    assert ("en", "teacher.ticket_created") in i18n._templates
+    assert "{ticket_id}" in t_format("teacher.ticket_created", "en")
+
+
+def test_binary_cache_roundtrip(monkeypatch, tmp_path):
+    """Каталог сохраняется в бинарный кэш и читается без TOML"""
+    cache_file = tmp_path / "i18n.cache"
+    monkeypatch.setattr(i18n.settings, "I18N_CACHE_FILE", str(cache_file))
+    expected = t("common.rate_limited", "en")
+    assert cache_file.exists()
+
+    i18n.clear_cache()
+    monkeypatch.setattr(i18n, "compile_catalog", lambda: pytest.fail("TOML"))
+    assert t("common.rate_limited", "en") == expected
@@ -0,0 +1,130 @@
+"""
+Тесты очереди фоновых задач
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+
+from app.services import job_queue as job_queue_module
+from app.services.job_queue import (
+    Job,
+    JobQueue,
+    JobWorker,
+    backoff,
+    job_handler,
+)
+
+
+@pytest.fixture
+def queue():
+    queue = MagicMock()
+    queue.name = "test"
+    queue.visibility_timeout = 300
+    queue.ack = AsyncMock()
+    queue.fail = AsyncMock(return_value=True)
+    return queue
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    registry: dict = {}
+    monkeypatch.setattr(job_queue_module, "JOB_HANDLERS", registry)
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_successful_job_is_acked(queue, handlers):
+    """Успешная задача подтверждается и удаляется"""
+    bot = MagicMock()
+    handler = job_handler("echo")(AsyncMock())
+    job = Job(id="1", name="echo", kwargs={"text": "hi"}, attempts=1)
+
+    await JobWorker(queue, bot).process(job)
+
+    handler.assert_awaited_once_with(bot, text="hi")
+    queue.ack.assert_awaited_once_with(job)
+    queue.fail.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_goes_to_retry(queue, handlers):
+    """Исключение в обработчике передаётся в fail с текстом ошибки"""
+    job_handler("boom")(AsyncMock(side_effect=ValueError("bad input")))
+    job = Job(id="2", name="boom", kwargs={}, attempts=1)
+
+    await JobWorker(queue, MagicMock()).process(job)
+
+    queue.ack.assert_not_awaited()
+    queue.fail.assert_awaited_once_with(job, "ValueError: bad input")
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_is_dead_lettered(queue, handlers):
+    """Задача без обработчика сразу исчерпывает попытки"""
+    job = Job(id="3", name="missing", kwargs={}, attempts=1, max_attempts=3)
+
+    await JobWorker(queue, MagicMock()).process(job)
+
+    queue.fail.assert_awaited_once()
+    assert job.attempts == job.max_attempts
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_job_over_limit_not_run(queue, handlers):
+    """Задача, вернувшаяся по таймауту сверх лимита, не выполняется"""
+    handler = job_handler("slow")(AsyncMock())
+    job = Job(id="4", name="slow", kwargs={}, attempts=4, max_attempts=3)
+
+    await JobWorker(queue, MagicMock()).process(job)
+
+    handler.assert_not_awaited()
+    queue.fail.assert_awaited_once()
+
+
+def test_backoff_grows_and_is_capped():
+    """Задержка растёт экспоненциально и ограничена сверху"""
+    assert backoff(1) <= job_queue_module.BACKOFF_BASE
+    assert backoff(3) >= job_queue_module.BACKOFF_BASE * 2
+    assert backoff(30) <= job_queue_module.BACKOFF_MAX
+
+
+@pytest.mark.asyncio
+async def test_unique_key_survives_lost_job_data():
+    """Пропавшая задача не блокирует уникальный ключ навсегда"""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = JobQueue(client, name="test", visibility_timeout=60)
+
+    job_id = await queue.enqueue("news_refresh", unique="news")
+    assert job_id
+    assert await queue.enqueue("news_refresh", unique="news") is None
+    assert await client.pttl(queue.unique_key("news")) > 0
+
+    # Данные задачи потеряны, пока она была в очереди
+    await client.delete(queue.job_key(job_id))
+    assert await queue.reserve() is None
+    assert not await client.exists(queue.job_key(job_id))
+    assert await queue.stats() == {
+        "ready": 0,
+        "delayed": 0,
+        "processing": 0,
+        "dead": 0,
+    }
+
+    assert await queue.enqueue("news_refresh", unique="news")
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_extends_unique_key():
+    """Продление долгой задачи продлевает и её ключ уникальности"""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = JobQueue(client, name="test", visibility_timeout=60)
+    await queue.enqueue("report", unique="r1")
+    job = await queue.reserve()
+    assert job.unique == "r1"
+
+    await client.pexpire(queue.unique_key("r1"), 1000)
+    await queue.extend(job)
+
+    assert await client.pttl(queue.unique_key("r1")) > 1000
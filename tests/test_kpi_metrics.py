@@ -1,4 +1,7 @@
 from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
 
 from app.db.task import Task, TaskPriority, TaskStatus
 from app.db.user import User
@@ -55,3 +58,41 @@ def test_user_model():
     assert user.tg_id == 123456789
     assert user.role == "teacher"
     assert user.is_active is True
+
+
+def test_kpi_query_is_single_filtered_select():
+    """Все KPI считаются одним запросом с FILTER, без скана по каждому"""
+    from sqlalchemy.dialects import postgresql
+
+    from app.repositories.stats_repo import KPI_KEYS, kpi_query
+
+    sql = str(kpi_query().compile(dialect=postgresql.dialect()))
+
+    assert sql.count("FILTER (WHERE") >= 6
+    assert sql.count("FROM notes") == 1
+    assert sql.count("FROM tickets") == 1
+    assert sql.count("FROM tasks") == 1
+    assert sql.count("FROM users") == 1
+    for key in KPI_KEYS:
+        assert key in sql
+
+
+@pytest.mark.asyncio
+async def test_kpi_summary_reads_rollup():
+    """/kpi читает rollup, а не базовые таблицы"""
+    from app.repositories import stats_repo
+
+    rollup = dict.fromkeys(stats_repo.KPI_KEYS, 0) | {
+        "tasks_total": 10,
+        "tasks_done": 4,
+        "overdue": 2,
+    }
+    with patch.object(
+        stats_repo, "read_kpi_rollup", AsyncMock(return_value=rollup)
+    ), patch.object(stats_repo, "compute_kpi", AsyncMock()) as compute:
+        summary = await stats_repo.kpi_summary()
+
+    compute.assert_not_awaited()
+    assert summary["tasks_total"] == 10
+    assert summary["overdue"] == 2
+    assert "tasks_pending" not in summary
@@ -0,0 +1,161 @@
+"""
+Тесты атомарного rate limiter
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+from aiogram.types import Message
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.middlewares.rate_limit import RateLimitMiddleware
+from app.services import limiter
+from app.services.limiter import LimitResult
+
+
+@pytest.fixture
+def script(monkeypatch):
+    script = AsyncMock()
+    monkeypatch.setattr(
+        limiter, "ALGORITHMS", {"gcra": script, "fixed": script}
+    )
+    monkeypatch.setattr(limiter, "_leases", {})
+    monkeypatch.setattr(limiter, "_last_seen", {})
+    return script
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(
+        limiter, "time", SimpleNamespace(monotonic=clock.monotonic)
+    )
+    return clock
+
+
+@pytest.fixture
+def lua(monkeypatch):
+    """Настоящие Lua-скрипты лимитера на fakeredis"""
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(
+        limiter,
+        "ALGORITHMS",
+        {
+            "fixed": fake.register_script(limiter.FIXED_WINDOW_SCRIPT),
+            "gcra": fake.register_script(limiter.GCRA_SCRIPT),
+        },
+    )
+    monkeypatch.setattr(limiter, "_leases", {})
+    monkeypatch.setattr(limiter, "_last_seen", {})
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_hit_is_single_script_call(script):
+    """Проверка — один вызов скрипта с окном в миллисекундах"""
+    script.return_value = [1, 0, 9]
+
+    res = await limiter.hit("rl:1", 10, 60, algorithm="gcra")
+
+    assert res.allowed and res.remaining == 9
+    script.assert_awaited_once_with(keys=["rl:1"], args=[10, 60000, 1])
+
+
+@pytest.mark.asyncio
+async def test_denied_hit_returns_retry_after(script):
+    """Отказ возвращает retry_after в секундах с округлением вверх"""
+    script.return_value = [0, 1500, 0]
+
+    res = await limiter.hit("rl:1", 10, 60)
+
+    assert not res.allowed
+    assert res.retry_after == 2
+
+
+@pytest.mark.asyncio
+async def test_lease_skips_redis(script):
+    """Выданная пачка токенов расходуется без обращения к Redis"""
+    script.return_value = [3, 0, 20]
+
+    results = [await limiter.hit("rl:2", 30, 60) for _ in range(3)]
+
+    assert all(r.allowed for r in results)
+    assert script.await_count == 1
+    await limiter.hit("rl:2", 30, 60)
+    assert script.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_zero_limit_and_redis_errors(script):
+    """Нулевой лимит запрещает без Redis, сбой Redis пропускает"""
+    assert not (await limiter.hit("rl:3", 0, 60)).allowed
+    script.assert_not_awaited()
+
+    script.side_effect = RedisConnectionError("down")
+    assert (await limiter.hit("rl:3", 10, 60)).allowed
+
+
+@pytest.mark.asyncio
+async def test_middleware_uses_role_limit():
+    """Middleware берёт лимит по роли текущего пользователя"""
+    middleware = RateLimitMiddleware(limit=5, role_limits={"admin": 50})
+    event = AsyncMock(spec=Message)
+    event.from_user = MagicMock(id=7)
+    handler = AsyncMock()
+
+    with patch("app.services.limiter.hit") as mock_hit:
+        mock_hit.return_value = LimitResult(allowed=True)
+        await middleware(
+            handler, event, {"current_user": MagicMock(role="admin")}
+        )
+        await middleware(handler, event, {})
+
+    assert mock_hit.await_args_list[0].args == ("rl:7", 50, 60)
+    assert mock_hit.await_args_list[1].args == ("rl:7", 5, 60)
+    assert handler.await_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", ["fixed", "gcra"])
+async def test_slow_sender_is_charged_one_token(lua, clock, algorithm):
+    """Сообщения реже LEASE_TTL не арендуют пачку и не сжигают лимит"""
+    results = []
+    for _ in range(20):
+        results.append(await limiter.hit("rl:4", 40, 60, algorithm))
+        clock.now += 3
+
+    assert all(r.allowed for r in results)
+    assert results[-1].remaining == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", ["fixed", "gcra"])
+async def test_fast_sender_leases_by_rate(lua, clock, algorithm):
+    """Частые сообщения берут пачку по темпу и упираются в лимит"""
+    script = limiter.ALGORITHMS[algorithm]
+    calls = []
+
+    async def counted(keys, args):
+        calls.append(args[2])
+        return await script(keys=keys, args=args)
+
+    limiter.ALGORITHMS[algorithm] = counted
+    results = []
+    for _ in range(35):
+        results.append(await limiter.hit("rl:5", 30, 60, algorithm))
+        clock.now += 0.5
+
+    assert calls[:2] == [1, 3]
+    assert sum(r.allowed for r in results) == 30
+    assert len(calls) < 20
+    assert not results[-1].allowed and results[-1].retry_after
@@ -0,0 +1,82 @@
+"""
+Тесты отложенного индикатора загрузки
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Router
+from aiogram.types import Message
+
+from app.middlewares.loading import (
+    TYPING_INDICATOR,
+    LoadingMiddleware,
+    set_typing,
+)
+
+
+def _message():
+    message = AsyncMock(spec=Message)
+    message.chat = MagicMock(id=42)
+    return message
+
+
+def _count(result):
+    return TYPING_INDICATOR.labels(result)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_fast_handler_sends_nothing():
+    """Быстрый хэндлер: ни chat action, ни искусственной задержки"""
+    bot = MagicMock()
+    bot.send_chat_action = AsyncMock()
+    middleware = LoadingMiddleware(bot, delay=0.2)
+    handler = AsyncMock(return_value="ok")
+    skipped = _count("skipped")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await middleware(handler, _message(), {}) == "ok"
+
+    assert loop.time() - started < 0.1
+    bot.send_chat_action.assert_not_called()
+    assert _count("skipped") == skipped + 1
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_shows_typing_once():
+    """Долгий хэндлер: действие уходит после задержки и снимается"""
+    bot = MagicMock()
+    bot.send_chat_action = AsyncMock()
+    middleware = LoadingMiddleware(bot, delay=0.01)
+    sent = _count("sent")
+
+    async def handler(event, data):
+        await asyncio.sleep(0.05)
+        return "done"
+
+    assert await middleware(handler, _message(), {}) == "done"
+    await asyncio.sleep(0.02)
+
+    bot.send_chat_action.assert_awaited_once_with(42, "typing")
+    assert _count("sent") == sent + 1
+
+
+@pytest.mark.asyncio
+async def test_router_and_flag_settings():
+    """Настройка роутера перекрывает middleware, флаг хэндлера — роутер"""
+    router = Router()
+    set_typing(router, None)
+    middleware = LoadingMiddleware(MagicMock(), delay=1.0)
+
+    assert middleware._settings({"event_router": router})[0] is None
+    assert middleware._settings({})[0] == 1.0
+
+    set_typing(router, 0.3, "upload_document")
+    handler = MagicMock(flags={"typing": 0.1})
+    data = {"event_router": router, "handler": handler}
+    assert middleware._settings(data) == (0.1, "upload_document")
+
+    handler.flags = {"typing": False}
+    assert middleware._settings(data)[0] is None
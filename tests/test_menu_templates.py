@@ -0,0 +1,56 @@
+"""
+Тесты шаблонов главного меню
+"""
+
+from app.keyboards import main_menu
+from app.keyboards.main_menu import compile_menu, menu
+
+
+def test_nonce_stamped_into_template():
+    """nonce подставляется во все кнопки, кроме служебных"""
+    markup = menu("teacher", "ru", "light", "n0nce")
+
+    data = [b.callback_data for row in markup.inline_keyboard for b in row]
+    assert data[0] == "n0nce:teacher_notes"
+    assert all(d.startswith("n0nce:") for d in data)
+    theme_btn = menu("unknown", "ru", "dark", "n0nce").inline_keyboard[0][0]
+    assert theme_btn.callback_data == "switch_theme"
+
+
+def test_template_compiled_once():
+    """Шаблон собирается один раз, меню без nonce переиспользуется"""
+    main_menu.clear_menu_cache()
+
+    assert compile_menu("admin", "ru", "dark") is compile_menu(
+        "admin", "ru", "dark"
+    )
+    assert menu("admin", "ru", "dark") is menu("admin", "ru", "dark")
+    assert menu("admin", "ru", "dark", "a") is not menu(
+        "admin", "ru", "dark", "b"
+    )
+
+
+def test_rendered_menus_do_not_share_nonce():
+    """Выдача с nonce не меняет общий шаблон"""
+    first = menu("parent", "en", "light", "one")
+    second = menu("parent", "en", "light", "two")
+
+    assert first.inline_keyboard[0][0].callback_data == "one:parent_tasks"
+    assert second.inline_keyboard[0][0].callback_data == "two:parent_tasks"
+    assert menu("parent", "en").inline_keyboard[0][0].callback_data == (
+        ":parent_tasks"
+    )
+
+
+def test_button_emoji_not_duplicated():
+    """Эмодзи кнопки берётся из темы, переводы его не повторяют"""
+    main_menu.clear_menu_cache()
+
+    teacher = menu("teacher", "ru", "light").inline_keyboard
+    assert teacher[0][0].text == "📝 Мои заметки"
+    assert teacher[1][0].text == "➕ Добавить заметку"
+    assert teacher[2][0].text == "🛠 Заявка в техподдержку"
+    dark = menu("teacher", "en", "dark").inline_keyboard
+    assert dark[0][0].text == "📜 My notes"
+    psych = menu("psych", "ru", "light").inline_keyboard
+    assert psych[0][0].text == "📋 Запросы на консультацию"
@@ -0,0 +1,177 @@
+"""
+Тесты асинхронной загрузки новостей
+"""
+
+import json
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.services import news_parser as news_module
+from app.services.news_parser import NewsParser
+
+NEWS_HTML = """
+<div class="news-list">
+  <div class="news-card">
+    <h3>Новый учебный год в школах Москвы</h3>
+    <a href="/news/item/1/">Подробнее</a>
+    <span class="news-card__date">01.09.2025</span>
+    <p class="news-card__announce">Школы готовы к началу занятий</p>
+  </div>
+</div>
+"""
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(news_module, "RETRY_BACKOFF_FACTOR", 0)
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_on_server_error(no_backoff):
+    """Ответы 5xx повторяются, затем возвращается страница"""
+    calls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls.append(request)
+        if len(calls) < 3:
+            return web.Response(status=503)
+        return web.Response(text=NEWS_HTML, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/news", handler)
+    parser = NewsParser()
+    async with TestServer(app) as server:
+        html = await parser._fetch(str(server.make_url("/news")))
+    await parser.close()
+
+    assert html == NEWS_HTML
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_uses_conditional_requests():
+    """Повторный запрос отправляет ETag и переиспользует страницу на 304"""
+    seen_etags = []
+
+    async def handler(request: web.Request) -> web.Response:
+        etag = request.headers.get("If-None-Match")
+        seen_etags.append(etag)
+        if etag == '"v1"':
+            return web.Response(status=304)
+        return web.Response(
+            text=NEWS_HTML, content_type="text/html", headers={"ETag": '"v1"'}
+        )
+
+    app = web.Application()
+    app.router.add_get("/news", handler)
+    parser = NewsParser()
+    async with TestServer(app) as server:
+        url = str(server.make_url("/news"))
+        first = await parser._fetch(url)
+        second = await parser._fetch(url)
+    await parser.close()
+
+    assert first == second == NEWS_HTML
+    assert seen_etags == [None, '"v1"']
+
+
+def test_parse_html():
+    """Разбор страницы возвращает валидные карточки"""
+    cards = NewsParser()._parse_html(NEWS_HTML, limit=5)
+
+    assert cards[0]["title"] == "Новый учебный год в школах Москвы"
+    assert cards[0]["url"] == "https://www.mos.ru/news/item/1/"
+    assert cards[0]["date"] == "01.09.2025"
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = AsyncMock()
+    redis.get.return_value = None
+    monkeypatch.setattr(news_module, "redis_client", redis)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_limits_are_slices_of_one_list(fake_redis):
+    """Разные limit читают один канонический ключ"""
+    news = [{"title": f"Новость номер {i}"} for i in range(10)]
+    fake_redis.get.return_value = json.dumps(
+        {"fetched_at": time.time(), "news": news}
+    )
+    parser = NewsParser()
+
+    assert await parser.get_news_cards(limit=3) == news[:3]
+    assert await parser.get_news_cards(limit=7) == news[:7]
+    fake_redis.get.assert_awaited_once_with(news_module.NEWS_CACHE_KEY)
+
+
+@pytest.mark.asyncio
+async def test_stale_news_served_while_refreshing(fake_redis, monkeypatch):
+    """Устаревшие данные отдаются сразу, обновление идёт в фоне"""
+    news = [{"title": "Старая новость"}]
+    fake_redis.get.return_value = json.dumps(
+        {"fetched_at": time.time() - 3600, "news": news}
+    )
+    parser = NewsParser()
+    refresh = AsyncMock(return_value=True)
+    monkeypatch.setattr(parser, "refresh", refresh)
+
+    assert await parser.get_news_cards(limit=5) == news
+    await parser._refresh_task
+    refresh.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cold_cache_returns_fallback(fake_redis, monkeypatch):
+    """Пустой кэш не ждёт mos.ru и отдаёт заглушки"""
+    parser = NewsParser()
+    refresh = AsyncMock(return_value=True)
+    monkeypatch.setattr(parser, "refresh", refresh)
+
+    cards = await parser.get_news_cards(limit=2)
+    await parser._refresh_task
+
+    assert cards == parser._get_fallback_news()[:2]
+    refresh.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_stores_canonical_list(fake_redis, monkeypatch):
+    """Обновление кладёт полный разобранный список в Redis"""
+    fake_redis.set.return_value = True
+    parser = NewsParser()
+    monkeypatch.setattr(parser, "_fetch", AsyncMock(return_value=NEWS_HTML))
+
+    assert await parser.refresh() is True
+
+    key, ttl, payload = fake_redis.setex.await_args.args
+    assert key == news_module.NEWS_CACHE_KEY
+    assert ttl == news_module.NEWS_CACHE_TTL
+    assert json.loads(payload)["news"][0]["date"] == "01.09.2025"
+
+
+@pytest.mark.asyncio
+async def test_refresh_releases_only_own_lock(fake_redis, monkeypatch):
+    """Лок снимается сравнением с токеном владельца, а не DEL"""
+    fake_redis.set.return_value = True
+    parser = NewsParser()
+    monkeypatch.setattr(parser, "_fetch", AsyncMock(return_value=NEWS_HTML))
+
+    await parser.refresh()
+
+    token = fake_redis.set.await_args.args[1]
+    script, numkeys, key, owner = fake_redis.eval.await_args.args
+    assert script == news_module.RELEASE_LOCK_SCRIPT
+    assert (numkeys, key, owner) == (1, news_module.NEWS_LOCK_KEY, token)
+    fake_redis.delete.assert_not_awaited()
+
+    # Чужой лок не трогаем
+    fake_redis.eval.reset_mock()
+    fake_redis.set.return_value = None
+    assert await parser.refresh() is False
+    fake_redis.eval.assert_not_awaited()
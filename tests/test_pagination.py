@@ -0,0 +1,119 @@
+"""
+Тесты keyset-пагинации: курсоры, условия запроса и кнопки листания
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.db.note import Note
+from app.keyboards.pagination import page_cursor, page_nav
+from app.repositories.pagination import (
+    NEXT,
+    PREV,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+from app.utils.csrf import issue_token
+
+START = datetime(2025, 9, 1, 8, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def _rows(count):
+    return [
+        SimpleNamespace(id=100 - i, created_at=START - timedelta(minutes=i))
+        for i in range(count)
+    ]
+
+
+def _session(rows):
+    session = MagicMock()
+    session.scalars = AsyncMock(return_value=iter(rows))
+    return session
+
+
+def _sql(session):
+    stmt = session.scalars.call_args.args[0]
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+def test_cursor_roundtrip():
+    """Курсор обратим и не теряет микросекунды; мусор → первая страница"""
+    cursor = encode_cursor(NEXT, START, 123456)
+
+    assert decode_cursor(cursor) == (NEXT, START, 123456)
+    naive = START.replace(tzinfo=None)
+    assert decode_cursor(encode_cursor(PREV, naive, 1))[1] == START
+    for garbage in (None, "", "x1.2", "nzz", "n!.1", "n1.2.3"):
+        assert decode_cursor(garbage) is None
+
+
+@pytest.mark.asyncio
+async def test_first_page_reads_limit_plus_one():
+    """Первая страница: без условия, лишняя строка даёт курсор вперёд"""
+    session = _session(_rows(4))
+
+    page = await paginate(
+        session, select(Note), Note.created_at, Note.id, limit=3
+    )
+
+    sql = _sql(session)
+    assert "WHERE" not in sql
+    assert "ORDER BY notes.created_at DESC, notes.id DESC" in sql
+    assert "LIMIT 4" in sql
+    assert [row.id for row in page.items] == [100, 99, 98]
+    assert page.prev_cursor is None
+    assert decode_cursor(page.next_cursor)[2] == 98
+
+
+@pytest.mark.asyncio
+async def test_prev_page_is_reversed():
+    """Назад: обратный порядок в запросе, строки возвращаются по порядку"""
+    rows = _rows(3)
+    session = _session(list(reversed(rows)))
+    cursor = encode_cursor(PREV, START - timedelta(minutes=3), 97)
+
+    page = await paginate(
+        session, select(Note), Note.created_at, Note.id, cursor, limit=3
+    )
+
+    sql = _sql(session)
+    assert "(notes.created_at, notes.id) >" in sql
+    assert "ORDER BY notes.created_at ASC, notes.id ASC" in sql
+    assert [row.id for row in page.items] == [100, 99, 98]
+    assert page.prev_cursor is None
+    assert decode_cursor(page.next_cursor)[2] == 98
+
+
+def test_page_nav_buttons():
+    """Кнопки листания укладываются в 64 байта callback_data"""
+    token = issue_token(-1001234567890, 1234567890)
+    page = Page(
+        items=[1],
+        next_cursor=encode_cursor(NEXT, START, 2**31 - 1),
+        prev_cursor=encode_cursor(PREV, START, 1),
+    )
+
+    row = page_nav("notes", page, token)
+
+    assert [button.text for button in row] == ["⬅️", "➡️"]
+    for button in row:
+        assert len(button.callback_data.encode()) <= 64
+        real_data = button.callback_data.split(":", 1)[1]
+        assert page_cursor(real_data, "notes") in (
+            page.prev_cursor,
+            page.next_cursor,
+        )
+    assert page_nav("notes", Page(items=[1]), token) == []
+    assert page_cursor("teacher_notes", "notes") is None
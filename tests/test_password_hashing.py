@@ -0,0 +1,61 @@
+"""
+Тесты хэширования паролей вне event loop и ленивых демо-учёток
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app import roles
+from app.utils.hash import check_pwd_async, hash_pwd_async, is_hashed
+
+# Бюджет на `import app.roles`: раньше импорт считал 41 bcrypt-хэш
+IMPORT_BUDGET = 1.0  # секунды
+
+
+@pytest.mark.asyncio
+async def test_async_hash_roundtrip():
+    """Хэширование и проверка в пуле потоков"""
+    hashed = await hash_pwd_async("secret")
+
+    assert is_hashed(hashed)
+    assert await check_pwd_async("secret", hashed) is True
+    assert await check_pwd_async("wrong", hashed) is False
+    assert not is_hashed("secret") and not is_hashed(None)
+
+
+def test_demo_users_hashed_once_per_password(monkeypatch):
+    """Демо-учётки собираются лениво, один хэш на пароль"""
+    calls = []
+    monkeypatch.setattr(roles, "hash_pwd", lambda p: calls.append(p) or p)
+    roles.demo_users.cache_clear()
+    roles._demo_hash.cache_clear()
+
+    users = roles.DEMO_USERS
+
+    assert len(users) == 41
+    assert sorted(calls) == sorted(
+        {p for _, _, p, _ in roles.DEMO_ACCOUNTS} | {"demo"}
+    )
+    roles.demo_users.cache_clear()
+    roles._demo_hash.cache_clear()
+
+
+def test_import_roles_within_budget():
+    """Импорт app.roles укладывается в бюджет (в отдельном процессе)"""
+    code = (
+        "import time; t = time.perf_counter(); import app.roles; "
+        "print(time.perf_counter() - t)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent.parent,
+        timeout=60,
+        check=True,
+    )
+
+    assert float(result.stdout.strip()) < IMPORT_BUDGET
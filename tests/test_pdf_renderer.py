@@ -0,0 +1,69 @@
+"""
+Тесты рендера справок: детерминированный PDF, пачка, кэш file_id
+"""
+
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import pdf_factory, pdf_renderer
+
+ISSUED = date(2025, 9, 1)
+
+
+def test_render_is_deterministic():
+    """Одинаковые данные → побайтно одинаковый PDF, пачка — страница на ребёнка"""
+    single = pdf_factory.render_pdf("school", ["Иванов Иван"], ISSUED)
+    batch = pdf_factory.render_pdf(
+        "school", [f"Ученик {i}" for i in range(5)], ISSUED
+    )
+
+    assert single == pdf_factory.render_pdf("school", ["Иванов Иван"], ISSUED)
+    assert single.startswith(b"%PDF")
+    assert batch.count(b"/Type /Page\n") == 5
+    # Постоянная часть страницы хранится в документе один раз
+    assert batch.count(b"/Subtype /Form") == 1
+    assert pdf_factory.certificate_key(
+        "school", ["Иванов Иван"], ISSUED
+    ) != pdf_factory.certificate_key("family", ["Иванов Иван"], ISSUED)
+
+
+@pytest.mark.asyncio
+async def test_send_reuses_cached_file_id(monkeypatch):
+    """Справка из кэша уходит по file_id без рендера"""
+    monkeypatch.setattr(
+        pdf_renderer, "cached_file_id", AsyncMock(return_value="FILE")
+    )
+    render = AsyncMock()
+    monkeypatch.setattr(pdf_renderer, "render", render)
+    bot = MagicMock()
+    bot.send_document = AsyncMock()
+
+    await pdf_renderer.send_certificate(bot, 1, "school", ["Иванов Иван"])
+
+    render.assert_not_called()
+    assert bot.send_document.call_args.kwargs["document"] == "FILE"
+
+
+@pytest.mark.asyncio
+async def test_send_uploads_and_remembers_file_id(monkeypatch):
+    """Промах кэша: рендер в пуле, загрузка и сохранение file_id"""
+    monkeypatch.setattr(
+        pdf_renderer, "cached_file_id", AsyncMock(return_value=None)
+    )
+    remember = AsyncMock()
+    monkeypatch.setattr(pdf_renderer, "remember_file_id", remember)
+    bot = MagicMock()
+    bot.send_document = AsyncMock(
+        return_value=MagicMock(document=MagicMock(file_id="NEW"))
+    )
+
+    try:
+        await pdf_renderer.send_certificate(bot, 1, "family", ["А", "Б"])
+    finally:
+        pdf_renderer.shutdown()
+
+    document = bot.send_document.call_args.kwargs["document"]
+    assert document.data.count(b"/Type /Page\n") == 2
+    assert remember.call_args.args[1] == "NEW"
@@ -3,15 +3,23 @@
 """
 
 import asyncio
+import json
 import time
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from sqlalchemy import select
 
 from app.db.session import AsyncSessionLocal
 from app.db.user import User
-from app.services.cache_service import cache_service, cache_result
+from app.schemas.user import UserSnapshot
+from app.services.cache_service import (
+    USER_INVALIDATION_CHANNEL,
+    CacheService,
+    LocalCache,
+    cache_service,
+    cache_result,
+)
 from app.services.performance_monitor import (
     performance_monitor,
     db_profiler,
@@ -71,6 +79,70 @@ class TestCacheService:
         assert call_count == 1  # Функция не должна вызываться повторно
 
 
+class TestTwoTierUserCache:
+    """Тесты локального уровня кеша пользователей и pub/sub инвалидации"""
+
+    def test_local_cache_lru_eviction(self):
+        """Самая давно использованная запись вытесняется первой"""
+        cache = LocalCache(maxsize=2, ttl=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        assert cache.get(2) is None
+        assert cache.get(1) == "a"
+        assert cache.get(3) == "c"
+
+    def test_local_cache_ttl(self):
+        """Устаревшие записи не возвращаются"""
+        cache = LocalCache(maxsize=10, ttl=0)
+        cache.set(1, "a")
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_snapshot_served_from_memory(self):
+        """Повторный запрос пользователя не ходит в Redis"""
+        snapshot = UserSnapshot(id=1, tg_id=555, role="teacher")
+        CacheService.local_users.clear()
+        fake_redis = AsyncMock()
+        fake_redis.get.return_value = json.dumps(snapshot.as_dict())
+
+        with patch("app.services.cache_service.redis_client", fake_redis):
+            first = await cache_service.get_user_snapshot(555)
+            second = await cache_service.get_user_snapshot(555)
+
+        assert first == second == snapshot
+        fake_redis.get.assert_awaited_once()
+        CacheService.local_users.clear()
+
+    @pytest.mark.asyncio
+    async def test_invalidate_publishes_event(self):
+        """Инвалидация чистит память процесса и публикует событие"""
+        CacheService.local_users.set(
+            777, UserSnapshot(id=2, tg_id=777, role="admin")
+        )
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        fake_redis = MagicMock()
+        fake_redis.pipeline.return_value.__aenter__.return_value = pipe
+
+        with patch("app.services.cache_service.redis_client", fake_redis):
+            await cache_service.invalidate_user(777)
+
+        assert CacheService.local_users.get(777) is None
+        pipe.delete.assert_called_once_with("user:777")
+        pipe.publish.assert_called_once_with(USER_INVALIDATION_CHANNEL, "777")
+
+    def test_pubsub_event_evicts_local_entry(self):
+        """Событие от другого процесса удаляет локальную запись"""
+        CacheService.local_users.set(
+            888, UserSnapshot(id=3, tg_id=888, role="parent")
+        )
+        CacheService._evict_local("888")
+        assert CacheService.local_users.get(888) is None
+
+
 class TestPerformanceMonitor:
     """Тесты для мониторинга производительности"""
     
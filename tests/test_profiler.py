@@ -0,0 +1,79 @@
+"""
+Тесты профилировщика функций: гистограммы, кольцевой буфер, сбор ресурсов
+"""
+
+import random
+
+import psutil
+import pytest
+
+from app.services.performance_monitor import (
+    LatencyHistogram,
+    PerformanceMonitor,
+    ResourceCollector,
+    monitor_performance,
+    performance_monitor,
+)
+
+
+def test_histogram_quantiles_within_bucket_error():
+    rng = random.Random(42)
+    values = sorted(rng.lognormvariate(-5, 1) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        estimate = histogram.quantile(q)
+        assert abs(estimate / exact - 1) <= 0.05
+
+
+def test_history_is_bounded_ring_buffer():
+    monitor = PerformanceMonitor(max_history_size=100)
+    for i in range(250):
+        monitor.record("f", 0.001 * (i % 10), success=i % 50 != 0)
+
+    assert len(monitor.metrics_history) == 100
+    stats = monitor.get_function_stats()["f"]
+    assert stats["calls"] == 250
+    assert stats["errors"] == 5
+    assert stats["p50"] <= stats["p95"] <= stats["p99"]
+
+    report = monitor.get_performance_report(hours=1)
+    assert report["total_calls"] == 100
+    assert report["execution_time"]["p99"] == pytest.approx(0.009)
+
+
+@pytest.mark.asyncio
+async def test_decorator_does_not_touch_psutil(monkeypatch):
+    def forbidden(*args, **kwargs):
+        raise AssertionError("psutil в горячем пути")
+
+    monkeypatch.setattr(psutil.Process, "memory_info", forbidden)
+    monkeypatch.setattr(psutil.Process, "cpu_percent", forbidden)
+
+    @monitor_performance("test_profiler.hot")
+    async def hot():
+        return 1
+
+    @monitor_performance("test_profiler.failing")
+    def failing():
+        raise ValueError
+
+    assert await hot() == 1
+    with pytest.raises(ValueError):
+        failing()
+
+    stats = performance_monitor.get_function_stats()
+    assert stats["test_profiler.hot"]["calls"] >= 1
+    assert stats["test_profiler.failing"]["errors"] >= 1
+
+
+def test_resource_collector_keeps_latest_sample():
+    collector = ResourceCollector(interval=60)
+    snapshot = collector.sample()
+
+    assert collector.latest is snapshot
+    assert snapshot["memory"]["rss_mb"] > 0
+    assert "percent" in snapshot["cpu"]
@@ -0,0 +1,116 @@
+"""
+Тесты профилировщика запросов: отпечатки, события движка, N+1
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.types import Update
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.db.user import User
+from app.middlewares.db_queries import QueryCountMiddleware
+from app.services.performance_monitor import DatabaseProfiler, fingerprint
+
+
+def test_fingerprint_normalizes_literals_and_lists():
+    a = fingerprint(
+        "SELECT users.id FROM users WHERE users.tg_id = $1 "
+        "AND users.role IN ($2, $3, $4) LIMIT $5"
+    )
+    b = fingerprint(
+        "SELECT users.id FROM users  WHERE users.tg_id = 42\n"
+        "AND users.role IN ('a', 'b') LIMIT 10 -- comment"
+    )
+    assert a == b
+    assert a == (
+        "SELECT users.id FROM users WHERE users.tg_id = ? "
+        "AND users.role IN (?) LIMIT ?"
+    )
+    assert fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')") == (
+        "INSERT INTO t (a, b) VALUES (?)"
+    )
+    assert fingerprint("SELECT x::INTEGER FROM anon_1") == (
+        "SELECT x::INTEGER FROM anon_1"
+    )
+
+
+def test_fingerprint_collapses_asyncpg_casts():
+    query = select(User.id).where(User.role.in_(["a", "b", "c"])).limit(5)
+    shorter = select(User.id).where(User.role.in_(["a"])).limit(5)
+    options = {"render_postcompile": True}
+    sql = [
+        str(q.compile(dialect=asyncpg.dialect(), compile_kwargs=options))
+        for q in (query, shorter)
+    ]
+
+    assert "::VARCHAR" in sql[0]
+    assert fingerprint(sql[0]) == fingerprint(sql[1])
+    assert "IN (?::VARCHAR)" in fingerprint(sql[0])
+    rows = fingerprint(
+        "INSERT INTO t (a, b) VALUES ($1::INTEGER, $2::VARCHAR), "
+        "($3::INTEGER, $4::VARCHAR)"
+    )
+    assert rows == "INSERT INTO t (a, b) VALUES (?::INTEGER)"
+
+
+@pytest.mark.asyncio
+async def test_profile_query_keeps_block_name():
+    profiler = DatabaseProfiler()
+    async with profiler.profile_query("warm_users", "SELECT 1"):
+        pass
+    async with profiler.profile_query("load_news"):
+        pass
+
+    names = {
+        s["fingerprint"] for s in profiler.get_query_stats()["statements"]
+    }
+    assert names == {"warm_users", "load_news"}
+
+
+def test_engine_events_record_statements():
+    profiler = DatabaseProfiler()
+    engine = create_engine("sqlite://")
+    profiler.install(engine)
+    profiler.install(engine)  # повторная подписка не дублирует учёт
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        for i in range(3):
+            conn.execute(text("INSERT INTO t VALUES (:id)"), {"id": i})
+        conn.execute(text("SELECT id FROM t WHERE id = 1")).all()
+
+    stats = profiler.get_query_stats()
+    assert stats["total_queries"] == 5
+    by_sql = {s["fingerprint"]: s for s in stats["statements"]}
+    insert = by_sql["INSERT INTO t VALUES (?)"]
+    assert insert["calls"] == 3
+    assert insert["rows"] == 3
+    assert insert["p50"] <= insert["p99"]
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_queries_and_flags_n_plus_one(monkeypatch):
+    profiler = DatabaseProfiler(n_plus_one_threshold=3)
+    monkeypatch.setattr("app.middlewares.db_queries.db_profiler", profiler)
+    update = Update.model_construct(update_id=7, message=MagicMock())
+
+    async def handler(event, data):
+        profiler.record("SELECT * FROM users WHERE id = 1", 0.001)
+        for i in range(4):
+            profiler.record(f"SELECT * FROM notes WHERE user_id = {i}", 0.001)
+
+    await QueryCountMiddleware()(handler, update, {})
+
+    assert profiler.total_queries == 5
+    [report] = profiler.n_plus_one
+    assert report["sql"] == "SELECT * FROM notes WHERE user_id = ?"
+    assert report["count"] == 4
+    assert report["queries_in_update"] == 5
+    assert report["update"] == "message #7"
+
+    # Вне апдейта запросы в счёт N+1 не попадают
+    for i in range(5):
+        profiler.record(f"SELECT * FROM notes WHERE user_id = {i}", 0.001)
+    assert len(profiler.n_plus_one) == 1
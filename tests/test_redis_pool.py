@@ -0,0 +1,129 @@
+"""
+Тесты реестра Redis: общие пулы, метрики клиентов, пакетная запись
+"""
+
+import pytest
+import redis.asyncio as redis
+from prometheus_client import REGISTRY
+from redis.asyncio.client import Pipeline
+
+from app.services import redis_pool
+from app.services.redis_pool import (
+    RedisRegistry,
+    batch,
+    begin_batch,
+    end_batch,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.reset()
+        return False
+
+    def setex(self, key, ttl, value):
+        self.commands.append(("SETEX", key))
+
+    async def execute(self):
+        self.client.executed.append(list(self.commands))
+
+    async def reset(self):
+        self.commands = []
+
+
+class FakeClient:
+    def __init__(self):
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def test_registry_shares_one_pool_per_database():
+    registry = RedisRegistry(
+        {
+            "state": "redis://redis:6379/0",
+            "cache": redis_pool.redis_db_url("redis://redis:6379/0", 1),
+        },
+    )
+
+    state = registry.client("state")
+    assert registry.client("state") is state
+    cache = registry.client("cache")
+    assert cache.connection_pool is not state.connection_pool
+    assert state.connection_pool.connection_kwargs["db"] == 0
+    assert cache.connection_pool.connection_kwargs["db"] == 1
+    assert registry.stats()["cache"] == {"in_use": 0, "idle": 0}
+    with pytest.raises(KeyError):
+        registry.client("sessions")
+
+
+@pytest.mark.asyncio
+async def test_commands_and_pipelines_are_counted(monkeypatch):
+    async def execute_command(self, *args, **options):
+        return "OK"
+
+    async def execute(self, raise_on_error=True):
+        return [True] * len(self.command_stack)
+
+    monkeypatch.setattr(redis.Redis, "execute_command", execute_command)
+    monkeypatch.setattr(Pipeline, "execute", execute)
+    registry = RedisRegistry({"metrics": "redis://redis:6379/3"})
+    client = registry.client("metrics")
+    gets = sample("redis_commands_total", client="metrics", command="GET")
+    sets = sample("redis_commands_total", client="metrics", command="SET")
+
+    assert await client.get("k") == "OK"
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set("a", 1)
+        pipe.set("b", 2)
+        assert await pipe.execute() == [True, True]
+
+    assert (
+        sample("redis_commands_total", client="metrics", command="GET")
+        == gets + 1
+    )
+    assert (
+        sample("redis_commands_total", client="metrics", command="SET")
+        == sets + 2
+    )
+    assert sample(
+        "redis_command_duration_seconds_count",
+        client="metrics",
+        command="PIPELINE",
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_defers_update_writes_to_one_pipeline():
+    client = FakeClient()
+
+    # Вне апдейта блок выполняется сразу
+    async with batch(client) as pipe:
+        pipe.setex("a", 60, "1")
+    assert client.executed == [[("SETEX", "a")]]
+
+    token = begin_batch()
+    async with batch(client) as pipe:
+        pipe.setex("b", 60, "2")
+    async with batch(client) as pipe:
+        pipe.setex("c", 60, "3")
+    assert len(client.executed) == 1
+
+    await end_batch(token)
+    assert client.executed[1] == [("SETEX", "b"), ("SETEX", "c")]
+
+    async with batch(client) as pipe:
+        pipe.setex("d", 60, "4")
+    assert client.executed[2] == [("SETEX", "d")]
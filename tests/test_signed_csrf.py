@@ -0,0 +1,66 @@
+"""
+Тесты подписанных CSRF токенов
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import CallbackQuery
+
+from app.middlewares.csrf import CSRFMiddleware
+from app.utils.csrf import TOKEN_LENGTH, issue_token, verify_token
+
+
+def test_token_fits_callback_data():
+    """Токен фиксированной длины и оставляет место под действие"""
+    token = issue_token(-1001234567890, 1234567890, "teacher_notes")
+
+    assert len(token) == TOKEN_LENGTH
+    assert ":" not in token
+    assert len(f"{token}:teacher_notes".encode()) <= 64
+
+
+def test_token_bound_to_chat_user_and_action():
+    """Подпись не переносится на другой чат, пользователя или действие"""
+    token = issue_token(1, 2, "stub")
+
+    assert verify_token(token, 1, 2, "stub")
+    assert not verify_token(token, 1, 3, "stub")
+    assert not verify_token(token, 9, 2, "stub")
+    assert not verify_token(token, 1, 2, "switch_admin")
+    assert not verify_token(token[:-1] + "A", 1, 2, "stub")
+    assert not verify_token("", 1, 2) and not verify_token(None, 1, 2)
+
+
+def test_expired_token_rejected(monkeypatch):
+    """Токен с истёкшим сроком не принимается"""
+    token = issue_token(1, 2, ttl=60)
+    monkeypatch.setattr(time, "time", lambda: 10**10)
+
+    assert not verify_token(token, 1, 2)
+
+
+@pytest.mark.asyncio
+async def test_signed_middleware_does_not_touch_storage():
+    """В режиме signed проверка идёт без обращения к хранилищу"""
+    middleware = CSRFMiddleware(mode="signed")
+    storage = AsyncMock()
+    handler = AsyncMock()
+    call = AsyncMock(spec=CallbackQuery)
+    call.message = MagicMock()
+    call.message.chat.id = 10
+    call.from_user = MagicMock(id=20)
+    call.answer = AsyncMock()
+    call.data = f"{issue_token(10, 20)}:admin_tickets"
+
+    await middleware(handler, call, {"dp": MagicMock(storage=storage)})
+
+    handler.assert_awaited_once()
+    assert call.data == "admin_tickets"
+    storage.get_data.assert_not_called()
+
+    call.data = f"{issue_token(10, 21)}:admin_tickets"
+    handler.reset_mock()
+    await middleware(handler, call, {})
+    handler.assert_not_awaited()
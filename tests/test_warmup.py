@@ -0,0 +1,85 @@
+"""
+Тесты прогрева кешей и готовности health-сервера
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import health
+from app.services.warmup import CacheWarmer, cache_warmer
+
+
+@pytest.mark.asyncio
+async def test_steps_run_with_bounded_concurrency():
+    warmer = CacheWarmer(concurrency=2, timeout=5)
+    running = peak = 0
+
+    async def step():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    for i in range(5):
+        warmer.step(f"step{i}")(step)
+
+    @warmer.step("broken")
+    async def broken():
+        raise RuntimeError("нет связи")
+
+    report = await warmer.run()
+
+    assert peak == 2
+    assert warmer.ready
+    assert report.results == {f"step{i}": "ok" for i in range(5)}
+    assert report.errors == {"broken": "нет связи"}
+    assert set(report.durations) == {*report.results, "broken"}
+    assert report.total > 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_still_flips_ready():
+    warmer = CacheWarmer(concurrency=4, timeout=0.05)
+
+    @warmer.step("fast")
+    async def fast():
+        return 1
+
+    @warmer.step("stuck")
+    async def stuck():
+        await asyncio.sleep(10)
+
+    report = await warmer.run()
+
+    assert warmer.ready
+    assert report.results == {"fast": 1}
+    assert report.errors == {"stuck": "timeout"}
+
+
+def test_default_steps_registered():
+    assert set(cache_warmer.steps) == {
+        "users",
+        "roles",
+        "reference",
+        "i18n_keyboards",
+        "news",
+    }
+
+
+@pytest.mark.asyncio
+async def test_readiness_waits_for_warmup(monkeypatch):
+    warmer = CacheWarmer(concurrency=1, timeout=1)
+    monkeypatch.setattr(health, "cache_warmer", warmer)
+
+    response = await health.readiness(MagicMock())
+    assert response.status == 503
+
+    await warmer.run()
+    response = await health.readiness(MagicMock())
+    assert response.status == 200
+    assert json.loads(response.body)["status"] == "ready"
@@ -0,0 +1,184 @@
+"""
+Тесты webhook-режима и партиционирования апдейтов
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app import health
+from app.services import update_queue as uq
+from app.services.update_queue import UpdateQueue, extract_chat_id
+
+MESSAGE_UPDATE = {
+    "update_id": 10,
+    "message": {
+        "message_id": 1,
+        "chat": {"id": 12345, "type": "private"},
+        "from": {"id": 12345, "is_bot": False, "first_name": "Иван"},
+        "text": "/start",
+    },
+}
+
+CALLBACK_UPDATE = {
+    "update_id": 11,
+    "callback_query": {
+        "id": "cb",
+        "from": {"id": 12345, "is_bot": False, "first_name": "Иван"},
+        "message": {"message_id": 2, "chat": {"id": 12345}},
+        "data": "teacher_notes",
+    },
+}
+
+
+def test_extract_chat_id():
+    """chat_id извлекается из сообщений и callback-запросов"""
+    assert extract_chat_id(MESSAGE_UPDATE) == 12345
+    assert extract_chat_id(CALLBACK_UPDATE) == 12345
+    assert extract_chat_id({"update_id": 1}) is None
+
+
+def test_same_chat_same_partition():
+    """Все апдейты одного чата попадают в одну партицию"""
+    queue = UpdateQueue(AsyncMock(), partitions=8)
+    assert queue.partition_for(MESSAGE_UPDATE) == queue.partition_for(
+        CALLBACK_UPDATE
+    )
+    assert queue.partition_for(
+        {"message": {"chat": {"id": -100500}}}
+    ) in range(8)
+
+
+def test_partitions_split_between_workers():
+    """Партиции делятся между воркерами без пересечений"""
+    queue = UpdateQueue(AsyncMock(), partitions=16)
+    owned = [queue.owned_partitions(i, 3) for i in range(3)]
+    assert sorted(p for part in owned for p in part) == list(range(16))
+
+
+@pytest.fixture
+def publish(monkeypatch):
+    publish = AsyncMock()
+    monkeypatch.setattr(health.update_queue, "publish", publish)
+    monkeypatch.setattr(health.settings, "WEBHOOK_SECRET", "s3cret")
+    return publish
+
+
+def _client() -> TestClient:
+    app = web.Application()
+    app.router.add_post("/webhook", health.telegram_webhook)
+    return TestClient(TestServer(app))
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_bad_secret(publish):
+    """Запрос без верного секрета отклоняется"""
+    async with _client() as client:
+        response = await client.post("/webhook", json=MESSAGE_UPDATE)
+    assert response.status == 401
+    publish.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_webhook_enqueues_update(publish):
+    """Апдейт кладётся в очередь, ответ возвращается сразу"""
+    async with _client() as client:
+        response = await client.post(
+            "/webhook",
+            json=MESSAGE_UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+        )
+    assert response.status == 200
+    publish.assert_awaited_once_with(MESSAGE_UPDATE)
+
+
+@pytest.mark.asyncio
+async def test_webhook_requires_secret(publish, monkeypatch):
+    """Без WEBHOOK_SECRET webhook не принимает апдейты и не стартует"""
+    monkeypatch.setattr(health.settings, "WEBHOOK_SECRET", "")
+    async with _client() as client:
+        response = await client.post(
+            "/webhook",
+            json=MESSAGE_UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": ""},
+        )
+    assert response.status == 401
+    publish.assert_not_awaited()
+
+    monkeypatch.setattr(health.settings, "BOT_MODE", "webhook")
+    with pytest.raises(RuntimeError):
+        await health.init_health_app()
+
+
+@pytest.mark.asyncio
+async def test_ack_failure_does_not_stop_partition(monkeypatch):
+    """Сбой XACK повторяется, консьюмер партиции продолжает работу"""
+    monkeypatch.setattr(uq, "RETRY_DELAY", 0.01)
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = UpdateQueue(client, partitions=1)
+    await queue.publish(MESSAGE_UPDATE)
+    await queue.publish(CALLBACK_UPDATE)
+
+    xack = client.xack
+    failures = [ConnectionError("down")]
+
+    async def flaky_xack(*args):
+        if failures:
+            raise failures.pop()
+        return await xack(*args)
+
+    monkeypatch.setattr(client, "xack", flaky_xack)
+    stop = asyncio.Event()
+    handled = []
+
+    async def handler(payload):
+        handled.append(payload["update_id"])
+        if len(handled) == 2:
+            stop.set()
+
+    await asyncio.wait_for(queue.consume(0, handler, stop), timeout=5)
+
+    assert handled == [10, 11]
+    assert not failures
+    pending = await client.xpending(queue.stream_key(0), "bot")
+    assert pending["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_slots_are_claimed_once():
+    """Реплики делят номера воркеров, освобождённый номер занимается снова"""
+    queue = UpdateQueue(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    assert await queue.claim_slot(2, "a") == 0
+    assert await queue.claim_slot(2, "b") == 1
+    assert await queue.claim_slot(2, "c") is None
+    assert await queue.renew_slot(0, "a")
+    assert not await queue.renew_slot(0, "c")
+
+    await queue.release_slot(0, "c")
+    assert await queue.claim_slot(2, "c") is None
+    await queue.release_slot(0, "a")
+    assert await queue.claim_slot(2, "c") == 0
+
+
+@pytest.mark.asyncio
+async def test_orphaned_partitions():
+    """Партиция с апдейтами без живого консьюмера считается брошенной"""
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = UpdateQueue(client, partitions=2)
+    assert await queue.orphaned_partitions() == []
+
+    await queue.publish({"message": {"chat": {"id": 0}}})
+    await queue.publish({"message": {"chat": {"id": 1}}})
+    assert await queue.orphaned_partitions() == [0, 1]
+
+    await queue.ensure_group(1)
+    await client.xreadgroup(
+        "bot", "partition-1", {queue.stream_key(1): ">"}, count=10
+    )
+    assert await queue.orphaned_partitions() == [0]
+    assert await queue.orphaned_partitions(idle_ms=-1) == [0, 1]